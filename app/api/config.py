@@ -1,20 +1,50 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
+from typing import List, Union
 from app.services.config import config_service
 
 router = APIRouter(prefix="/api/config", tags=["config"])
 
+class TileConfig(BaseModel):
+    ip: str
+    port: int = 80
+    protocol: str = "http"
+    udp_port: int = None
+    x: int = 0  # Posición del tile dentro del canvas
+    y: int = 0
+    width: int
+    height: int
+    rotation: int = 0
+    mirror_v: bool = False
+    mirror_h: bool = False
+    serpentine: bool = False  # Cableado en zig-zag
+    vertical: bool = False  # Cableado por columnas
+    ledmap: List[int] = None  # "map" de un ledmap.json de WLED
+    delta: bool = True  # Solo HTTP: enviar únicamente los LEDs que cambian
+
+class CanvasConfig(BaseModel):
+    width: int
+    height: int
+    tiles: List[TileConfig] = []  # Sin tiles se usa el WLED único de "wled"
+
 class ConfigUpdate(BaseModel):
     matrix_width: int = None
     matrix_height: int = None
     wled_ip: str = None
     wled_port: int = None
-    wled_protocol: str = None
+    wled_protocol: str = None  # http, https, ddp, drgb, dnrgb
+    wled_udp_port: int = None  # Puerto UDP para ddp/drgb/dnrgb (por defecto el del protocolo)
     wled_rotation: int = None
     wled_mirror_v: bool = None
     wled_mirror_h: bool = None
+    wled_serpentine: bool = None  # Cableado en zig-zag: filas (o columnas) impares al revés
+    wled_vertical: bool = None  # Cableado por columnas en lugar de por filas
+    wled_ledmap: Union[List[int], dict] = None  # ledmap.json de WLED ({"map": [...]}) o su lista; [] lo elimina
+    wled_delta: bool = None  # Solo HTTP: enviar únicamente los LEDs que cambian
     animation_loop: bool = None
     animation_frame_delay: int = None  # en ms
+    animation_stream_memory_mb: int = None  # Memoria máxima del buffer al reproducir en streaming
+    canvas: CanvasConfig = None
 
 @router.get("/")
 async def get_config():
@@ -62,25 +92,50 @@ async def update_config(config: ConfigUpdate):
             current_config["wled"]["port"] = config.wled_port
         if config.wled_protocol is not None:
             current_config["wled"]["protocol"] = config.wled_protocol
+        if config.wled_udp_port is not None:
+            current_config["wled"]["udp_port"] = config.wled_udp_port
         if config.wled_rotation is not None:
             current_config["wled"]["rotation"] = config.wled_rotation
         if config.wled_mirror_v is not None:
             current_config["wled"]["mirror_v"] = config.wled_mirror_v
         if config.wled_mirror_h is not None:
             current_config["wled"]["mirror_h"] = config.wled_mirror_h
+        if config.wled_serpentine is not None:
+            current_config["wled"]["serpentine"] = config.wled_serpentine
+        if config.wled_vertical is not None:
+            current_config["wled"]["vertical"] = config.wled_vertical
+        if config.wled_ledmap is not None:
+            ledmap = config.wled_ledmap.get("map", []) if isinstance(config.wled_ledmap, dict) else config.wled_ledmap
+            if not all(isinstance(index, int) for index in ledmap):
+                raise HTTPException(status_code=400, detail="El ledmap debe ser una lista de índices enteros")
+            current_config["wled"]["ledmap"] = ledmap or None
+        if config.wled_delta is not None:
+            current_config["wled"]["delta"] = config.wled_delta
         
         # Actualizar animación
         if config.animation_loop is not None:
             current_config["animation"]["loop"] = config.animation_loop
         if config.animation_frame_delay is not None:
             current_config["animation"]["frame_delay"] = max(50, config.animation_frame_delay)  # Mínimo 50ms
+        if config.animation_stream_memory_mb is not None:
+            current_config["animation"]["stream_memory_mb"] = max(1, config.animation_stream_memory_mb)
+        
+        # Actualizar canvas de varios controladores
+        if config.canvas is not None:
+            for tile in config.canvas.tiles:
+                if tile.x + tile.width > config.canvas.width or tile.y + tile.height > config.canvas.height:
+                    raise HTTPException(status_code=400, detail=f"El tile {tile.ip} se sale del canvas")
+            current_config["canvas"] = config.canvas.model_dump()
         
-        config_service.save(current_config)
+        # Los suscriptores (caché de frames y reproductores) reaccionan al cambio de matriz o transformación
+        current_config = config_service.save(current_config)
         
         return {
             "success": True,
             "message": "Configuración guardada exitosamente",
             "data": current_config
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,62 @@
+from fastapi import APIRouter
+from app.services.canvas import CanvasOutput
+from app.services.config import config_service
+from app.services.http_pool import connection_manager
+from app.services.player import player_manager
+
+router = APIRouter(prefix="/api/devices", tags=["devices"])
+
+@router.get("/connections")
+async def get_connections():
+    """Estadísticas de las sesiones HTTP persistentes (peticiones, reutilización de conexiones, timeouts)"""
+    return {
+        "success": True,
+        "data": connection_manager.stats()
+    }
+
+@router.get("/canvas")
+async def get_canvas_stats():
+    """Latencia de envío por tile del canvas, para localizar un controlador lento"""
+    player = player_manager.find(config_service.load())
+    if player is None or not isinstance(player.output, CanvasOutput):
+        return {"success": True, "data": None}
+    return {
+        "success": True,
+        "data": player.output.stats()
+    }
+
+@router.get("/delta")
+async def get_delta_stats():
+    """Frames completos/delta y bytes ahorrados por salida HTTP con envío delta"""
+    data = {}
+    for key, player in player_manager.players.items():
+        if isinstance(player.output, CanvasOutput):
+            data[key] = {tile.name: tile.wled.delta_stats() for tile in player.output.tiles}
+        else:
+            data[key] = player.output.delta_stats()
+    return {
+        "success": True,
+        "data": data
+    }
+
+@router.get("/health")
+async def get_output_health():
+    """Conexión por salida (y por tile del canvas): online, failing u offline, errores seguidos y próximo reintento"""
+    return {
+        "success": True,
+        "data": {key: player.output.health_status() for key, player in player_manager.players.items()}
+    }
+
+@router.get("/rate")
+async def get_output_rate():
+    """Ritmo máximo elegido por salida (y por tile del canvas), con su motivo, RTT, errores y /json/info"""
+    data = {}
+    for key, player in player_manager.players.items():
+        if isinstance(player.output, CanvasOutput):
+            data[key] = {tile.name: tile.wled.rate_status() for tile in player.output.tiles}
+        else:
+            data[key] = player.output.rate_status()
+    return {
+        "success": True,
+        "data": data
+    }
@@ -0,0 +1,81 @@
+import asyncio
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field
+from app.services.canvas import canvas_tiles, frame_geometry
+from app.services.config import config_service
+from app.services.effects import DEFAULT_FPS, MAX_FPS, EffectFrames, check_budget, list_effects
+from app.services.player import player_manager
+
+router = APIRouter(prefix="/api/effects", tags=["effects"])
+
+class EffectRequest(BaseModel):
+    params: dict = {}
+    fps: float = Field(default=DEFAULT_FPS, gt=0, le=MAX_FPS)
+
+def effect_image_id(name: str) -> str:
+    return f"effect:{name}"
+
+@router.get("")
+async def get_effects():
+    """Efectos disponibles y sus parámetros por defecto"""
+    return {
+        "success": True,
+        "data": list_effects()
+    }
+
+@router.get("/status")
+async def get_effects_status():
+    """Efecto en reproducción por salida, tiempo de render y si supera el presupuesto por frame"""
+    return {
+        "success": True,
+        "data": {
+            key: player.frames.status()
+            for key, player in player_manager.players.items()
+            if isinstance(player.frames, EffectFrames)
+        }
+    }
+
+@router.post("/stop")
+async def stop_effect():
+    player = player_manager.find(config_service.load())
+    if player is not None and isinstance(player.frames, EffectFrames):
+        player.stop()
+    return {"success": True, "message": "Efecto detenido"}
+
+@router.post("/{name}/check")
+async def check_effect(name: str, request: EffectRequest):
+    """Renderiza unos frames a la resolución configurada y comprueba si caben en el presupuesto"""
+    width, height = frame_geometry(config_service.load())
+    try:
+        result = await asyncio.to_thread(check_budget, name, width, height, request.params, request.fps)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "success": True,
+        "data": result
+    }
+
+@router.post("/{name}/play")
+async def play_effect(name: str, request: EffectRequest):
+    """Reproduce un efecto en la salida configurada hasta que se detenga o se reproduzca otra cosa"""
+    config = config_service.load()
+    if not config.get("wled", {}).get("ip") and not canvas_tiles(config):
+        raise HTTPException(status_code=400, detail="WLED no configurado")
+    width, height = frame_geometry(config)
+    try:
+        budget = await asyncio.to_thread(check_budget, name, width, height, request.params, request.fps)
+        frames = EffectFrames(name, width, height, request.params, request.fps)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    player = await player_manager.get(config)
+    player.play(effect_image_id(name), frames, loop=True)
+    player.controller = frames  # Recrea el efecto si cambia el tamaño de la matriz
+    message = f"Reproduciendo efecto {name}"
+    if not budget["within_budget"]:
+        message += f" (aviso: {budget['render_ms_p95']} ms por frame, por encima del presupuesto de {budget['budget_ms']} ms)"
+    return {
+        "success": True,
+        "message": message,
+        "data": {"budget": budget, **frames.status()}
+    }
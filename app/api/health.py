@@ -1,7 +1,82 @@
+import asyncio
+import logging
+import aiohttp
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app.services.effects import EffectFrames
+from app.services.jobs import job_queue
+from app.services.metrics import event_loop_lag, metrics, players_playing, jobs_pending
+from app.services.playback_proxy import playback_client
+from app.services.player import PLAYING, player_manager
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
+# /metrics de la API con el proceso de reproducción aparte (app.main con PLAYBACK_SOCKET)
+api_router = APIRouter()
+
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+ENGINE_METRICS_TIMEOUT = 2.0
+
+# Umbrales a partir de los cuales /health informa "degraded"
+MAX_LATENESS_P95_MS = 50.0  # Retraso p95 de los envíos respecto a su deadline
+MAX_DROPPED_RATIO = 0.1  # Fracción de frames saltados en la reproducción actual
+MAX_LOOP_LAG = 0.1  # Segundos de retraso del event loop
+
+def playback_problems() -> list:
+    """Dispositivos sin conexión y reproducciones que van por detrás de su calendario"""
+    problems = []
+    for key, player in player_manager.players.items():
+        if not player.output.online:
+            problems.append(f"{key}: dispositivo sin conexión")
+        if player.state != PLAYING:
+            continue
+        stats = player.stats.snapshot()
+        if stats["lateness_ms"]["p95"] > MAX_LATENESS_P95_MS:
+            problems.append(f"{key}: retraso p95 de {stats['lateness_ms']['p95']} ms")
+        if isinstance(player.frames, EffectFrames) and player.frames.status()["over_budget"]:
+            problems.append(f"{key}: el efecto {player.frames.name} supera el presupuesto de render por frame")
+        total = stats["frames_sent"] + stats["frames_dropped"]
+        if total and stats["frames_dropped"] / total > MAX_DROPPED_RATIO:
+            problems.append(f"{key}: {stats['frames_dropped']} de {total} frames saltados")
+    return problems
 
 @router.get("/health")
-def health_check():
-    return {"status": "ok"}
+async def health_check():
+    """ok, o degraded con los motivos si hay dispositivos sin conexión o la reproducción o el event loop van con retraso"""
+    problems = playback_problems()
+    if event_loop_lag.value() > MAX_LOOP_LAG:
+        problems.append(f"event loop con {event_loop_lag.value() * 1000:.0f} ms de retraso")
+    if not problems:
+        return {"status": "ok"}
+    return {"status": "degraded", "problems": problems}
+
+async def update_gauges():
+    players_playing.set(sum(1 for player in player_manager.players.values() if player.state == PLAYING))
+    stats = await asyncio.to_thread(job_queue.stats)  # Consulta SQLite: fuera del event loop
+    jobs_pending.set(stats["queued"] + stats["running"])
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics(format: str = "text"):
+    """Métricas en formato de texto de Prometheus (en el event loop, como los reproductores que recorre).
+    format=json devuelve los valores sin formatear para que la API los sume a los suyos."""
+    await update_gauges()
+    if format == "json":
+        return JSONResponse(metrics.snapshot())
+    return PlainTextResponse(metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
+@api_router.get("/metrics", response_class=PlainTextResponse)
+async def get_merged_metrics():
+    """Métricas del proceso de reproducción, de este worker y de los demás workers de la API
+    (los indicadores de reproductores y trabajos vienen del proceso de reproducción)"""
+    snapshots = []
+    try:
+        async with playback_client.session.get(
+            "http://playback/metrics", params={"format": "json"}, timeout=aiohttp.ClientTimeout(total=ENGINE_METRICS_TIMEOUT)
+        ) as response:
+            snapshots.append(await response.json())
+    except (aiohttp.ClientError, OSError, asyncio.TimeoutError, ValueError) as e:
+        logger.warning(f"Playback process metrics unavailable: {e}")
+    await asyncio.to_thread(metrics.publish)
+    snapshots.extend(await asyncio.to_thread(metrics.collect))
+    return PlainTextResponse(metrics.render(snapshots), media_type=METRICS_CONTENT_TYPE)
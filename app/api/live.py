@@ -0,0 +1,68 @@
+import logging
+import time
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from app.services.canvas import canvas_tiles
+from app.services.config import config_service
+from app.services.live import LiveClient, live_manager
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/live", tags=["live"])
+
+STATS_INTERVAL = 1.0  # Segundos entre mensajes de estadísticas al cliente
+
+@router.get("/status")
+async def get_live_status():
+    """Relays en directo por salida y fps de entrada/salida de cada cliente"""
+    return {
+        "success": True,
+        "data": live_manager.status()
+    }
+
+@router.websocket("/ws")
+async def live_frames(websocket: WebSocket):
+    """Frames en directo: cada mensaje binario es un frame RGB (ancho x alto x 3 bytes, por filas)
+    del tamaño de la matriz. El servidor responde con estadísticas JSON cada segundo."""
+    await websocket.accept()
+    config = config_service.load()
+    if not config.get("wled", {}).get("ip") and not canvas_tiles(config):
+        await websocket.send_json({"success": False, "message": "WLED no configurado"})
+        await websocket.close(code=1011)
+        return
+
+    client = LiveClient(f"{websocket.client.host}:{websocket.client.port}" if websocket.client else None)
+    relay = await live_manager.connect(config, client)
+    height, width, _ = relay.shape
+    await websocket.send_json({
+        "success": True,
+        "message": "Conectado",
+        "data": {"client_id": client.id, "width": width, "height": height, "frame_bytes": relay.frame_size}
+    })
+
+    last_stats = time.monotonic()
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            data = message.get("bytes")
+            if data is None:
+                continue  # Los mensajes de texto se ignoran
+            if not relay.running:
+                await websocket.send_json({"success": False, "message": "La salida se está usando para otra reproducción"})
+                await websocket.close(code=1013)
+                break
+            if not relay.submit(client, data):
+                await websocket.send_json({
+                    "success": False,
+                    "message": f"Frame de {len(data)} bytes; se esperaban {relay.frame_size}"
+                })
+            now = time.monotonic()
+            if now - last_stats >= STATS_INTERVAL:
+                last_stats = now
+                await websocket.send_json({"success": True, "data": client.stats()})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await live_manager.disconnect(relay, client)
+        logger.info(f"Live client {client.id} disconnected ({client.received} received, {client.sent} sent, {client.dropped} dropped)")
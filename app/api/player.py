@@ -0,0 +1,109 @@
+import json
+
+from fastapi import APIRouter, Body, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from app.services.config import config_service
+from app.services.player import player_manager, PLAYING
+
+router = APIRouter(prefix="/api/player", tags=["player"])
+
+PROGRESS_INTERVAL = 0.25  # Segundos entre actualizaciones de posición mientras se reproduce
+KEEPALIVE_INTERVAL = 15.0  # Segundos sin cambios antes de enviar un comentario para mantener la conexión
+
+
+def players_status() -> dict:
+    return {key: player.status() for key, player in player_manager.players.items()}
+
+
+def configured_player():
+    """Reproductor de la salida configurada; 404 si todavía no existe"""
+    if not config_service.exists():
+        raise HTTPException(status_code=400, detail="Configuración no encontrada")
+    player = player_manager.find(config_service.load())
+    if player is None:
+        raise HTTPException(status_code=404, detail="No hay reproductor para la salida configurada")
+    return player
+
+
+@router.get("/status")
+async def get_player_status():
+    """Estado de los reproductores: asset actual, frame, fps conseguidos y retraso"""
+    return {
+        "success": True,
+        "data": players_status()
+    }
+
+
+@router.get("/events")
+async def player_events(request: Request):
+    """Server-Sent Events con el estado de los reproductores: un evento en cada cambio de
+    estado o asset y, mientras hay algo reproduciéndose, la posición cada PROGRESS_INTERVAL"""
+
+    async def stream():
+        yield f"data: {json.dumps(players_status())}\n\n"
+        while not await request.is_disconnected():
+            playing = any(player.state == PLAYING for player in player_manager.players.values())
+            changed = await player_manager.wait_changed(PROGRESS_INTERVAL if playing else KEEPALIVE_INTERVAL)
+            if changed or playing:
+                yield f"data: {json.dumps(players_status())}\n\n"
+            else:
+                yield ": keepalive\n\n"
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/pause")
+async def pause_player():
+    try:
+        player = configured_player()
+        player.pause()
+        return {"success": True, "message": "Reproducción pausada", "data": player.status()}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/resume")
+async def resume_player():
+    try:
+        player = configured_player()
+        player.resume()
+        return {"success": True, "message": "Reproducción reanudada", "data": player.status()}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/stop")
+async def stop_player():
+    try:
+        player = configured_player()
+        player.stop()
+        return {"success": True, "message": "Reproducción detenida", "data": player.status()}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/seek")
+async def seek_player(body: dict = Body(...)):
+    """Salta al frame indicado ({"frame": n}); se aplica en el siguiente ciclo del reproductor"""
+    try:
+        frame = body.get("frame")
+        if not isinstance(frame, int):
+            raise HTTPException(status_code=400, detail="frame debe ser un entero")
+        player = configured_player()
+        if not player.seek(frame):
+            raise HTTPException(status_code=409, detail="No hay ninguna animación cargada")
+        return {"success": True, "message": f"Frame {player.index}", "data": player.status()}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
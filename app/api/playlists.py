@@ -0,0 +1,102 @@
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field
+from typing import List
+from app.services.canvas import canvas_tiles
+from app.services.catalog import asset_catalog
+from app.services.config import config_service
+from app.services.playlists import playlist_manager
+
+router = APIRouter(prefix="/api/playlists", tags=["playlists"])
+
+class PlaylistEntry(BaseModel):
+    asset_id: str
+    duration_ms: int = Field(default=None, ge=100)  # Estáticas: tiempo en pantalla; animaciones: se repiten hasta cubrirlo
+    repeat: int = Field(default=1, ge=1)  # Animaciones sin duración: número de pasadas
+
+class PlaylistData(BaseModel):
+    name: str
+    entries: List[PlaylistEntry] = Field(min_length=1)
+    loop: bool = False
+    crossfade_ms: int = Field(default=0, ge=0, le=5000)  # 0 = corte directo
+
+def validate_entries(data: PlaylistData):
+    missing = [entry.asset_id for entry in data.entries if asset_catalog.get(entry.asset_id) is None]
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Assets no encontrados: {', '.join(missing)}")
+
+def get_playlist(playlist_id: str) -> dict:
+    playlist = playlist_manager.store.get(playlist_id)
+    if playlist is None:
+        raise HTTPException(status_code=404, detail="Playlist no encontrada")
+    return playlist
+
+@router.get("")
+async def list_playlists():
+    """Lista las playlists guardadas"""
+    return {
+        "success": True,
+        "data": playlist_manager.store.list()
+    }
+
+@router.post("")
+async def create_playlist(data: PlaylistData):
+    """Crea una playlist"""
+    validate_entries(data)
+    return {
+        "success": True,
+        "message": "Playlist creada",
+        "data": playlist_manager.store.create(data.model_dump())
+    }
+
+@router.get("/status")
+async def get_playlists_status():
+    """Playlist en reproducción por salida y entrada actual"""
+    return {
+        "success": True,
+        "data": playlist_manager.status()
+    }
+
+@router.post("/stop")
+async def stop_playlist():
+    """Detiene la playlist de la salida configurada"""
+    await playlist_manager.stop(config_service.load())
+    return {"success": True, "message": "Playlist detenida"}
+
+@router.get("/{playlist_id}")
+async def read_playlist(playlist_id: str):
+    return {
+        "success": True,
+        "data": get_playlist(playlist_id)
+    }
+
+@router.put("/{playlist_id}")
+async def update_playlist(playlist_id: str, data: PlaylistData):
+    """Sustituye nombre, entradas y opciones de una playlist"""
+    get_playlist(playlist_id)
+    validate_entries(data)
+    return {
+        "success": True,
+        "message": "Playlist actualizada",
+        "data": playlist_manager.store.update(playlist_id, data.model_dump())
+    }
+
+@router.delete("/{playlist_id}")
+async def delete_playlist(playlist_id: str):
+    if not playlist_manager.store.delete(playlist_id):
+        raise HTTPException(status_code=404, detail="Playlist no encontrada")
+    return {"success": True, "message": "Playlist eliminada"}
+
+@router.post("/{playlist_id}/play")
+async def play_playlist(playlist_id: str):
+    """Reproduce la playlist en la salida configurada (WLED único o canvas)"""
+    playlist = get_playlist(playlist_id)
+    config = config_service.load()
+    if not config.get("wled", {}).get("ip") and not canvas_tiles(config):
+        raise HTTPException(status_code=400, detail="WLED no configurado")
+
+    runner = await playlist_manager.play(playlist, config)
+    return {
+        "success": True,
+        "message": f"Reproduciendo playlist {playlist['name']}",
+        "data": runner.status()
+    }
@@ -0,0 +1,105 @@
+import asyncio
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field
+from app.services.canvas import canvas_tiles, frame_geometry
+from app.services.config import config_service
+from app.services.effects import DEFAULT_FPS, MAX_FPS
+from app.services.player import player_manager
+from app.services.text import DEFAULTS, TextFrames, list_fonts
+
+router = APIRouter(prefix="/api/text", tags=["text"])
+
+TEXT_IMAGE_ID = "text"
+
+class TextRequest(BaseModel):
+    text: str = DEFAULTS["text"]
+    font: str = DEFAULTS["font"]
+    color: str = DEFAULTS["color"]
+    background: str = DEFAULTS["background"]
+    speed: float = DEFAULTS["speed"]  # Columnas por segundo; negativo hacia la derecha, 0 fijo
+    gap: int = None  # Columnas entre repeticiones (por defecto el ancho de la matriz)
+    clock: bool = False  # text es un formato de strftime, p.ej. "%H:%M"
+    fps: float = Field(default=DEFAULT_FPS, gt=0, le=MAX_FPS)
+
+class TextUpdate(BaseModel):
+    text: str = None
+    font: str = None
+    color: str = None
+    background: str = None
+    speed: float = None
+    gap: int = None
+    clock: bool = None
+
+def playing_text():
+    """TextFrames en reproducción en la salida configurada, o None"""
+    player = player_manager.find(config_service.load())
+    if player is not None and isinstance(player.frames, TextFrames):
+        return player.frames
+    return None
+
+@router.get("/fonts")
+async def get_fonts():
+    """Fuentes disponibles: la de Pillow y las .ttf/.otf de data/fonts y del sistema (se vuelven a buscar)"""
+    fonts = await asyncio.to_thread(list_fonts, True)
+    return {
+        "success": True,
+        "data": {"fonts": fonts, "defaults": DEFAULTS}
+    }
+
+@router.get("/status")
+async def get_text_status():
+    """Texto en reproducción por salida"""
+    return {
+        "success": True,
+        "data": {
+            key: player.frames.status()
+            for key, player in player_manager.players.items()
+            if isinstance(player.frames, TextFrames)
+        }
+    }
+
+@router.post("/play")
+async def play_text(request: TextRequest):
+    """Muestra un texto (fijo o en scroll) en la salida configurada hasta que se reproduzca otra cosa"""
+    config = config_service.load()
+    if not config.get("wled", {}).get("ip") and not canvas_tiles(config):
+        raise HTTPException(status_code=400, detail="WLED no configurado")
+    width, height = frame_geometry(config)
+    params = request.model_dump(exclude={"fps"})
+    try:
+        # La primera vez con una fuente y altura se rasteriza el atlas: fuera del event loop
+        frames = await asyncio.to_thread(TextFrames, width, height, params, request.fps)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    player = await player_manager.get(config)
+    player.play(TEXT_IMAGE_ID, frames, loop=True)
+    player.controller = frames  # Recompone el texto si cambia el tamaño de la matriz
+    return {
+        "success": True,
+        "message": "Mostrando texto",
+        "data": frames.status()
+    }
+
+@router.post("/update")
+async def update_text(request: TextUpdate):
+    """Cambia en directo los parámetros indicados del texto en reproducción, sin reiniciar el scroll"""
+    frames = playing_text()
+    if frames is None:
+        raise HTTPException(status_code=409, detail="No se está mostrando ningún texto")
+    try:
+        await asyncio.to_thread(frames.update, request.model_dump(exclude_unset=True))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "success": True,
+        "message": "Texto actualizado",
+        "data": frames.status()
+    }
+
+@router.post("/stop")
+async def stop_text():
+    player = player_manager.find(config_service.load())
+    if player is not None and isinstance(player.frames, TextFrames):
+        player.stop()
+    return {"success": True, "message": "Texto detenido"}
@@ -1,193 +1,342 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Body, BackgroundTasks
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Body, Query
+from fastapi import Request, Response
+from fastapi.responses import FileResponse, JSONResponse
 from pathlib import Path
 import json
 from datetime import datetime
 import uuid
-from PIL import Image
-import io
+import hashlib
 import logging
-import base64
-from app.services.wled_service import WledService, get_wled_config_from_file
+import asyncio
+import os
+import shutil
+from app.services.canvas import canvas_tiles, frame_geometry
+from app.services.config import config_service
+from app.services.video import VIDEO_SUFFIXES, save_upload, extract_poster
+from app.services.frame_store import frame_store, STREAM_MEMORY_MB
+from app.services.catalog import artifact_key, asset_catalog, describe_asset
+from app.services.blobs import blob_key, blob_store
+from app.services.player import player_manager, PAUSED
+from app.services.jobs import job_queue, JobQueueFull
+from app.services.processing import process_gif_file
+from app.services.metrics import preview_cache_requests
+from app.services.previews import PREVIEW_MAX_SIZE, build_preview, load_manifest, sprite_path
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/upload", tags=["upload"])
+# Rutas que usan el reproductor: las sirve el proceso de reproducción (app.engine)
+playback_router = APIRouter(prefix="/api/upload", tags=["upload"])
 
 ASSETS_DIR = Path(__file__).parent.parent.parent / "data" / "assets"
+STAGING_DIR = Path(__file__).parent.parent.parent / "data" / "cache" / "uploads"
+CACHE_CONTROL = "public, no-cache"  # El navegador guarda la respuesta pero la revalida con el ETag (304)
 
-# Control global de animaciones activas
-active_animations = {}  # {image_id: True/False}
+def not_modified(request: Request, etag: str) -> bool:
+    """True si el navegador ya tiene esta versión (If-None-Match)"""
+    if_none_match = request.headers.get("if-none-match", "")
+    return if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]
 
-def process_gif(image_data: bytes, matrix_width: int, matrix_height: int) -> bytes:
-    """Procesa un GIF redimensionándolo manteniendo la animación"""
+async def build_sprite(asset: dict) -> dict:
+    """Sprite sheet y manifiesto del asset, generados en el pool de procesos la primera vez
+    (compartidos por todos los assets del mismo blob)"""
+    manifest = load_manifest(artifact_key(asset))
+    if manifest is not None:
+        preview_cache_requests.inc("hit")
+    else:
+        preview_cache_requests.inc("build")
+        manifest = await job_queue.run_cpu(
+            build_preview,
+            artifact_key(asset),
+            ASSETS_DIR / asset["filename"],
+            asset["frame_count"] or 1,
+            asset["width"] or PREVIEW_MAX_SIZE,
+            asset["height"] or PREVIEW_MAX_SIZE
+        )
+    return manifest
+
+def get_asset(image_id: str) -> dict:
+    """Asset del catálogo o 404"""
+    asset = asset_catalog.get(image_id)
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Imagen no encontrada")
+    return asset
+
+def save_reference(metadata: dict):
+    """Guarda la metadata del asset (la referencia al blob)"""
+    with open(ASSETS_DIR / f"{metadata['id']}_metadata.json", "w") as f:
+        json.dump(metadata, f, indent=2)
+
+async def process_upload(job, image_id: str, name: str, image_format: str, staging_path: Path, blob: str, suffix: str, geometry: tuple) -> dict:
+    """Trabajo de subida: si el blob ya existe solo se crea la referencia; si no, se procesa
+    el archivo fuera del event loop, se guarda como blob y se indexa"""
+    image_path = blob_store.path(blob, suffix)
+    poster_path = blob_store.poster_path(blob)
+    metadata = {
+        "id": image_id,
+        "name": name,
+        "filename": image_path.name,
+        "format": image_format,
+        "uploaded_at": datetime.now().isoformat(),
+        "blob": blob
+    }
     try:
-        gif = Image.open(io.BytesIO(image_data))
-        
-        # Obtener información del GIF
-        frames = []
-        durations = []
-        
+        async with blob_store.lock:
+            existing = blob_store.existing(blob)
+            if existing is not None:
+                # Subida repetida: misma metadata derivada, sin decodificar nada. El archivo es el
+                # del blob existente (los mismos bytes pueden llegar como .mov y como .mp4)
+                metadata["filename"] = existing["filename"]
+                metadata["format"] = existing["format"]
+                for key in ("frame_count", "duration_ms"):
+                    if existing[key] is not None:
+                        metadata[key] = existing[key]
+                save_reference(metadata)
+                asset_catalog.add({**existing, **metadata})
+                logger.info(f"Upload {image_id} reuses blob {blob[:12]} of asset {existing['id']}")
+                return {"id": image_id, "filename": existing["filename"], "blob": blob, "deduplicated": True}
+        
+        job.update(0.1, "processing")
+        # Se escribe en un temporal y se publica con rename: dos subidas iguales a la vez no se pisan
+        tmp_path = image_path.with_name(f"{image_path.name}.{image_id}.tmp")
+        if image_format == "gif":
+            # Redimensionado y recodificación del GIF en el pool de procesos
+            await job_queue.run_cpu(process_gif_file, staging_path, tmp_path, geometry[0], geometry[1])
+        else:
+            await asyncio.to_thread(shutil.move, staging_path, tmp_path)
+        await asyncio.to_thread(os.replace, tmp_path, image_path)
+        if image_format == "video":
+            # ffmpeg decodifica en streaming directamente al contenedor de frames del blob
+            packed = await frame_store.get_async(image_path, *geometry)
+            job.update(0.8, "poster")
+            await asyncio.to_thread(extract_poster, image_path, poster_path)
+            metadata["frame_count"] = len(packed)
+            metadata["duration_ms"] = sum(packed.durations)
+        
+        # Guardar metadata e indexar el asset (dimensiones, frames y tamaño) para no recorrer el directorio después
+        job.update(0.9, "indexing")
+        record = await asyncio.to_thread(describe_asset, image_path, metadata)
+        async with blob_store.lock:
+            save_reference(metadata)
+            asset_catalog.add(record)
+        
+        # Sprite sheet para la galería (si falla se vuelve a intentar al pedirlo)
+        job.update(0.95, "preview")
         try:
-            while True:
-                durations.append(gif.info.get('duration', 100))
-                
-                # Redimensionar frame manteniendo aspect ratio
-                img_aspect = gif.width / gif.height
-                matrix_aspect = matrix_width / matrix_height
-                
-                if img_aspect > matrix_aspect:
-                    new_height = matrix_height
-                    new_width = int(new_height * img_aspect)
-                else:
-                    new_width = matrix_width
-                    new_height = int(new_width / img_aspect)
-                
-                resized = gif.resize((new_width, new_height), Image.Resampling.LANCZOS)
-                
-                # Crear canvas con fondo
-                frame = Image.new('RGB', (matrix_width, matrix_height), (0, 0, 0))
-                x = (matrix_width - new_width) // 2
-                y = (matrix_height - new_height) // 2
-                frame.paste(resized, (x, y))
-                
-                frames.append(frame)
-                gif.seek(gif.tell() + 1)
-        except EOFError:
-            pass
-        
-        # Guardar como GIF animado
-        output = io.BytesIO()
-        frames[0].save(
-            output,
-            format='GIF',
-            save_all=True,
-            append_images=frames[1:] if len(frames) > 1 else [],
-            duration=durations,
-            loop=0,
-            optimize=False
-        )
-        return output.getvalue()
-    except Exception as e:
-        raise Exception(f"Error procesando GIF: {str(e)}")
+            await build_sprite(record)
+        except Exception as e:
+            logger.warning(f"Preview for {image_id} failed: {e}")
+        
+        return {"id": image_id, "filename": image_path.name, "blob": blob, "deduplicated": False}
+    except Exception:
+        async with blob_store.lock:
+            if asset_catalog.blob_references(blob) == 0:
+                blob_store.purge({"id": image_id, "blob": blob, "filename": image_path.name, "poster": poster_path.name})
+        raise
+    finally:
+        staging_path.unlink(missing_ok=True)
+        image_path.with_name(f"{image_path.name}.{image_id}.tmp").unlink(missing_ok=True)
 
 @router.post("")
 async def upload_image(image: UploadFile = File(...), name: str = Form(...), is_gif: str = Form(default="false")):
-    """Guarda una imagen procesada"""
+    """Guarda la subida y encola su procesado; el estado se consulta en /api/upload/jobs/{job_id}"""
     try:
-        # Asegurar que la carpeta existe
+        # Asegurar que las carpetas existen
         ASSETS_DIR.mkdir(parents=True, exist_ok=True)
+        STAGING_DIR.mkdir(parents=True, exist_ok=True)
         
         # Generar ID único para la imagen
         image_id = str(uuid.uuid4())[:8]
         
-        contents = await image.read()
+        # Detectar vídeo por el content-type o por la extensión
+        upload_suffix = Path(image.filename or "").suffix.lower()
+        is_video_file = (image.content_type or "").startswith("video/") or upload_suffix in VIDEO_SUFFIXES
         
         # Detectar si es GIF por el content-type o por el parámetro
-        is_gif_file = is_gif.lower() == "true" or image.content_type == "image/gif"
-        
-        logger.info(f"Upload request: name={name}, is_gif_param={is_gif}, content_type={image.content_type}, is_gif_file={is_gif_file}")
+        is_gif_file = not is_video_file and (is_gif.lower() == "true" or image.content_type == "image/gif")
         
-        # Cargar configuración para obtener dimensiones de matriz
-        config_path = ASSETS_DIR.parent / "config.json"
-        matrix_width, matrix_height = 20, 20
+        logger.debug(f"Upload request: name={name}, is_gif_param={is_gif}, content_type={image.content_type}, is_gif_file={is_gif_file}, is_video_file={is_video_file}")
         
-        if config_path.exists():
-            with open(config_path, "r") as f:
-                config = json.load(f)
-                matrix_width = config.get("matrix", {}).get("width", 20)
-                matrix_height = config.get("matrix", {}).get("height", 20)
+        # Configuración para obtener dimensiones de matriz (o del canvas)
+        config = config_service.load()
         
-        # Procesar según tipo
-        if is_gif_file:
-            image_data = process_gif(contents, matrix_width, matrix_height)
-            image_filename = f"{image_id}_{name}.gif"
+        if is_video_file:
+            image_format = "video"
+            suffix = upload_suffix if upload_suffix in VIDEO_SUFFIXES else ".mp4"
+        elif is_gif_file:
             image_format = "gif"
+            suffix = ".gif"
         else:
-            image_data = contents
-            image_filename = f"{image_id}_{name}.png"
             image_format = "png"
-        
-        # Guardar imagen
-        image_path = ASSETS_DIR / image_filename
-        with open(image_path, "wb") as f:
-            f.write(image_data)
-        
-        # Guardar metadata
-        metadata = {
-            "id": image_id,
-            "name": name,
-            "filename": image_filename,
-            "format": image_format,
-            "uploaded_at": datetime.now().isoformat()
-        }
-        
-        metadata_path = ASSETS_DIR / f"{image_id}_metadata.json"
-        with open(metadata_path, "w") as f:
-            json.dump(metadata, f, indent=2)
+            suffix = ".png"
+        
+        # Guardar la subida por bloques en la zona de staging, calculando su hash a la vez
+        staging_path = STAGING_DIR / f"{image_id}{upload_suffix or '.bin'}"
+        hasher = hashlib.sha256()
+        await save_upload(image, staging_path, hasher)
+        geometry = frame_geometry(config)
+        blob = blob_key(hasher.hexdigest(), image_format, geometry)
+        try:
+            job = job_queue.submit("upload", process_upload, image_id, name, image_format, staging_path, blob, suffix, geometry)
+        except JobQueueFull as e:
+            staging_path.unlink(missing_ok=True)
+            raise HTTPException(status_code=503, detail=f"Cola de procesamiento llena: {e}")
         
         return {
             "success": True,
-            "message": "Imagen guardada exitosamente",
+            "message": "Imagen en cola de procesamiento",
             "data": {
                 "id": image_id,
-                "filename": image_filename
+                "filename": f"{blob}{suffix}",
+                "blob": blob,
+                "job_id": job.id
             }
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/jobs")
+async def get_jobs():
+    """Trabajos de procesamiento recientes"""
+    return {
+        "success": True,
+        "data": job_queue.list(),
+        "stats": job_queue.stats()
+    }
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Estado y progreso de un trabajo de procesamiento"""
+    job = job_queue.snapshot(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    return {
+        "success": True,
+        "data": job
+    }
+
 @router.get("/images")
-async def get_images():
-    """Obtiene la lista de imágenes cargadas"""
+async def get_images(
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    sort: str = Query("uploaded_at"),
+    order: str = Query("desc", pattern="^(asc|desc)$")
+):
+    """Obtiene la lista de imágenes cargadas (paginada y ordenada desde el catálogo)"""
     try:
-        if not ASSETS_DIR.exists():
-            return {"success": True, "data": []}
-        
-        images = []
-        
-        # Buscar archivos de metadata
-        for metadata_file in ASSETS_DIR.glob("*_metadata.json"):
-            try:
-                with open(metadata_file, "r") as f:
-                    metadata = json.load(f)
-                images.append(metadata)
-            except:
-                pass
+        images, total = asset_catalog.list(offset, limit, sort, order == "desc")
         
         return {
             "success": True,
-            "data": images
+            "data": images,
+            "pagination": {
+                "offset": offset,
+                "limit": limit,
+                "total": total
+            }
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/catalog/rebuild")
+async def rebuild_catalog():
+    """Regenera el catálogo de assets a partir del directorio y borra los blobs sin referencias"""
+    try:
+        async with blob_store.lock:
+            result = await asyncio.to_thread(asset_catalog.rebuild)
+            result["orphans_removed"] = await asyncio.to_thread(blob_store.collect_orphans)
+        return {
+            "success": True,
+            "message": f"Catálogo regenerado ({result['indexed']} assets)",
+            "data": result
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.delete("/{image_id}")
 async def delete_image(image_id: str):
-    """Elimina una imagen"""
+    """Elimina una imagen; el archivo, los frames y la vista previa se borran con la última referencia al blob"""
     try:
-        # Buscar y eliminar imagen y metadata
-        for file in ASSETS_DIR.glob(f"{image_id}_*"):
-            file.unlink()
+        asset = get_asset(image_id)
+        async with blob_store.lock:
+            collected = await blob_store.release(asset)
         
         return {
             "success": True,
-            "message": "Imagen eliminada exitosamente"
+            "message": "Imagen eliminada exitosamente",
+            "data": {"blob_collected": collected}
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/preview/{image_id}")
-async def get_image_preview(image_id: str):
+async def get_image_preview(image_id: str, request: Request):
     """Obtiene la preview de una imagen"""
     try:
-        # Buscar archivos PNG o GIF (no metadata)
-        for pattern in [f"{image_id}_*.gif", f"{image_id}_*.png"]:
-            for file in ASSETS_DIR.glob(pattern):
-                if not str(file).endswith("_metadata.json"):
-                    return FileResponse(file, media_type="image/gif" if file.suffix == ".gif" else "image/png")
+        asset = get_asset(image_id)
         
-        raise HTTPException(status_code=404, detail="Imagen no encontrada")
+        # Los archivos de un asset no cambian: el id y el tamaño bastan como ETag
+        etag = f'"{image_id}-{asset["size"]}"'
+        headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+        if not_modified(request, etag):
+            return Response(status_code=304, headers=headers)
+        
+        # Vídeos: fotograma de portada
+        if asset["format"] == "video":
+            if not asset["poster"]:
+                raise HTTPException(status_code=404, detail="Imagen no encontrada")
+            return FileResponse(ASSETS_DIR / asset["poster"], media_type="image/jpeg", headers=headers)
+        
+        return FileResponse(ASSETS_DIR / asset["filename"], media_type="image/gif" if asset["format"] == "gif" else "image/png", headers=headers)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/{image_id}/sprite")
+async def get_image_sprite_manifest(image_id: str, request: Request):
+    """Manifiesto de la vista previa: tamaño de frame, columnas del sprite sheet y duraciones"""
+    try:
+        manifest = await build_sprite(get_asset(image_id))
+        etag = f'"{manifest["etag"]}"'
+        headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+        if not_modified(request, etag):
+            return Response(status_code=304, headers=headers)
+        
+        return JSONResponse({
+            "success": True,
+            "data": {
+                **manifest,
+                "sprite_url": f"/api/upload/{image_id}/sprite.png"
+            }
+        }, headers=headers)
+    except HTTPException:
+        raise
     except Exception as e:
+        logger.error(f"Error building preview: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/{image_id}/sprite.png")
+async def get_image_sprite(image_id: str, request: Request):
+    """Sprite sheet con todos los frames de la vista previa (admite Range)"""
+    try:
+        asset = get_asset(image_id)
+        manifest = await build_sprite(asset)
+        etag = f'"{manifest["etag"]}"'
+        headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+        if not_modified(request, etag):
+            return Response(status_code=304, headers=headers)
+        
+        return FileResponse(sprite_path(artifact_key(asset)), media_type="image/png", headers=headers)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error building preview: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/download/{filename}")
@@ -202,72 +351,53 @@ async def download_image(filename: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/send-to-wled/{image_id}")
+@playback_router.post("/send-to-wled/{image_id}")
 async def send_to_wled(image_id: str):
     """Envía una imagen al WLED"""
     try:
-        logger.info(f"Attempting to send image {image_id} to WLED")
+        logger.debug(f"Attempting to send image {image_id} to WLED")
         
         # Obtener configuración de WLED y matriz
-        config_path = ASSETS_DIR.parent / "config.json"
-        logger.info(f"Config path: {config_path}, exists: {config_path.exists()}")
-        
-        if not config_path.exists():
+        if not config_service.exists():
             logger.error("Config file not found")
             raise HTTPException(status_code=400, detail="Configuración no encontrada")
         
-        with open(config_path, "r") as f:
-            config = json.load(f)
+        config = config_service.load()
         
         wled_config = config.get("wled", {})
         matrix_config = config.get("matrix", {})
         
-        logger.info(f"WLED config: {wled_config}")
-        logger.info(f"Matrix config: {matrix_config}")
+        logger.debug(f"WLED config: {wled_config}")
+        logger.debug(f"Matrix config: {matrix_config}")
         
-        if not wled_config.get("ip"):
+        if not wled_config.get("ip") and not canvas_tiles(config):
             logger.error("WLED IP not configured")
             raise HTTPException(status_code=400, detail="WLED no configurado")
         
-        matrix_width = matrix_config.get("width", 20)
-        matrix_height = matrix_config.get("height", 20)
-        
-        # Buscar archivo de imagen
-        image_file = None
-        logger.info(f"Looking for image files for ID: {image_id}")
-        
-        for file in ASSETS_DIR.glob(f"{image_id}_*.gif"):
-            if not str(file).endswith("_metadata.json"):
-                image_file = file
-                logger.info(f"Found GIF: {image_file}")
-                break
-        
-        if not image_file:
-            for file in ASSETS_DIR.glob(f"{image_id}_*.png"):
-                if not str(file).endswith("_metadata.json"):
-                    image_file = file
-                    logger.info(f"Found PNG: {image_file}")
-                    break
-        
-        if not image_file:
-            logger.error(f"Image not found for ID: {image_id}")
-            raise HTTPException(status_code=404, detail="Imagen no encontrada")
-        
-        # Enviar a WLED
-        logger.info(f"Sending {image_file} to WLED at {wled_config.get('ip')}:{wled_config.get('port', 80)}")
-        
-        wled = WledService(
-            ip=wled_config.get("ip"),
-            port=wled_config.get("port", 80),
-            protocol=wled_config.get("protocol", "http")
-        )
+        # Tamaño de render (matriz única o canvas de varios tiles); la rotación, el espejo
+        # y el cableado los aplica la salida al enviar
+        geometry = frame_geometry(config)
+        
+        # Buscar archivo de imagen en el catálogo
+        image_file = ASSETS_DIR / get_asset(image_id)["filename"]
+        logger.debug(f"Found asset: {image_file}")
         
-        rotation = wled_config.get("rotation", 0)
-        mirror_v = wled_config.get("mirror_v", False)
-        mirror_h = wled_config.get("mirror_h", False)
-        logger.info(f"Applying rotation: {rotation}°, mirror_v: {mirror_v}, mirror_h: {mirror_h}")
+        packed = await frame_store.get_async(image_file, *geometry)
+        player = await player_manager.get(config)
         
-        success, message = await wled.send_image(image_file, matrix_width, matrix_height, rotation, mirror_v, mirror_h)
+        # Las animaciones se reproducen una vez en el reproductor del dispositivo
+        if len(packed) > 1:
+            player.play(image_id, packed, loop=False)
+            return {
+                "success": True,
+                "message": f"Animación enviada a WLED ({len(packed)} frames)"
+            }
+        
+        # Imagen estática: detiene la animación en curso para que no la sobrescriba
+        logger.debug(f"Sending {image_file} to WLED")
+        success, message = await player.show(image_id, packed.frame(0))
+        if success:
+            message = "Imagen enviada a WLED correctamente"
         
         logger.info(f"WLED result: success={success}, message={message}")
         
@@ -284,185 +414,70 @@ async def send_to_wled(image_id: str):
     except Exception as e:
         logger.error(f"Error sending to WLED: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
-@router.get("/{image_id}/frames")
-async def get_image_frames(image_id: str):
-    """Obtiene todos los frames de una imagen GIF en base64"""
-    try:
-        # Buscar la imagen
-        image_file = None
-        for file in ASSETS_DIR.glob(f"{image_id}_*"):
-            if str(file).endswith(".gif") and not str(file).endswith("_metadata.json"):
-                image_file = file
-                logger.info(f"Found GIF: {image_file}")
-                break
-        
-        if not image_file:
-            # Buscar PNG
-            for file in ASSETS_DIR.glob(f"{image_id}_*.png"):
-                if not str(file).endswith("_metadata.json"):
-                    image_file = file
-                    logger.info(f"Found PNG: {image_file}")
-                    break
-        
-        if not image_file:
-            raise HTTPException(status_code=404, detail="Imagen no encontrada")
-        
-        # Extraer frames
-        img = Image.open(image_file)
-        frames = []
-        
-        if image_file.suffix.lower() == '.gif' and hasattr(img, 'n_frames') and img.n_frames > 1:
-            # Es una animación GIF
-            try:
-                for i in range(img.n_frames):
-                    img.seek(i)
-                    duration = img.info.get('duration', 100)
-                    
-                    # Convertir a RGB si es necesario
-                    frame = img.convert('RGB')
-                    
-                    # Convertir a base64
-                    buffered = io.BytesIO()
-                    frame.save(buffered, format="PNG")
-                    frame_base64 = base64.b64encode(buffered.getvalue()).decode()
-                    
-                    frames.append({
-                        "data": f"data:image/png;base64,{frame_base64}",
-                        "duration": duration
-                    })
-            except EOFError:
-                pass
-        else:
-            # Es una imagen estática
-            if img.mode != 'RGB':
-                img = img.convert('RGB')
-            
-            buffered = io.BytesIO()
-            img.save(buffered, format="PNG")
-            frame_base64 = base64.b64encode(buffered.getvalue()).decode()
-            
-            frames.append({
-                "data": f"data:image/png;base64,{frame_base64}",
-                "duration": 100
-            })
-        
-        return {
-            "success": True,
-            "is_animated": len(frames) > 1,
-            "frames": frames
-        }
-    
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error getting frames: {str(e)}", exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
-
-async def run_animation_background(image_id: str, image_file: Path, matrix_width: int, matrix_height: int, rotation: int, mirror_v: bool, mirror_h: bool, animation_loop: bool, animation_frame_delay: int, wled_ip: str, wled_port: int, wled_protocol: str):
-    """Ejecuta la animación en background sin bloquear el servidor"""
-    try:
-        wled = WledService(
-            ip=wled_ip,
-            port=wled_port,
-            protocol=wled_protocol,
-            image_id=image_id,
-            should_continue=active_animations
-        )
-        await wled.send_image(
-            image_file, 
-            matrix_width, 
-            matrix_height, 
-            rotation, 
-            mirror_v, 
-            mirror_h,
-            animation_loop,
-            animation_frame_delay
-        )
-    except Exception as e:
-        logger.error(f"Error en animación background: {str(e)}")
-    finally:
-        # Limpiar la entrada de animaciones activas
-        if image_id in active_animations:
-            del active_animations[image_id]
-
 
-@router.post("/{image_id}/animate")
-async def animate_image(image_id: str, body: dict = Body(...), background_tasks: BackgroundTasks = None):
+@playback_router.post("/{image_id}/animate")
+async def animate_image(image_id: str, body: dict = Body(...)):
     """Envía frames de una animación GIF al WLED"""
     try:
-        action = body.get("action", "play")  # play, pause, stop
+        action = body.get("action", "play")  # play, pause, stop, seek
         
         # Obtener configuración WLED y animación
-        config_path = ASSETS_DIR.parent / "config.json"
-        if not config_path.exists():
+        if not config_service.exists():
             raise HTTPException(status_code=400, detail="Configuración no encontrada")
         
-        with open(config_path, "r") as f:
-            config = json.load(f)
-            matrix_width = config.get("matrix", {}).get("width", 20)
-            matrix_height = config.get("matrix", {}).get("height", 20)
+        config = config_service.load()
         
-        wled_config = get_wled_config_from_file(config_path)
+        geometry = frame_geometry(config)
         animation_config = config.get("animation", {"loop": False, "frame_delay": None})
         
-        logger.info(f"Animation config loaded: {animation_config}")
-        
-        # Buscar la imagen
-        image_file = None
-        for file in ASSETS_DIR.glob(f"{image_id}_*"):
-            if str(file).endswith(".gif") and not str(file).endswith("_metadata.json"):
-                image_file = file
-                break
+        logger.debug(f"Animation config loaded: {animation_config}")
         
-        if not image_file:
+        # Buscar la animación (GIF o vídeo)
+        asset = asset_catalog.get(image_id)
+        if asset is None or asset["format"] not in ("gif", "video"):
             raise HTTPException(status_code=404, detail="Imagen GIF no encontrada")
+        image_file = ASSETS_DIR / asset["filename"]
         
         # Manejar acciones
         if action == "stop":
-            # Eliminar de animaciones activas para detener
-            if image_id in active_animations:
-                del active_animations[image_id]
+            player = player_manager.find(config)
+            if player and player.image_id == image_id:
+                player.stop()
             return {"success": True, "message": "Animación detenida"}
         
         elif action == "pause":
-            # Pausar: establece a False pero no elimina
-            active_animations[image_id] = False
+            player = player_manager.find(config)
+            if player and player.image_id == image_id:
+                player.pause()
             return {"success": True, "message": "Animación pausada"}
         
+        elif action == "seek":
+            player = player_manager.find(config)
+            if player is None or player.image_id != image_id or not player.seek(int(body.get("frame", 0))):
+                raise HTTPException(status_code=409, detail="La animación no se está reproduciendo")
+            return {"success": True, "message": f"Frame {player.index}", "data": player.status()}
+        
         elif action == "play":
-            # Obtener parámetros de transformación
-            rotation = wled_config.get("rotation", 0)
-            mirror_v = wled_config.get("mirror_v", False)
-            mirror_h = wled_config.get("mirror_h", False)
-            animation_loop = animation_config.get("loop", False)
-            animation_frame_delay = animation_config.get("frame_delay", None)
+            player = await player_manager.get(config)
             
-            logger.info(f"Sending animation in background: image_id={image_id}, loop={animation_loop}, delay={animation_frame_delay}")
+            # Si estaba pausada, continuar desde el mismo frame
+            if player.image_id == image_id and player.state == PAUSED:
+                player.resume()
+                return {"success": True, "message": "Animación reanudada", "data": player.status()}
             
-            # Marcar como activa
-            active_animations[image_id] = True
+            animation_loop = animation_config.get("loop", False)
+            animation_frame_delay = animation_config.get("frame_delay", None)
             
-            # Ejecutar animación en background sin bloquear
-            if background_tasks:
-                background_tasks.add_task(
-                    run_animation_background,
-                    image_id,
-                    image_file,
-                    matrix_width,
-                    matrix_height,
-                    rotation,
-                    mirror_v,
-                    mirror_h,
-                    animation_loop,
-                    animation_frame_delay,
-                    wled_config.get("ip"),
-                    wled_config.get("port", 80),
-                    wled_config.get("protocol", "http")
-                )
-                return {"success": True, "message": "Animación iniciada en background"}
+            logger.info(f"Starting animation: image_id={image_id}, loop={animation_loop}, delay={animation_frame_delay}")
             
-            # Fallback si no hay background_tasks (no debería pasar)
-            return {"success": False, "message": "No se pudo iniciar la animación"}
+            if asset["frame_count"]:
+                # Empieza con los primeros frames decodificados; el resto se decodifica mientras se reproduce
+                memory_limit = animation_config.get("stream_memory_mb", STREAM_MEMORY_MB) * 1024 * 1024
+                frames = await frame_store.stream(image_file, *geometry, asset["frame_count"], memory_limit)
+            else:
+                frames = await frame_store.get_async(image_file, *geometry)
+            player.play(image_id, frames, animation_loop, animation_frame_delay)
+            return {"success": True, "message": "Animación iniciada", "data": player.status()}
         
         return {"success": False, "message": f"Acción desconocida: {action}"}
     
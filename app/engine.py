@@ -0,0 +1,83 @@
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI
+from app.api.health import router as health_router
+from app.api.upload import playback_router as upload_playback_router
+from app.api.player import router as player_router
+from app.api.devices import router as devices_router
+from app.api.playlists import router as playlists_router
+from app.api.live import router as live_router
+from app.api.effects import router as effects_router
+from app.api.text import router as text_router
+from app.services.canvas import canvas_tiles
+from app.services.catalog import asset_catalog
+from app.services.config import config_service
+from app.services.http_pool import connection_manager
+from app.services.jobs import job_queue
+from app.services.live import live_manager
+from app.services.metrics import metrics
+from app.services.player import player_manager
+from app.services.playlists import playlist_manager
+
+# Proceso de reproducción: reproductores, playlists, efectos, texto y relays en directo, con sus
+# rutas de control. Con la API en varios workers (app.supervisor) se ejecuta aparte en un
+# socket Unix y los workers le reenvían estas rutas; sin socket, app.main las sirve en su proceso.
+
+PLAYBACK_ROUTERS = (
+    health_router,
+    upload_playback_router,
+    player_router,
+    devices_router,
+    playlists_router,
+    live_router,
+    effects_router,
+    text_router
+)
+
+_config_watch = None
+
+
+async def start_playback():
+    """Abre las sesiones de los dispositivos configurados y empieza a vigilar la configuración"""
+    global _config_watch
+    # Crear las sesiones persistentes de los dispositivos configurados antes del primer envío
+    config = config_service.load()
+    if config.get("wled", {}).get("ip") or canvas_tiles(config):
+        output = player_manager.create_output(config)
+        await output.open()
+        await output.close()
+    # Los cambios guardados desde los workers de la API llegan por el archivo
+    _config_watch = asyncio.create_task(config_service.watch(), name="config-watch")
+    metrics.start_loop_monitor()
+
+
+async def stop_playback():
+    """Detiene reproductores y conexiones con los dispositivos"""
+    global _config_watch
+    await metrics.stop_loop_monitor()
+    if _config_watch is not None:
+        _config_watch.cancel()
+        try:
+            await _config_watch
+        except asyncio.CancelledError:
+            pass
+        _config_watch = None
+    await playlist_manager.shutdown()
+    await live_manager.shutdown()
+    await player_manager.shutdown()
+    await connection_manager.close()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await asyncio.to_thread(asset_catalog.open)
+    await start_playback()
+    yield
+    await stop_playback()
+    await job_queue.shutdown()
+    asset_catalog.close()
+
+engine = FastAPI(title="WLED Media Engine (reproducción)", lifespan=lifespan)
+
+for router in PLAYBACK_ROUTERS:
+    engine.include_router(router)
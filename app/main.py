@@ -1,17 +1,57 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
-from app.api.health import router as health_router
 from app.api.config import router as config_router
+from app.api.health import api_router as api_metrics_router
 from app.api.upload import router as upload_router
+from app.engine import PLAYBACK_ROUTERS, start_playback, stop_playback
+from app.services.catalog import asset_catalog
+from app.services.jobs import job_queue
+from app.services.metrics import metrics
+from app.services.playback_proxy import PlaybackProxy, playback_client
 from pathlib import Path
 
-app = FastAPI(title="WLED Media Engine")
+# Socket del proceso de reproducción (lo define app.supervisor). Sin él, la reproducción
+# corre en este mismo proceso, que entonces no se puede ejecutar con varios workers.
+PLAYBACK_SOCKET = os.environ.get("PLAYBACK_SOCKET")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Abrir el catálogo de assets y repararlo si no coincide con el directorio
+    await asyncio.to_thread(asset_catalog.open)
+    if PLAYBACK_SOCKET:
+        playback_client.configure(PLAYBACK_SOCKET)
+        metrics.start_publisher()  # Para el worker que atienda /metrics
+    else:
+        await start_playback()
+    yield
+    # Detener trabajos de procesamiento y la reproducción (o la conexión con su proceso)
+    await job_queue.shutdown()
+    if PLAYBACK_SOCKET:
+        await metrics.stop_publisher()
+        await playback_client.close()
+    else:
+        await stop_playback()
+    asset_catalog.close()
+
+app = FastAPI(title="WLED Media Engine", lifespan=lifespan)
 
 # Registrar routers de API
-app.include_router(health_router)
 app.include_router(config_router)
 app.include_router(upload_router)
+if PLAYBACK_SOCKET:
+    # Las rutas de reproducción se reenvían al proceso de reproducción, salvo /metrics, que une
+    # las métricas de ese proceso con las de los workers (subidas, vistas previas, frames construidos)
+    app.include_router(api_metrics_router)
+    app.add_middleware(PlaybackProxy, routes=[
+        route for router in PLAYBACK_ROUTERS for route in router.routes if route.path != "/metrics"
+    ])
+else:
+    for router in PLAYBACK_ROUTERS:
+        app.include_router(router)
 
 # Montar static files en /static
 static_dir = Path(__file__).parent / "static"
@@ -21,4 +61,4 @@ app.mount("/static", StaticFiles(directory=static_dir), name="static")
 @app.get("/")
 async def root():
     index_file = static_dir / "index.html"
-    return FileResponse(index_file)
\ No newline at end of file
+    return FileResponse(index_file)
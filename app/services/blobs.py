@@ -0,0 +1,93 @@
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import time
+from pathlib import Path
+
+from app.services.catalog import ASSETS_DIR, METADATA_SUFFIX, artifact_key, asset_catalog
+from app.services.file_lock import FileLock
+from app.services.frame_store import frame_store
+from app.services.previews import purge_preview
+
+logger = logging.getLogger(__name__)
+
+# Archivos de assets por contenido: el archivo se guarda una vez como {sha256}{ext} y cada asset
+# es una referencia (metadata + fila del catálogo) con su propio nombre. Los derivados (frames
+# pre-renderizados, sprite de la galería, portada) se indexan por la clave del blob y se
+# comparten entre referencias; se borran con el blob al eliminar la última referencia.
+
+BLOB_NAME = re.compile(r"^([0-9a-f]{64})(_poster\.jpg|\.[A-Za-z0-9]+)$")
+ORPHAN_MIN_AGE = 3600  # Segundos; un blob más reciente puede ser de una subida que todavía no ha terminado
+LOCK_PATH = Path(__file__).parent.parent.parent / "data" / "cache" / "blobs.lock"
+
+
+def blob_key(source_digest: str, image_format: str, geometry: tuple) -> str:
+    """Clave del blob: el sha256 de la subida. Los GIF se redimensionan al subirlos, así que
+    su contenido depende también del tamaño de la matriz."""
+    if image_format == "gif":
+        return hashlib.sha256(f"{source_digest}:{geometry[0]}x{geometry[1]}".encode()).hexdigest()
+    return source_digest
+
+
+class BlobStore:
+    def __init__(self, assets_dir: Path = ASSETS_DIR, lock_path: Path = LOCK_PATH):
+        self.assets_dir = assets_dir
+        # Crear una referencia y liberar la última se serializan en todos los workers de la API:
+        # un borrado no puede recoger un blob que una subida duplicada acaba de reutilizar
+        self.lock = FileLock(lock_path)
+
+    def path(self, key: str, suffix: str) -> Path:
+        return self.assets_dir / f"{key}{suffix}"
+
+    def poster_path(self, key: str) -> Path:
+        return self.assets_dir / f"{key}_poster.jpg"
+
+    def existing(self, key: str):
+        """Asset del catálogo que ya referencia el blob y cuyo archivo sigue en disco, o None"""
+        asset = asset_catalog.find_blob(key)
+        if asset is not None and (self.assets_dir / asset["filename"]).exists():
+            return asset
+        return None
+
+    def purge(self, asset: dict):
+        """Borra el archivo del asset y sus derivados (sin comprobar referencias)"""
+        key = artifact_key(asset)
+        for filename in (asset["filename"], asset["poster"]):
+            if filename:
+                (self.assets_dir / filename).unlink(missing_ok=True)
+        frame_store.purge(key)
+        purge_preview(key)
+
+    async def release(self, asset: dict) -> bool:
+        """Elimina la referencia del asset; True si era la última y se ha recogido el blob.
+        Llamar con self.lock adquirido."""
+        (self.assets_dir / f"{asset['id']}{METADATA_SUFFIX}").unlink(missing_ok=True)
+        asset_catalog.remove(asset["id"])
+        if asset.get("blob") and asset_catalog.blob_references(asset["blob"]) > 0:
+            return False
+        await asyncio.to_thread(self.purge, asset)
+        return True
+
+    def collect_orphans(self) -> int:
+        """Borra blobs sin ninguna referencia (p.ej. tras un fallo a mitad de subida); devuelve cuántos"""
+        referenced = asset_catalog.blobs()
+        cutoff = time.time() - ORPHAN_MIN_AGE
+        removed = 0
+        with os.scandir(self.assets_dir) as entries:
+            names = [entry.name for entry in entries if entry.stat().st_mtime < cutoff]
+        for name in names:
+            match = BLOB_NAME.match(name)
+            if match is None or match.group(1) in referenced:
+                continue
+            (self.assets_dir / name).unlink(missing_ok=True)
+            frame_store.purge(match.group(1))
+            purge_preview(match.group(1))
+            removed += 1
+        if removed:
+            logger.info(f"Collected {removed} unreferenced blob files")
+        return removed
+
+
+blob_store = BlobStore()
@@ -0,0 +1,167 @@
+import asyncio
+import time
+from collections import deque
+
+import numpy as np
+
+from app.services.device_health import DeviceOffline
+from app.services.pixel_map import PixelLayout, logical_size
+from app.services.wled_service import WledService
+
+LATENCY_WINDOW = 120  # Envíos usados para la latencia por tile
+
+
+def canvas_tiles(config: dict) -> list:
+    """Tiles del canvas virtual; lista vacía si se usa un único dispositivo"""
+    return config.get("canvas", {}).get("tiles") or []
+
+
+def frame_geometry(config: dict) -> tuple:
+    """(ancho, alto) con los que se pre-renderizan los frames. La rotación, el espejo y el
+    cableado se aplican al enviar con el PixelLayout de cada dispositivo o tile; con rotación
+    de 90/270 se renderiza con ancho y alto intercambiados para que, al rotar, ocupe la matriz."""
+    if canvas_tiles(config):
+        canvas = config["canvas"]
+        return canvas.get("width", 20), canvas.get("height", 20)
+    matrix = config.get("matrix", {})
+    return logical_size(matrix.get("width", 20), matrix.get("height", 20), config.get("wled", {}).get("rotation", 0))
+
+
+class CanvasTile:
+    """Región del canvas que se envía a un controlador WLED"""
+
+    def __init__(self, tile_config: dict):
+        self.configure(tile_config)
+        self.wled = WledService(
+            ip=tile_config.get("ip"),
+            port=tile_config.get("port", 80),
+            protocol=tile_config.get("protocol", "http"),
+            udp_port=tile_config.get("udp_port"),
+            delta=tile_config.get("delta", True),
+            adaptive=True
+        )
+        self.frames_sent = 0
+        self.errors = 0
+        self._latency = deque(maxlen=LATENCY_WINDOW)
+
+    def configure(self, tile_config: dict):
+        """Región del canvas y orden físico de los LEDs (se puede cambiar en caliente)"""
+        self.x = tile_config.get("x", 0)
+        self.y = tile_config.get("y", 0)
+        self.width = tile_config["width"]
+        self.height = tile_config["height"]
+        self.layout = PixelLayout.from_config(tile_config)
+
+    @property
+    def name(self) -> str:
+        return self.wled.name
+
+    def slice(self, frame: np.ndarray) -> np.ndarray:
+        """LEDs del tile en orden físico: recorte, rotación, espejo y cableado en un solo gather"""
+        return self.layout.apply(frame, (self.x, self.y, self.width, self.height))
+
+    async def send(self, pixels: np.ndarray, hold: bool = False, timeout: float = None):
+        started = time.perf_counter()
+        try:
+            success, message = await self.wled.send_frame(pixels, hold, timeout)
+        except Exception as e:
+            success, message = False, f"{type(e).__name__}: {e}"
+        self._latency.append(time.perf_counter() - started)
+        if success:
+            self.frames_sent += 1
+        else:
+            self.errors += 1
+        return success, message
+
+    def stats(self) -> dict:
+        latency = sorted(self._latency)
+        return {
+            "device": self.name,
+            "region": [self.x, self.y, self.width, self.height],
+            "frames_sent": self.frames_sent,
+            "errors": self.errors,
+            "delta": self.wled.delta_stats(),
+            "rate": self.wled.rate_status(),
+            "health": self.wled.health_status(),
+            "latency_ms": {
+                "avg": round(sum(latency) / len(latency) * 1000, 2) if latency else 0.0,
+                "p95": round(latency[int(len(latency) * 0.95)] * 1000, 2) if latency else 0.0,
+                "max": round(latency[-1] * 1000, 2) if latency else 0.0
+            }
+        }
+
+
+class CanvasOutput:
+    """Canvas virtual repartido en varios controladores. Cada frame se recorta una vez y los
+    recortes se envían a todos los tiles a la vez, para que cambien en la misma ventana de frame.
+    Un tile lento solo retrasa su propio envío hasta el timeout por frame del pool HTTP, y
+    uno sin conexión deja de recibir frames mientras los demás siguen."""
+
+    def __init__(self, width: int, height: int, tiles: list):
+        self.width = width
+        self.height = height
+        self.tiles = [CanvasTile(tile) for tile in tiles]
+        self.ip = "canvas"
+        self.on_online = None  # Se llama sin argumentos cuando un tile vuelve a responder
+        for tile in self.tiles:
+            tile.wled.on_online = self._tile_online
+
+    async def open(self):
+        for tile in self.tiles:
+            await tile.wled.open()
+
+    async def close(self):
+        for tile in self.tiles:
+            await tile.wled.close()
+
+    async def send_frame(self, frame: np.ndarray, hold: bool = False, timeout: float = None):
+        tiles = [tile for tile in self.tiles if tile.wled.online]
+        if not tiles:
+            raise DeviceOffline("Todos los tiles están sin conexión")
+        slices = [tile.slice(frame) for tile in tiles]
+        results = await asyncio.gather(*(
+            tile.send(pixels, hold, timeout) for tile, pixels in zip(tiles, slices)
+        ))
+        failed = [f"{tile.name}: {message}" for tile, (success, message) in zip(tiles, results) if not success]
+        if failed:
+            return False, "; ".join(failed)
+        offline = len(self.tiles) - len(tiles)
+        return True, f"Frame enviado a {len(tiles)} tiles" + (f" ({offline} sin conexión)" if offline else "")
+
+    def _tile_online(self):
+        if self.on_online is not None:
+            self.on_online()
+
+    @property
+    def online(self) -> bool:
+        """Todos los tiles responden"""
+        return all(tile.wled.online for tile in self.tiles)
+
+    def health_status(self) -> dict:
+        return {tile.name: tile.wled.health_status() for tile in self.tiles}
+
+    @property
+    def min_interval(self) -> float:
+        """Los tiles cambian a la vez: manda el más lento"""
+        return max((tile.wled.min_interval for tile in self.tiles), default=0.0)
+
+    def rate_status(self):
+        """Ritmo del tile más lento, que es el que limita el canvas"""
+        statuses = [tile.wled.rate_status() for tile in self.tiles]
+        statuses = [status for status in statuses if status is not None]
+        return min(statuses, key=lambda status: status["target_fps"]) if statuses else None
+
+    def configure(self, config: dict):
+        """Actualiza tamaño, regiones y disposición de los tiles (mismos dispositivos, mismo orden)"""
+        canvas = config["canvas"]
+        self.width = canvas.get("width", 20)
+        self.height = canvas.get("height", 20)
+        for tile, tile_config in zip(self.tiles, canvas_tiles(config)):
+            tile.configure(tile_config)
+
+    def stats(self) -> dict:
+        return {
+            "width": self.width,
+            "height": self.height,
+            "tiles": [tile.stats() for tile in self.tiles]
+        }
@@ -0,0 +1,204 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+from PIL import Image
+
+from app.services.video import is_video, probe_stream
+
+logger = logging.getLogger(__name__)
+
+ASSETS_DIR = Path(__file__).parent.parent.parent / "data" / "assets"
+CATALOG_PATH = Path(__file__).parent.parent.parent / "data" / "cache" / "catalog.db"
+SCHEMA_VERSION = 2
+METADATA_SUFFIX = "_metadata.json"
+
+COLUMNS = ("id", "name", "filename", "format", "uploaded_at", "width", "height", "frame_count", "duration_ms", "size", "poster", "blob")
+SORT_COLUMNS = ("uploaded_at", "name", "size", "frame_count", "duration_ms")
+
+
+def artifact_key(asset: dict) -> str:
+    """Clave de los derivados (frames, sprite, portada): el blob compartido o, en assets
+    anteriores al almacenamiento por contenido, el id del asset"""
+    return asset.get("blob") or asset["id"]
+
+
+def describe_asset(path: Path, metadata: dict) -> dict:
+    """Completa la metadata de un asset con dimensiones, nº de frames, duración y tamaño en disco"""
+    record = {column: metadata.get(column) for column in COLUMNS}
+    record["size"] = path.stat().st_size if path.exists() else 0
+    poster = path.parent / f"{artifact_key(metadata)}_poster.jpg"
+    record["poster"] = poster.name if poster.exists() else None
+
+    if is_video(path):
+        try:
+            stream = probe_stream(path)
+            record["width"], record["height"] = stream.get("width"), stream.get("height")
+        except Exception as e:
+            logger.warning(f"No se pudo analizar {path.name}: {e}")
+        return record
+
+    try:
+        with Image.open(path) as img:
+            record["width"], record["height"] = img.size
+            record["frame_count"] = getattr(img, "n_frames", 1)
+            if record["frame_count"] > 1:
+                duration = 0
+                for index in range(record["frame_count"]):
+                    img.seek(index)
+                    duration += img.info.get("duration", 100)
+                record["duration_ms"] = duration
+    except Exception as e:
+        logger.warning(f"No se pudo analizar {path.name}: {e}")
+    return record
+
+
+class AssetCatalog:
+    """Índice persistente de assets (SQLite) para no recorrer el directorio en cada petición.
+
+    Los archivos *_metadata.json siguen siendo la fuente de verdad: el índice se
+    reconstruye a partir de ellos si falta, cambia de esquema o no coincide con el directorio.
+    """
+
+    def __init__(self, assets_dir: Path = ASSETS_DIR, path: Path = CATALOG_PATH):
+        self.assets_dir = assets_dir
+        self.path = path
+        self._db = None
+        self._lock = threading.Lock()
+
+    def open(self):
+        """Abre el índice y comprueba que coincide con el directorio de assets"""
+        with self._lock:
+            if self._db is not None:
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.row_factory = sqlite3.Row
+            self._db.execute("PRAGMA journal_mode=WAL")
+            if self._db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                self._db.executescript(f"""
+                    DROP TABLE IF EXISTS assets;
+                    CREATE TABLE assets (
+                        id TEXT PRIMARY KEY,
+                        name TEXT NOT NULL,
+                        filename TEXT NOT NULL,
+                        format TEXT NOT NULL,
+                        uploaded_at TEXT NOT NULL,
+                        width INTEGER,
+                        height INTEGER,
+                        frame_count INTEGER,
+                        duration_ms INTEGER,
+                        size INTEGER,
+                        poster TEXT,
+                        blob TEXT
+                    );
+                    CREATE INDEX assets_uploaded_at ON assets (uploaded_at);
+                    CREATE INDEX assets_blob ON assets (blob);
+                    CREATE INDEX assets_name ON assets (name);
+                    PRAGMA user_version = {SCHEMA_VERSION};
+                """)
+        self.check()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.open()
+        return self._db
+
+    def check(self) -> dict:
+        """Compara los ids del índice con los del directorio (solo nombres, sin abrir archivos)
+        y añade o elimina las entradas que no coinciden"""
+        db = self._connection()
+        on_disk = set()
+        if self.assets_dir.exists():
+            with os.scandir(self.assets_dir) as entries:
+                on_disk = {entry.name[:-len(METADATA_SUFFIX)] for entry in entries if entry.name.endswith(METADATA_SUFFIX)}
+        with self._lock:
+            indexed = {row[0] for row in db.execute("SELECT id FROM assets")}
+
+        missing = on_disk - indexed
+        stale = indexed - on_disk
+        for asset_id in missing:
+            try:
+                with open(self.assets_dir / f"{asset_id}{METADATA_SUFFIX}", "r") as f:
+                    metadata = json.load(f)
+                self.add(describe_asset(self.assets_dir / metadata["filename"], metadata))
+            except Exception as e:
+                logger.warning(f"Asset {asset_id} no indexado: {e}")
+        if stale:
+            with self._lock, db:
+                db.executemany("DELETE FROM assets WHERE id = ?", [(asset_id,) for asset_id in stale])
+        if missing or stale:
+            logger.info(f"Asset catalog repaired: {len(missing)} added, {len(stale)} removed")
+        return {"indexed": len(on_disk), "added": len(missing), "removed": len(stale)}
+
+    def rebuild(self) -> dict:
+        """Vacía el índice y lo vuelve a generar desde el directorio"""
+        db = self._connection()
+        with self._lock, db:
+            db.execute("DELETE FROM assets")
+        return self.check()
+
+    def add(self, record: dict):
+        db = self._connection()
+        values = [record.get(column) for column in COLUMNS]
+        with self._lock, db:
+            db.execute(
+                f"INSERT OR REPLACE INTO assets ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                values
+            )
+
+    def get(self, asset_id: str):
+        """Asset por id, o None si no existe"""
+        db = self._connection()
+        with self._lock:
+            row = db.execute("SELECT * FROM assets WHERE id = ?", (asset_id,)).fetchone()
+        return dict(row) if row else None
+
+    def find_blob(self, blob: str):
+        """Un asset que referencia el blob, o None"""
+        db = self._connection()
+        with self._lock:
+            row = db.execute("SELECT * FROM assets WHERE blob = ? LIMIT 1", (blob,)).fetchone()
+        return dict(row) if row else None
+
+    def blob_references(self, blob: str) -> int:
+        db = self._connection()
+        with self._lock:
+            return db.execute("SELECT COUNT(*) FROM assets WHERE blob = ?", (blob,)).fetchone()[0]
+
+    def blobs(self) -> set:
+        """Blobs con al menos una referencia"""
+        db = self._connection()
+        with self._lock:
+            return {row[0] for row in db.execute("SELECT DISTINCT blob FROM assets WHERE blob IS NOT NULL")}
+
+    def remove(self, asset_id: str):
+        db = self._connection()
+        with self._lock, db:
+            db.execute("DELETE FROM assets WHERE id = ?", (asset_id,))
+
+    def list(self, offset: int = 0, limit: int = 50, sort: str = "uploaded_at", descending: bool = True) -> tuple:
+        """Página de assets ordenada y número total de assets"""
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"Orden no soportado: {sort}")
+        db = self._connection()
+        direction = "DESC" if descending else "ASC"
+        with self._lock:
+            total = db.execute("SELECT COUNT(*) FROM assets").fetchone()[0]
+            rows = db.execute(
+                f"SELECT * FROM assets ORDER BY {sort} {direction}, id LIMIT ? OFFSET ?",
+                (limit, offset)
+            ).fetchall()
+        return [dict(row) for row in rows], total
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+asset_catalog = AssetCatalog()
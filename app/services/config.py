@@ -1,7 +1,25 @@
+import asyncio
+import copy
 import json
+import logging
+import os
+import threading
+import time
 from pathlib import Path
 
+logger = logging.getLogger(__name__)
+
+STAT_INTERVAL = 1.0  # Segundos entre comprobaciones de cambios externos del archivo
+
+
 class ConfigService:
+    """Configuración en memoria respaldada por data/config.json.
+
+    El archivo solo se vuelve a leer si cambia su mtime/tamaño (p.ej. editado a mano),
+    se guarda con escritura atómica (temporal + rename) y los cambios se notifican
+    a los suscriptores con (configuración anterior, configuración nueva).
+    """
+
     def __init__(self):
         # Camino correcto: desde /app/app/services a /app/data/config.json
         # __file__ = /app/app/services/config.py
@@ -9,24 +27,99 @@ class ConfigService:
         # parent.parent = /app/app
         # parent.parent.parent = /app
         self.config_path = Path(__file__).parent.parent.parent / "data" / "config.json"
-    
+        self._config = None
+        self._signature = None  # (mtime_ns, tamaño) del archivo leído
+        self._checked_at = 0.0
+        self._lock = threading.RLock()
+        self._subscribers = []
+
+    def _stat_signature(self):
+        try:
+            stat = self.config_path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _current(self) -> dict:
+        """Configuración cacheada, releyendo el archivo si ha cambiado en disco"""
+        with self._lock:
+            now = time.monotonic()
+            if self._config is not None and now - self._checked_at < STAT_INTERVAL:
+                return self._config
+            self._checked_at = now
+
+            signature = self._stat_signature()
+            if self._config is not None and signature == self._signature:
+                return self._config
+
+            previous = self._config
+            config = {}
+            if signature is not None:
+                with open(self.config_path, 'r') as f:
+                    config = json.load(f)
+            self._config = config
+            self._signature = signature
+
+        if previous is not None:
+            logger.info("Config file changed on disk, reloaded")
+            self._notify(previous, config)
+        return config
+
+    def exists(self) -> bool:
+        """True si hay archivo de configuración"""
+        self._current()
+        return self._signature is not None
+
     def load(self):
-        """Carga la configuración desde el archivo JSON"""
-        if self.config_path.exists():
-            with open(self.config_path, 'r') as f:
-                return json.load(f)
-        return {}
-    
+        """Copia de la configuración actual (se puede modificar sin afectar a la caché)"""
+        return copy.deepcopy(self._current())
+
     def save(self, config: dict):
-        """Guarda la configuración en el archivo JSON"""
-        self.config_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(self.config_path, 'w') as f:
-            json.dump(config, f, indent=2)
-        return config
-    
+        """Guarda la configuración de forma atómica y notifica a los suscriptores"""
+        with self._lock:
+            previous = self._current()
+            config = copy.deepcopy(config)
+            self.config_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.config_path.with_name(self.config_path.name + ".tmp")
+            with open(tmp_path, 'w') as f:
+                json.dump(config, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.config_path)
+            self._config = config
+            self._signature = self._stat_signature()
+            self._checked_at = time.monotonic()
+
+        self._notify(previous, config)
+        return copy.deepcopy(config)
+
+    async def watch(self):
+        """Vuelve a comprobar el archivo cada STAT_INTERVAL aunque nadie lea la configuración,
+        para que los suscriptores se enteren de los cambios guardados por otro proceso"""
+        while True:
+            await asyncio.sleep(STAT_INTERVAL)
+            try:
+                await asyncio.to_thread(self._current)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Config file not readable: {e}")
+
+    def subscribe(self, callback):
+        """Registra callback(anterior, nueva), llamado tras cada cambio de configuración"""
+        self._subscribers.append(callback)
+        return callback
+
+    def _notify(self, previous: dict, config: dict):
+        if previous == config:
+            return
+        for callback in self._subscribers:
+            try:
+                callback(previous, config)
+            except Exception as e:
+                logger.error(f"Config subscriber {callback} failed: {e}", exc_info=True)
+
     def get(self, key: str, default=None):
         """Obtiene un valor específico de la configuración"""
-        config = self.load()
+        config = self._current()
         keys = key.split('.')
         value = config
         for k in keys:
@@ -34,21 +127,20 @@ class ConfigService:
                 value = value.get(k)
             else:
                 return default
-        return value if value is not None else default
-    
+        return copy.deepcopy(value) if value is not None else default
+
     def set(self, key: str, value):
         """Establece un valor específico en la configuración"""
         config = self.load()
         keys = key.split('.')
         current = config
-        
+
         for k in keys[:-1]:
             if k not in current:
                 current[k] = {}
             current = current[k]
-        
+
         current[keys[-1]] = value
-        self.save(config)
-        return config
+        return self.save(config)
 
 config_service = ConfigService()
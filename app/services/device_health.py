@@ -0,0 +1,139 @@
+import asyncio
+import logging
+import time
+
+import aiohttp
+
+from app.services.metrics import device_online
+
+logger = logging.getLogger(__name__)
+
+# Estado de conexión por dispositivo: online → failing (algún error seguido) → offline.
+# Sin conexión no se intenta enviar ningún frame (el reproductor los salta en vez de esperar
+# el timeout de cada uno) y se consulta /json/info con una espera que se duplica en cada
+# intento fallido. Al responder, el dispositivo vuelve a estar online y recibe un frame completo.
+
+ONLINE = "online"
+FAILING = "failing"
+OFFLINE = "offline"
+
+FAILURE_THRESHOLD = 3  # Errores seguidos que dejan el dispositivo sin conexión
+OFFLINE_AFTER = 2.0  # ... o dos errores seguidos sin ningún envío correcto en este tiempo (UDP: sondas)
+RETRY_MIN = 0.5  # Segundos hasta el primer intento de reconexión; se duplica en cada fallo
+RETRY_MAX = 30.0
+PROBE_TIMEOUT = 1.0
+
+
+class DeviceOffline(Exception):
+    """El dispositivo está sin conexión: el frame no se ha intentado enviar"""
+
+
+class DeviceHealth:
+    """Estado de conexión de un dispositivo según el resultado de sus envíos"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.state = ONLINE
+        self.failures = 0  # Errores seguidos
+        self.last_error = None
+        self.last_success = time.monotonic()
+        self.offline_since = None
+        self.retry_delay = RETRY_MIN
+        self.retry_at = None
+        self.outages = 0
+        self.on_online = None  # Se llama sin argumentos al recuperar la conexión
+        self._session = None
+        self._task = None
+        device_online.set(1, name)
+
+    @property
+    def available(self) -> bool:
+        return self.state != OFFLINE
+
+    def start(self, session):
+        """Sesión HTTP con la que se sondea /json/info mientras el dispositivo está sin conexión"""
+        self._session = session
+        if self.state == OFFLINE:
+            self._start_reconnect()
+
+    async def stop(self):
+        self._session = None
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def record(self, ok: bool, error: str = None):
+        """Resultado de un envío o de una consulta al dispositivo"""
+        now = time.monotonic()
+        if ok:
+            self.failures = 0
+            self.last_success = now
+            was_offline = self.state == OFFLINE
+            self.state = ONLINE
+            if was_offline:
+                self._set_online(now)
+            return
+        self.failures += 1
+        self.last_error = error
+        if self.state == OFFLINE:
+            return
+        if self.failures >= FAILURE_THRESHOLD or (self.failures >= 2 and now - self.last_success >= OFFLINE_AFTER):
+            self._set_offline(now)
+        else:
+            self.state = FAILING
+
+    def _set_offline(self, now: float):
+        self.state = OFFLINE
+        self.offline_since = now
+        self.retry_delay = RETRY_MIN
+        self.outages += 1
+        device_online.set(0, self.name)
+        logger.warning(f"{self.name}: offline after {self.failures} consecutive failures ({self.last_error}), "
+                       f"skipping frames until it answers")
+        self._start_reconnect()
+
+    def _set_online(self, now: float):
+        device_online.set(1, self.name)
+        logger.info(f"{self.name}: back online after {now - self.offline_since:.1f} s")
+        self.offline_since = None
+        self.retry_at = None
+        if self.on_online is not None:
+            self.on_online()
+
+    def _start_reconnect(self):
+        if self._session is not None and self._task is None:
+            self._task = asyncio.create_task(self._reconnect(), name=f"reconnect-{self.name}")
+
+    async def _reconnect(self):
+        try:
+            while self.state == OFFLINE and self._session is not None:
+                self.retry_at = time.monotonic() + self.retry_delay
+                await asyncio.sleep(self.retry_delay)
+                self.retry_delay = min(self.retry_delay * 2, RETRY_MAX)
+                try:
+                    await self._session.get_json("/json/info", PROBE_TIMEOUT)
+                except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+                    self.last_error = f"{type(e).__name__}: {e}"
+                    continue
+                except ValueError:
+                    pass  # Responde, aunque no con JSON válido
+                self.record(True)
+        finally:
+            self._task = None
+
+    def status(self) -> dict:
+        now = time.monotonic()
+        return {
+            "device": self.name,
+            "state": self.state,
+            "online": self.available,
+            "consecutive_failures": self.failures,
+            "last_error": self.last_error,
+            "offline_seconds": round(now - self.offline_since, 1) if self.offline_since is not None else None,
+            "retry_in_seconds": round(max(self.retry_at - now, 0.0), 1) if self.retry_at is not None else None,
+            "outages": self.outages
+        }
@@ -0,0 +1,352 @@
+import logging
+import time
+from collections import deque
+
+import numpy as np
+
+from app.services.canvas import frame_geometry
+from app.services.metrics import effect_render_seconds
+
+logger = logging.getLogger(__name__)
+
+# Efectos procedurales calculados frame a frame con operaciones de NumPy sobre la matriz
+# completa (sin bucles por pixel). Se reproducen con el mismo Player que los assets.
+DEFAULT_FPS = 30
+MAX_FPS = 60
+BUDGET_FRACTION = 0.5  # Parte del intervalo de frame que puede usar el render; el resto es para el envío
+BUDGET_WINDOW = 120  # Frames usados para comprobar el presupuesto durante la reproducción
+BUDGET_WARMUP = 30  # Frames antes de avisar (la primera llamada calienta cachés)
+CHECK_FRAMES = 20  # Frames renderizados para comprobar el presupuesto antes de reproducir
+
+EFFECTS = {}  # {nombre: clase}
+
+
+def register_effect(cls):
+    """Registra un efecto (decorador); el nombre es cls.name"""
+    EFFECTS[cls.name] = cls
+    return cls
+
+
+def parse_color(value: str) -> np.ndarray:
+    value = value.lstrip("#")
+    if len(value) != 6:
+        raise ValueError(f"Color no válido: {value}")
+    return np.frombuffer(bytes.fromhex(value), dtype=np.uint8).astype(np.float32)
+
+
+def coerce_param(key: str, default, value):
+    """Valor convertido al tipo de su valor por defecto; ValueError si no encaja. Acepta los
+    valores de formularios y query strings: "true"/"false"/"1"/"0" y números como texto."""
+    try:
+        if isinstance(default, bool):
+            text = str(value).strip().lower()
+            if value is True or text in ("true", "1"):
+                return True
+            if value is False or text in ("false", "0"):
+                return False
+        elif isinstance(default, (int, float)):
+            number = float(value)
+            if isinstance(value, bool) or not np.isfinite(number):
+                pass
+            elif isinstance(default, float):
+                return number
+            elif number.is_integer():
+                return int(number)
+        else:
+            return type(default)(value)
+    except (TypeError, ValueError, OverflowError):
+        pass
+    raise ValueError(f"Valor no válido para {key}: {value!r}")
+
+
+def hsv_to_rgb(h: np.ndarray, s, v) -> np.ndarray:
+    """HSV en [0, 1] -> RGB uint8 (alto, ancho, 3), vectorizado"""
+    h = (h % 1.0) * 6.0
+    s = np.broadcast_to(s, h.shape)
+    v = np.broadcast_to(v, h.shape)
+    i = h.astype(np.int32) % 6
+    f = h - np.floor(h)
+    p = v * (1 - s)
+    q = v * (1 - s * f)
+    t = v * (1 - s * (1 - f))
+    r = np.choose(i, (v, q, p, p, t, v))
+    g = np.choose(i, (t, v, v, q, p, p))
+    b = np.choose(i, (p, p, t, v, v, q))
+    return (np.stack((r, g, b), axis=-1) * 255).astype(np.uint8)
+
+
+class Effect:
+    """Base de los efectos: parámetros con valores por defecto y render(t) -> frame (alto, ancho, 3)"""
+
+    name = None
+    description = ""
+    defaults = {}
+
+    def __init__(self, width: int, height: int, params: dict = None):
+        self.width = width
+        self.height = height
+        self.params = self.validate(params or {})
+        # Coordenadas de la matriz, calculadas una vez
+        self.y, self.x = np.mgrid[0:height, 0:width].astype(np.float32)
+
+    @classmethod
+    def validate(cls, params: dict) -> dict:
+        """Parámetros completos con el tipo de su valor por defecto; ValueError si no son válidos"""
+        unknown = set(params) - set(cls.defaults)
+        if unknown:
+            raise ValueError(f"Parámetros desconocidos para {cls.name}: {', '.join(sorted(unknown))}")
+        merged = dict(cls.defaults)
+        for key, value in params.items():
+            merged[key] = coerce_param(key, cls.defaults[key], value)
+        return merged
+
+    def render(self, t: float) -> np.ndarray:
+        raise NotImplementedError
+
+
+@register_effect
+class Plasma(Effect):
+    name = "plasma"
+    description = "Plasma clásico: suma de senos en arcoíris"
+    defaults = {"speed": 1.0, "scale": 1.0, "saturation": 1.0, "brightness": 1.0}
+
+    def __init__(self, width: int, height: int, params: dict = None):
+        super().__init__(width, height, params)
+        size = max(width, height)
+        scale = self.params["scale"] * 10.0 / size
+        self.sx = self.x * scale
+        self.sy = self.y * scale
+        self.radius = np.hypot(self.x - width / 2, self.y - height / 2) * scale
+
+    def render(self, t: float) -> np.ndarray:
+        t *= self.params["speed"]
+        value = (
+            np.sin(self.sx + t)
+            + np.sin((self.sy + t) / 2)
+            + np.sin((self.sx + self.sy + t) / 2)
+            + np.sin(self.radius + t)
+        )
+        return hsv_to_rgb(value / 8 + 0.5, self.params["saturation"], self.params["brightness"])
+
+
+@register_effect
+class Fire(Effect):
+    name = "fire"
+    description = "Fuego: difusión de calor desde la fila inferior"
+    defaults = {"cooling": 0.06, "sparking": 0.7, "seed": 0}
+
+    def __init__(self, width: int, height: int, params: dict = None):
+        super().__init__(width, height, params)
+        self.heat = np.zeros((height + 2, width), dtype=np.float32)
+        self.random = np.random.default_rng(self.params["seed"])
+        # Paleta negro -> rojo -> amarillo -> blanco
+        ramp = np.linspace(0, 1, 256, dtype=np.float32)
+        self.palette = (np.stack((
+            np.clip(ramp * 3, 0, 1),
+            np.clip(ramp * 3 - 1, 0, 1),
+            np.clip(ramp * 3 - 2, 0, 1)
+        ), axis=-1) * 255).astype(np.uint8)
+
+    def render(self, t: float) -> np.ndarray:
+        heat = self.heat
+        # Chispas en las dos filas ocultas de la base
+        heat[-2:] = self.random.random((2, self.width), dtype=np.float32) * self.params["sparking"] + 0.3
+        # Cada celda toma la media de las tres de abajo y la de dos filas más abajo, y se enfría
+        below = heat[1:-1]
+        spread = (np.roll(below, 1, axis=1) + below + np.roll(below, -1, axis=1) + heat[2:]) / 4
+        cooling = self.params["cooling"] * self.random.random((self.height, self.width), dtype=np.float32)
+        heat[:-2] = np.clip(spread - cooling, 0, 1)
+        return self.palette[(heat[:-2] * 255).astype(np.uint8)]
+
+
+@register_effect
+class Noise(Effect):
+    name = "noise"
+    description = "Campo de ruido suave (value noise) que se desplaza"
+    defaults = {"speed": 1.0, "scale": 0.15, "hue": 0.55, "hue_range": 0.3, "saturation": 1.0, "seed": 0}
+    LATTICE = 64
+
+    def __init__(self, width: int, height: int, params: dict = None):
+        super().__init__(width, height, params)
+        self.lattice = np.random.default_rng(self.params["seed"]).random((self.LATTICE, self.LATTICE), dtype=np.float32)
+
+    def _sample(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """Interpolación bilineal con suavizado en una retícula periódica"""
+        x0 = np.floor(x)
+        y0 = np.floor(y)
+        fx = x - x0
+        fy = y - y0
+        fx = fx * fx * (3 - 2 * fx)
+        fy = fy * fy * (3 - 2 * fy)
+        x0 = x0.astype(np.int32) % self.LATTICE
+        y0 = y0.astype(np.int32) % self.LATTICE
+        x1 = (x0 + 1) % self.LATTICE
+        y1 = (y0 + 1) % self.LATTICE
+        top = self.lattice[y0, x0] * (1 - fx) + self.lattice[y0, x1] * fx
+        bottom = self.lattice[y1, x0] * (1 - fx) + self.lattice[y1, x1] * fx
+        return top * (1 - fy) + bottom * fy
+
+    def render(self, t: float) -> np.ndarray:
+        t *= self.params["speed"]
+        scale = self.params["scale"]
+        # Dos octavas que se mueven en direcciones distintas
+        value = self._sample(self.x * scale + t, self.y * scale + t * 0.7) * 0.65
+        value += self._sample(self.x * scale * 2 - t * 1.3, self.y * scale * 2 + t * 0.4) * 0.35
+        hue = self.params["hue"] + (value - 0.5) * self.params["hue_range"] * 2
+        return hsv_to_rgb(hue, self.params["saturation"], np.clip(value * 1.4 - 0.1, 0, 1))
+
+
+@register_effect
+class Gradient(Effect):
+    name = "gradient"
+    description = "Degradado lineal entre dos colores o arcoíris, con ángulo y desplazamiento"
+    defaults = {"color_start": "#ff0080", "color_end": "#0080ff", "rainbow": False, "angle": 0.0, "speed": 0.2}
+
+    def __init__(self, width: int, height: int, params: dict = None):
+        super().__init__(width, height, params)
+        angle = np.radians(self.params["angle"])
+        position = self.x * np.cos(angle) + self.y * np.sin(angle)
+        span = position.max() - position.min()
+        self.position = (position - position.min()) / (span if span else 1)
+        self.start = parse_color(self.params["color_start"])
+        self.end = parse_color(self.params["color_end"])
+
+    def render(self, t: float) -> np.ndarray:
+        phase = (self.position + t * self.params["speed"]) % 1.0
+        if self.params["rainbow"]:
+            return hsv_to_rgb(phase, 1.0, 1.0)
+        # Ida y vuelta para que el desplazamiento no tenga corte
+        mix = (1 - np.abs(phase * 2 - 1))[..., np.newaxis]
+        return (self.start * (1 - mix) + self.end * mix).astype(np.uint8)
+
+
+@register_effect
+class Scroll(Effect):
+    name = "scroll"
+    description = "Patrón de rayas o damero que se desplaza"
+    defaults = {"pattern": "stripes", "color_a": "#ffffff", "color_b": "#000000", "size": 2, "speed": 4.0, "vertical": False}
+
+    def __init__(self, width: int, height: int, params: dict = None):
+        super().__init__(width, height, params)
+        if self.params["pattern"] not in ("stripes", "checker"):
+            raise ValueError("pattern debe ser stripes o checker")
+        if self.params["size"] < 1:
+            raise ValueError("size debe ser al menos 1")
+        self.colors = np.stack((parse_color(self.params["color_a"]), parse_color(self.params["color_b"]))).astype(np.uint8)
+
+    def render(self, t: float) -> np.ndarray:
+        offset = t * self.params["speed"]
+        along, across = (self.y, self.x) if self.params["vertical"] else (self.x, self.y)
+        cells = np.floor((along + offset) / self.params["size"]).astype(np.int32)
+        if self.params["pattern"] == "checker":
+            cells += np.floor(across / self.params["size"]).astype(np.int32)
+        return self.colors[cells & 1]
+
+
+class ConstantDurations:
+    """Duraciones de un efecto: todos los frames duran lo mismo"""
+
+    def __init__(self, duration_ms: int, count: int):
+        self.duration_ms = duration_ms
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        return self.duration_ms
+
+
+class EffectFrames:
+    """Efecto con la interfaz de PackedFrames para el Player: el frame i se calcula al enviarlo
+    (t = i / fps). Mide el tiempo de render y avisa si supera el presupuesto por frame."""
+
+    FRAME_COUNT = 2 ** 31 - 1  # Sin fin: el índice avanza con el reloj del reproductor
+
+    def __init__(self, name: str, width: int, height: int, params: dict = None, fps: float = DEFAULT_FPS):
+        if name not in EFFECTS:
+            raise ValueError(f"Efecto desconocido: {name}")
+        self.name = name
+        self.fps = min(max(fps, 1), MAX_FPS)
+        self.params = params or {}
+        self.effect = EFFECTS[name](width, height, self.params)
+        self.durations = ConstantDurations(round(1000 / self.fps), self.FRAME_COUNT)
+        self.budget = BUDGET_FRACTION / self.fps
+        self._render_times = deque(maxlen=BUDGET_WINDOW)
+        self.frames_rendered = 0
+        self.over_budget = False
+
+    def __len__(self):
+        return self.FRAME_COUNT
+
+    def frame(self, index: int) -> np.ndarray:
+        started = time.perf_counter()
+        frame = self.effect.render(index / self.fps)
+        elapsed = time.perf_counter() - started
+        effect_render_seconds.observe(elapsed, self.name)
+        self._render_times.append(elapsed)
+        self.frames_rendered += 1
+        if self.frames_rendered == BUDGET_WARMUP + BUDGET_WINDOW // 2:
+            self._check_budget()
+        return frame
+
+    def _check_budget(self):
+        p95 = self.render_p95()
+        if p95 > self.budget:
+            self.over_budget = True
+            logger.warning(
+                f"Effect {self.name} {self.effect.width}x{self.effect.height} takes {p95 * 1000:.2f} ms per frame "
+                f"(p95), over the {self.budget * 1000:.2f} ms budget for {self.fps:g} fps"
+            )
+
+    def render_p95(self) -> float:
+        times = sorted(self._render_times)
+        return times[int(len(times) * 0.95)] if times else 0.0
+
+    async def reconfigure(self, config: dict):
+        """Cambio de matriz: se recrea el efecto con el nuevo tamaño (lo llama PlayerManager)"""
+        width, height = frame_geometry(config)
+        self.effect = EFFECTS[self.name](width, height, self.params)
+        self._render_times.clear()
+
+    def status(self) -> dict:
+        p95 = self.render_p95()
+        if self.frames_rendered >= BUDGET_WARMUP:
+            self.over_budget = self.over_budget or p95 > self.budget
+        return {
+            "effect": self.name,
+            "params": self.effect.params,
+            "fps": self.fps,
+            "width": self.effect.width,
+            "height": self.effect.height,
+            "frames_rendered": self.frames_rendered,
+            "render_ms": {
+                "avg": round(sum(self._render_times) / len(self._render_times) * 1000, 3) if self._render_times else 0.0,
+                "p95": round(p95 * 1000, 3)
+            },
+            "budget_ms": round(self.budget * 1000, 3),
+            "over_budget": self.over_budget
+        }
+
+
+def check_budget(name: str, width: int, height: int, params: dict = None, fps: float = DEFAULT_FPS) -> dict:
+    """Renderiza unos frames (fuera del event loop) y comprueba si el efecto cabe en el presupuesto"""
+    frames = EffectFrames(name, width, height, params, fps)
+    times = []
+    for index in range(CHECK_FRAMES):
+        started = time.perf_counter()
+        frames.effect.render(index / frames.fps)
+        times.append(time.perf_counter() - started)
+    p95 = sorted(times)[int(len(times) * 0.95)]
+    return {
+        "render_ms_p95": round(p95 * 1000, 3),
+        "budget_ms": round(frames.budget * 1000, 3),
+        "within_budget": p95 <= frames.budget
+    }
+
+
+def list_effects() -> list:
+    return [
+        {"name": cls.name, "description": cls.description, "params": cls.defaults}
+        for cls in EFFECTS.values()
+    ]
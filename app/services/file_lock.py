@@ -0,0 +1,83 @@
+import asyncio
+import fcntl
+import os
+from pathlib import Path
+
+# Exclusión entre procesos (workers de la API y proceso de reproducción) con flock sobre
+# archivos en data/cache. El kernel libera el lock al cerrar el descriptor o al morir el
+# proceso, así que no quedan locks huérfanos. Se usa flock no bloqueante con reintentos en
+# lugar de esperar en un hilo: una tarea cancelada no deja ningún hilo que tome el lock después.
+
+POLL_MIN = 0.005  # Segundos entre intentos; se duplica hasta POLL_MAX
+POLL_MAX = 0.1
+
+
+def try_flock(path: Path):
+    """Descriptor con el lock exclusivo de path, o None si lo tiene otro"""
+    try:
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    except FileNotFoundError:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        return None
+    return fd
+
+
+async def flock_any(paths: list) -> int:
+    """Espera hasta tener el lock de alguno de los archivos; devuelve su descriptor"""
+    delay = POLL_MIN
+    while True:
+        for path in paths:
+            fd = try_flock(path)
+            if fd is not None:
+                return fd
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, POLL_MAX)
+
+
+def release(fd: int):
+    """Libera un lock obtenido con try_flock o flock_any (desde cualquier hilo)"""
+    os.close(fd)
+
+
+class FileLock:
+    """asyncio.Lock que además excluye a los demás procesos que usan el mismo archivo"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = asyncio.Lock()  # Dentro del proceso, sin reintentos
+        self._fd = None
+
+    async def __aenter__(self):
+        await self._lock.acquire()
+        try:
+            self._fd = await flock_any([self.path])
+        except BaseException:
+            self._lock.release()
+            raise
+        return self
+
+    async def __aexit__(self, *exc_info):
+        fd, self._fd = self._fd, None
+        release(fd)
+        self._lock.release()
+
+
+class FileSemaphore:
+    """Como mucho 'slots' titulares a la vez entre todos los procesos: un archivo con flock por hueco"""
+
+    def __init__(self, directory: Path, slots: int):
+        self.directory = directory
+        self.slots = slots
+
+    async def acquire(self) -> int:
+        """Descriptor del hueco obtenido; se devuelve con release()"""
+        return await flock_any([self.directory / f"{index}.lock" for index in range(self.slots)])
+
+    @staticmethod
+    def release(fd: int):
+        release(fd)
@@ -0,0 +1,415 @@
+import asyncio
+import logging
+import os
+import struct
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from app.services.metrics import frame_cache_requests, frame_decode_seconds
+from app.services.video import is_video, render_video_frames
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = Path(__file__).parent.parent.parent / "data" / "cache" / "frames"
+
+# Contenedor de frames: cabecera fija + frames RGB empaquetados + duraciones (uint32, ms)
+# La cabecera se reescribe al cerrar, así se puede escribir en streaming sin conocer el total
+MAGIC = b"WLFS"
+VERSION = 1
+HEADER = struct.Struct("<4sHHHHI")  # magic, versión, ancho, alto, reservado, nº de frames
+CONTAINER_SUFFIX = ".wlf"
+
+# Reproducción en streaming (assets sin contenedor): el decodificador va por delante del
+# reproductor en un buffer circular de tamaño acotado
+STREAM_MEMORY_MB = 32  # Memoria máxima del buffer circular por defecto ("stream_memory_mb" en "animation")
+STREAM_MIN_FRAMES = 4  # El buffer siempre admite al menos estos frames
+STREAM_START_FRAMES = 3  # Frames decodificados antes de empezar a reproducir
+STREAM_CACHE_MAX_MB = 256  # Hasta este tamaño, el streaming también escribe el contenedor y los bucles lo usan
+
+
+def asset_id_from_path(image_path: Path) -> str:
+    """Clave de los frames a partir del nombre de archivo: {blob}.ext o, en assets antiguos, {id}_{nombre}.ext"""
+    return image_path.stem.split("_", 1)[0]
+
+
+class PackedFrames:
+    """Frames de un contenedor mapeados en memoria (solo lectura)"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        with open(path, "rb") as f:
+            magic, version, width, height, _, frame_count = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"Contenedor de frames inválido: {path}")
+            frame_size = width * height * 3
+            f.seek(HEADER.size + frame_count * frame_size)
+            self.durations = np.frombuffer(f.read(4 * frame_count), dtype="<u4").tolist()
+
+        self.width = width
+        self.height = height
+        self.frame_count = frame_count
+        self.frames = np.memmap(
+            path,
+            dtype=np.uint8,
+            mode="r",
+            offset=HEADER.size,
+            shape=(frame_count, height, width, 3)
+        )
+
+    def __len__(self):
+        return self.frame_count
+
+    def frame(self, index: int) -> np.ndarray:
+        """Devuelve el frame como array (alto, ancho, 3) sin copiarlo"""
+        return self.frames[index]
+
+
+class FrameWriter:
+    """Escribe un contenedor frame a frame sobre un temporal y lo publica con rename atómico"""
+
+    def __init__(self, path: Path, width: int, height: int, tmp_suffix: str = ".tmp"):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.frame_size = width * height * 3
+        self.durations = []
+        self.tmp_path = path.with_name(path.name + tmp_suffix)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.tmp_path, "wb")
+        self._file.write(HEADER.pack(MAGIC, VERSION, width, height, 0, 0))
+
+    def append(self, frame: bytes, duration: int):
+        """Añade un frame RGB empaquetado con su duración en ms"""
+        if len(frame) != self.frame_size:
+            raise ValueError(f"Tamaño de frame inválido: {len(frame)} != {self.frame_size}")
+        self._file.write(frame)
+        self.durations.append(int(duration))
+
+    def commit(self):
+        """Escribe duraciones y cabecera definitiva y publica el archivo"""
+        self._file.write(np.asarray(self.durations, dtype="<u4").tobytes())
+        self._file.seek(0)
+        self._file.write(HEADER.pack(MAGIC, VERSION, self.width, self.height, 0, len(self.durations)))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        """Descarta el contenedor a medio escribir"""
+        self._file.close()
+        self.tmp_path.unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+        return False
+
+
+DEFAULT_DURATION_MS = 100
+
+
+def render_image_frames(image_path: Path, width: int, height: int):
+    """Genera (bytes RGB, duración) por frame redimensionado a la matriz"""
+    img = Image.open(image_path)
+    is_gif_animated = image_path.suffix.lower() == ".gif" and getattr(img, "n_frames", 1) > 1
+    frame_count = img.n_frames if is_gif_animated else 1
+
+    for frame_idx in range(frame_count):
+        if is_gif_animated:
+            img.seek(frame_idx)
+        duration = img.info.get("duration", 100) if is_gif_animated else 100
+
+        # Redimensionar a matriz (la rotación, el espejo y el cableado se aplican al enviar)
+        frame = img.convert("RGB").resize((width, height), Image.Resampling.LANCZOS)
+
+        yield frame.tobytes(), duration
+
+
+class StreamingFrames:
+    """Frames que se decodifican en un hilo mientras se reproducen, para no esperar a construir
+    el contenedor de una animación larga.
+
+    El decodificador escribe en un buffer circular de como mucho memory_limit bytes y se detiene
+    cuando va un buffer entero por delante del reproductor. Si el contenedor completo cabe en
+    STREAM_CACHE_MAX_MB se escribe a la vez en disco y, al terminar, los frames se sirven desde
+    él (bucles y saltos atrás sin decodificar). Si no, volver a un frame que ya ha salido del
+    buffer (bucle, seek atrás) reinicia la decodificación desde ese frame.
+    """
+
+    def __init__(self, store, image_path: Path, width: int, height: int, frame_count: int, memory_limit: int):
+        self.store = store
+        self.image_path = image_path
+        self.width = width
+        self.height = height
+        self.frame_count = frame_count
+        self.frame_size = width * height * 3
+        self.slots = min(frame_count, max(STREAM_MIN_FRAMES, memory_limit // self.frame_size))
+        self.key = store.cache_key(asset_id_from_path(image_path), width, height)
+        self.cache = frame_count * self.frame_size <= STREAM_CACHE_MAX_MB * 1024 * 1024
+        self.packed = None  # PackedFrames en cuanto el contenedor está escrito
+        self.durations = [DEFAULT_DURATION_MS] * frame_count  # Se completan al decodificar
+        self.restarts = 0
+        self._ring = np.zeros((self.slots, height, width, 3), dtype=np.uint8)
+        self._start = 0  # Primer frame de esta pasada del decodificador
+        self._decoded = 0  # Frames decodificados (índice absoluto del siguiente)
+        self._consumed = 0  # Último frame pedido por el reproductor
+        self._done = False
+        self._run_id = 0
+        self._condition = threading.Condition()
+        self._loop = None
+        self._ready = None  # asyncio.Event que el decodificador activa con cada frame
+
+    def start(self, index: int = 0):
+        with self._condition:
+            self._run_id += 1
+            self._start = self._decoded = self._consumed = index
+            self._done = False
+            run_id = self._run_id
+            self._condition.notify_all()
+        threading.Thread(target=self._decode, args=(run_id, index), name=f"stream-{self.key}", daemon=True).start()
+
+    def _decode(self, run_id: int, start: int):
+        writer = None
+        if self.cache and start == 0:
+            # Temporal propio: si get() construye el mismo contenedor a la vez, ambos publican lo mismo
+            writer = FrameWriter(self.store.path_for(self.key), self.width, self.height, f".{run_id}.stream")
+        render = render_video_frames if is_video(self.image_path) else render_image_frames
+        frames = render(self.image_path, self.width, self.height)
+        completed = False
+        try:
+            started = time.perf_counter()
+            for index, (frame, duration) in enumerate(frames):
+                frame_decode_seconds.observe(time.perf_counter() - started)
+                if index < start:
+                    if self._run_id != run_id:
+                        return
+                    started = time.perf_counter()
+                    continue  # Reinicio a mitad: avanzar hasta el frame pedido
+                if index >= self.frame_count:
+                    break
+                if writer is not None:
+                    writer.append(frame, duration)
+                with self._condition:
+                    # Esperar a que el reproductor libere el hueco más antiguo del buffer
+                    while self._run_id == run_id and self._decoded - self._consumed >= self.slots:
+                        self._condition.wait()
+                    if self._run_id != run_id:
+                        return
+                    self._ring[index % self.slots] = np.frombuffer(frame, dtype=np.uint8).reshape(self.height, self.width, 3)
+                    self.durations[index] = int(duration)
+                    self._decoded = index + 1
+                self._notify()
+                started = time.perf_counter()
+            completed = True
+        except Exception as e:
+            logger.error(f"Streaming decode of {self.image_path.name} failed: {e}")
+        finally:
+            frames.close()
+            if writer is not None:
+                if completed and self._decoded == self.frame_count and len(writer.durations) == self.frame_count:
+                    writer.commit()
+                    packed = PackedFrames(writer.path)
+                    self.store.adopt(self.key, packed)
+                    with self._condition:
+                        self.packed = packed
+                        self._ring = None  # Desde ahora se sirve del contenedor: liberar el buffer
+                else:
+                    writer.abort()
+            with self._condition:
+                if self._run_id == run_id:
+                    self._done = True
+                    if self._decoded < self.frame_count and self.packed is None:
+                        # El archivo tenía menos frames de los esperados: la animación acaba antes
+                        self.frame_count = self._decoded
+            self._notify()
+
+    def _notify(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._ready.set)
+
+    def __len__(self):
+        return self.frame_count
+
+    def is_ready(self, index: int) -> bool:
+        """True si frame(index) se puede leer ya; si el frame salió del buffer, reinicia la decodificación"""
+        with self._condition:
+            if self.packed is not None:
+                return True
+            if self._start <= index < self._decoded and index >= self._decoded - self.slots:
+                return True
+            if index < self._decoded - self.slots or index < self._start:
+                restart = True
+            else:
+                return False
+        if restart:
+            self.restarts += 1
+            self.start(index)
+        return False
+
+    async def wait_ready(self, index: int):
+        """Espera a que el decodificador llegue al frame (o termine)"""
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+            self._ready = asyncio.Event()
+        with self._condition:
+            self._consumed = max(self._consumed, min(index, self._decoded))
+            self._condition.notify_all()
+        while True:
+            self._ready.clear()
+            if index >= self.frame_count or self.is_ready(index):
+                return
+            with self._condition:
+                done = self._done
+            if done:
+                return
+            await self._ready.wait()
+
+    def frame(self, index: int) -> np.ndarray:
+        packed = self.packed
+        if packed is not None:
+            return packed.frame(index)
+        with self._condition:
+            if self.packed is not None:
+                return self.packed.frame(index)
+            # El reproductor ya no necesita los frames anteriores: el decodificador puede seguir
+            self._consumed = index
+            self._condition.notify_all()
+            return self._ring[index % self.slots]
+
+    def close(self):
+        """Detiene el decodificador (el reproductor ya no usa estos frames)"""
+        with self._condition:
+            self._run_id += 1
+            self._condition.notify_all()
+
+    def buffer_status(self) -> dict:
+        with self._condition:
+            return {
+                "decoded": self._decoded,
+                "buffered": max(0, self._decoded - self._consumed),
+                "slots": self.slots,
+                "memory_bytes": self._ring.nbytes if self._ring is not None else 0,
+                "cached": self.packed is not None,
+                "restarts": self.restarts
+            }
+
+
+class FrameStore:
+    """Caché en disco de frames pre-renderizados por asset y tamaño de matriz"""
+
+    def __init__(self, cache_dir: Path = CACHE_DIR):
+        self.cache_dir = cache_dir
+        self._open = {}  # {clave: PackedFrames}
+        self._lock = threading.Lock()
+        self._build_locks = {}  # {clave: Lock}; un vídeo largo no bloquea la construcción de otros assets
+
+    @staticmethod
+    def cache_key(asset_id: str, width: int, height: int) -> str:
+        return f"{asset_id}_{width}x{height}"
+
+    def path_for(self, key: str) -> Path:
+        return self.cache_dir / f"{key}{CONTAINER_SUFFIX}"
+
+    def adopt(self, key: str, packed: PackedFrames):
+        """Registra un contenedor escrito fuera de get() (streaming)"""
+        with self._lock:
+            self._open[key] = packed
+
+    def cached(self, image_path: Path, width: int, height: int):
+        """PackedFrames si el contenedor ya existe (en memoria o en disco), sin construirlo; si no, None"""
+        key = self.cache_key(asset_id_from_path(image_path), width, height)
+        with self._lock:
+            packed = self._open.get(key)
+        if packed is not None:
+            frame_cache_requests.inc("memory")
+            return packed
+        path = self.path_for(key)
+        if not path.exists():
+            return None
+        frame_cache_requests.inc("disk")
+        packed = PackedFrames(path)
+        self.adopt(key, packed)
+        return packed
+
+    async def stream(self, image_path: Path, width: int, height: int, frame_count: int, memory_limit: int):
+        """Frames para reproducir: el contenedor si ya existe o, si no, StreamingFrames, que
+        empieza en cuanto hay STREAM_START_FRAMES decodificados en vez de esperar a todos"""
+        packed = await asyncio.to_thread(self.cached, image_path, width, height)
+        if packed is not None:
+            return packed
+        frame_cache_requests.inc("stream")
+        frames = StreamingFrames(self, image_path, width, height, frame_count, memory_limit)
+        frames.start()
+        await frames.wait_ready(min(STREAM_START_FRAMES, frame_count) - 1)
+        return frames
+
+    def get(self, image_path: Path, width: int, height: int) -> PackedFrames:
+        """Devuelve los frames del asset, construyendo el contenedor la primera vez"""
+        key = self.cache_key(asset_id_from_path(image_path), width, height)
+
+        with self._lock:
+            packed = self._open.get(key)
+        if packed is not None:
+            frame_cache_requests.inc("memory")
+            return packed
+
+        path = self.path_for(key)
+        with self._lock:
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+        with build_lock:
+            if path.exists():
+                frame_cache_requests.inc("disk")
+            else:
+                frame_cache_requests.inc("build")
+                self.build(image_path, path, width, height)
+
+        packed = PackedFrames(path)
+        with self._lock:
+            self._open[key] = packed
+        return packed
+
+    async def get_async(self, image_path: Path, width: int, height: int) -> PackedFrames:
+        """Igual que get() pero fuera del event loop (la construcción usa CPU)"""
+        return await asyncio.to_thread(self.get, image_path, width, height)
+
+    def build(self, image_path: Path, path: Path, width: int, height: int):
+        """Decodifica y redimensiona todos los frames una sola vez y los guarda empaquetados (en streaming)"""
+        logger.info(f"Building frame container {path.name} from {image_path.name}")
+        render = render_video_frames if is_video(image_path) else render_image_frames
+        with FrameWriter(path, width, height) as writer:
+            started = time.perf_counter()
+            for frame, duration in render(image_path, width, height):
+                now = time.perf_counter()
+                frame_decode_seconds.observe(now - started)
+                writer.append(frame, duration)
+                started = time.perf_counter()
+
+    def purge(self, asset_id: str):
+        """Elimina los contenedores de un asset (p.ej. al borrarlo)"""
+        with self._lock:
+            for key in [k for k in self._open if k.startswith(f"{asset_id}_")]:
+                del self._open[key]
+        for file in self.cache_dir.glob(f"{asset_id}_*{CONTAINER_SUFFIX}"):
+            file.unlink(missing_ok=True)
+
+    def invalidate(self):
+        """Descarta toda la caché (cambio de tamaño de matriz)"""
+        with self._lock:
+            self._open.clear()
+        if self.cache_dir.exists():
+            for file in self.cache_dir.glob(f"*{CONTAINER_SUFFIX}"):
+                file.unlink(missing_ok=True)
+        logger.info("Frame cache invalidated")
+
+
+frame_store = FrameStore()
@@ -0,0 +1,120 @@
+import asyncio
+import logging
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+MAX_IN_FLIGHT = 2  # Peticiones simultáneas por dispositivo (un ESP atiende mal más de una o dos)
+KEEPALIVE_TIMEOUT = 60  # Segundos que se mantiene abierta una conexión ociosa
+FRAME_TIMEOUT = 0.08  # Timeout por defecto; el reproductor pasa el periodo del frame (un frame que llega tarde ya no sirve)
+CONNECT_TIMEOUT = 1.0
+
+
+class DeviceSession:
+    """Sesión HTTP persistente hacia un dispositivo WLED, con límite de peticiones en vuelo"""
+
+    def __init__(self, base_url: str, max_in_flight: int = MAX_IN_FLIGHT):
+        self.base_url = base_url
+        self.requests = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.connections_created = 0
+        self.connections_reused = 0
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+
+        trace = aiohttp.TraceConfig()
+        trace.on_connection_create_end.append(self._on_connection_created)
+        trace.on_connection_reuseconn.append(self._on_connection_reused)
+        self.session = aiohttp.ClientSession(
+            base_url=base_url,
+            connector=aiohttp.TCPConnector(
+                limit_per_host=max_in_flight,
+                keepalive_timeout=KEEPALIVE_TIMEOUT,
+                ttl_dns_cache=300
+            ),
+            timeout=aiohttp.ClientTimeout(total=FRAME_TIMEOUT, connect=CONNECT_TIMEOUT),
+            trace_configs=[trace]
+        )
+
+    async def _on_connection_created(self, session, ctx, params):
+        self.connections_created += 1
+
+    async def _on_connection_reused(self, session, ctx, params):
+        self.connections_reused += 1
+
+    async def post(self, path: str, data: bytes, timeout: float = None) -> int:
+        """POST con cuerpo JSON ya serializado; devuelve el código HTTP"""
+        kwargs = {}
+        if timeout is not None:
+            kwargs["timeout"] = aiohttp.ClientTimeout(total=timeout, connect=CONNECT_TIMEOUT)
+        async with self._semaphore:
+            self.requests += 1
+            try:
+                async with self.session.post(path, data=data, headers={"Content-Type": "application/json"}, **kwargs) as resp:
+                    await resp.read()  # Vaciar la respuesta para poder reutilizar la conexión
+                    return resp.status
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                raise
+            except aiohttp.ClientError:
+                self.errors += 1
+                raise
+
+    async def get_json(self, path: str, timeout: float = None):
+        """GET de un recurso JSON (p.ej. /json/info); None si el código HTTP no es 200"""
+        kwargs = {}
+        if timeout is not None:
+            kwargs["timeout"] = aiohttp.ClientTimeout(total=timeout, connect=CONNECT_TIMEOUT)
+        async with self._semaphore:
+            self.requests += 1
+            try:
+                async with self.session.get(path, **kwargs) as resp:
+                    if resp.status != 200:
+                        await resp.read()
+                        return None
+                    return await resp.json(content_type=None)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                raise
+            except aiohttp.ClientError:
+                self.errors += 1
+                raise
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "connections_created": self.connections_created,
+            "connections_reused": self.connections_reused
+        }
+
+    async def close(self):
+        await self.session.close()
+
+
+class ConnectionManager:
+    """Sesiones HTTP por dispositivo que viven lo mismo que la aplicación"""
+
+    def __init__(self):
+        self.sessions = {}  # {base_url: DeviceSession}
+
+    def get(self, base_url: str) -> DeviceSession:
+        session = self.sessions.get(base_url)
+        if session is None:
+            logger.info(f"Opening pooled HTTP session for {base_url}")
+            session = DeviceSession(base_url)
+            self.sessions[base_url] = session
+        return session
+
+    def stats(self) -> dict:
+        return {base_url: session.stats() for base_url, session in self.sessions.items()}
+
+    async def close(self):
+        for session in self.sessions.values():
+            await session.close()
+        self.sessions.clear()
+
+
+connection_manager = ConnectionManager()
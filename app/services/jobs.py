@@ -0,0 +1,305 @@
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from app.services.file_lock import FileSemaphore
+
+logger = logging.getLogger(__name__)
+
+# Estados de un trabajo
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# En una Pi de 4 núcleos se dejan al menos dos libres para el event loop y la reproducción.
+# El límite es para todos los workers de la API juntos (un hueco con flock por trabajo) y el
+# pool de cada worker se reparte entre API_WORKERS para no arrancar procesos que no se usan.
+MAX_CPU_JOBS = max(1, min(2, (os.cpu_count() or 1) - 2))
+API_WORKERS = max(1, int(os.environ.get("API_WORKERS", 1)))
+CPU_SLOTS_DIR = Path(__file__).parent.parent.parent / "data" / "cache" / "cpu-slots"
+MAX_PENDING_JOBS = 16  # Trabajos en cola; por encima se rechazan las subidas
+JOB_HISTORY = 100  # Trabajos terminados que se conservan para consultar su estado
+WORKER_NICE = 10  # Prioridad baja para los procesos de trabajo
+JOBS_PATH = Path(__file__).parent.parent.parent / "data" / "cache" / "jobs.db"
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class Job:
+    """Trabajo en segundo plano con progreso consultable desde la API"""
+
+    def __init__(self, kind: str, on_change=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.state = QUEUED
+        self.stage = QUEUED
+        self.progress = 0.0
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.on_change = on_change  # Llamado en cada cambio de estado o progreso
+
+    def update(self, progress: float, stage: str):
+        self.progress = progress
+        self.stage = stage
+        self.changed()
+
+    def changed(self):
+        if self.on_change is not None:
+            self.on_change(self)
+
+    def snapshot(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "state": self.state,
+            "stage": self.stage,
+            "progress": round(self.progress, 3),
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+
+
+class JobRecords:
+    """Estado de los trabajos en SQLite, compartido por todos los procesos de la API: con
+    varios workers, el progreso de una subida se consulta en uno distinto del que la procesa"""
+
+    def __init__(self, path: Path = JOBS_PATH):
+        self.path = path
+        self._db = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        with self._lock:
+            if self._db is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=5.0)
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.execute("PRAGMA synchronous=NORMAL")
+                self._db.execute("""
+                    CREATE TABLE IF NOT EXISTS jobs (
+                        id TEXT PRIMARY KEY,
+                        pid INTEGER NOT NULL,
+                        state TEXT NOT NULL,
+                        created_at REAL NOT NULL,
+                        snapshot TEXT NOT NULL
+                    )
+                """)
+                self._fail_orphans()
+            return self._db
+
+    def _fail_orphans(self):
+        """Marca como fallidos los trabajos pendientes de procesos que ya no existen"""
+        rows = self._db.execute("SELECT id, pid, snapshot FROM jobs WHERE state IN (?, ?)", (QUEUED, RUNNING)).fetchall()
+        for job_id, pid, snapshot in rows:
+            if process_alive(pid):
+                continue
+            snapshot = json.loads(snapshot)
+            snapshot.update(state=FAILED, stage=FAILED, error="El proceso que lo ejecutaba terminó", finished_at=time.time())
+            with self._db:
+                self._db.execute("UPDATE jobs SET state = ?, snapshot = ? WHERE id = ?", (FAILED, json.dumps(snapshot), job_id))
+
+    def save(self, snapshot: dict):
+        db = self._connection()
+        with self._lock, db:
+            db.execute(
+                "INSERT OR REPLACE INTO jobs (id, pid, state, created_at, snapshot) VALUES (?, ?, ?, ?, ?)",
+                (snapshot["id"], os.getpid(), snapshot["state"], snapshot["created_at"], json.dumps(snapshot))
+            )
+            if snapshot["state"] in (DONE, FAILED):
+                db.execute(
+                    "DELETE FROM jobs WHERE state IN (?, ?) AND id NOT IN "
+                    "(SELECT id FROM jobs WHERE state IN (?, ?) ORDER BY created_at DESC LIMIT ?)",
+                    (DONE, FAILED, DONE, FAILED, JOB_HISTORY)
+                )
+
+    def get(self, job_id: str):
+        db = self._connection()
+        with self._lock:
+            row = db.execute("SELECT snapshot FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def list(self) -> list:
+        db = self._connection()
+        with self._lock:
+            rows = db.execute("SELECT snapshot FROM jobs ORDER BY created_at DESC").fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def counts(self) -> dict:
+        db = self._connection()
+        with self._lock:
+            return dict(db.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+def process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _init_worker():
+    try:
+        os.nice(WORKER_NICE)
+    except OSError:
+        pass
+
+
+class JobQueue:
+    """Cola acotada de trabajos con un máximo de trabajos de CPU simultáneos.
+
+    Cada trabajo es una corrutina que delega el trabajo pesado en un pool de procesos
+    (run_cpu), de modo que el event loop y los reproductores no se quedan sin CPU.
+    """
+
+    def __init__(self, max_cpu_jobs: int = MAX_CPU_JOBS, max_pending: int = MAX_PENDING_JOBS,
+                 workers: int = API_WORKERS, slots_dir: Path = CPU_SLOTS_DIR):
+        self.max_cpu_jobs = max_cpu_jobs  # En todos los procesos
+        self.process_cpu_jobs = max(1, max_cpu_jobs // workers)
+        self.max_pending = max_pending
+        self.cpu_slots = FileSemaphore(slots_dir, max_cpu_jobs)
+        self.jobs = OrderedDict()  # {id: Job} de este proceso, hasta que terminan
+        self.records = JobRecords()
+        self._queue = None
+        self._workers = []
+        self._pool = None
+
+    def _ensure_started(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_pending)
+            self._workers = [
+                asyncio.create_task(self._worker(), name=f"job-worker-{index}")
+                for index in range(self.process_cpu_jobs)
+            ]
+
+    def submit(self, kind: str, handler, *args) -> Job:
+        """Encola handler(job, *args); lanza JobQueueFull si la cola está llena"""
+        self._ensure_started()
+        job = Job(kind, on_change=self._save)
+        try:
+            self._queue.put_nowait((job, handler, args))
+        except asyncio.QueueFull:
+            raise JobQueueFull(f"Hay {self.max_pending} trabajos pendientes")
+        self.jobs[job.id] = job
+        job.changed()
+        return job
+
+    def _save(self, job: Job):
+        try:
+            self.records.save(job.snapshot())
+        except sqlite3.Error as e:
+            logger.warning(f"Job {job.id}: state not saved: {e}")
+
+    async def run_cpu(self, fn, *args):
+        """Ejecuta fn(*args) en el pool de procesos cuando hay un hueco de CPU libre en cualquier proceso"""
+        if self._pool is None:
+            # spawn: el proceso principal tiene hilos y un event loop, no es seguro hacer fork
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.process_cpu_jobs,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker
+            )
+        slot = await self.cpu_slots.acquire()
+        try:
+            future = self._pool.submit(fn, *args)
+        except BaseException:
+            self.cpu_slots.release(slot)
+            raise
+        # El hueco se libera al terminar en el pool, aunque se cancele la espera
+        future.add_done_callback(lambda future: self.cpu_slots.release(slot))
+        return await asyncio.wrap_future(future)
+
+    def snapshot(self, job_id: str):
+        """Estado de un trabajo de cualquier proceso, o None si no existe"""
+        job = self.jobs.get(job_id)
+        return job.snapshot() if job is not None else self.records.get(job_id)
+
+    def list(self) -> list:
+        return self.records.list()
+
+    def stats(self) -> dict:
+        """Trabajos por estado en todos los procesos"""
+        counts = self.records.counts()
+        return {
+            "max_cpu_jobs": self.max_cpu_jobs,
+            "process_cpu_jobs": self.process_cpu_jobs,
+            "queued": counts.get(QUEUED, 0),
+            "running": counts.get(RUNNING, 0),
+            "done": counts.get(DONE, 0),
+            "failed": counts.get(FAILED, 0)
+        }
+
+    async def _worker(self):
+        while True:
+            job, handler, args = await self._queue.get()
+            job.state = job.stage = RUNNING
+            job.started_at = time.time()
+            job.changed()
+            try:
+                job.result = await handler(job, *args)
+                job.state = DONE
+                job.update(1.0, DONE)
+            except asyncio.CancelledError:
+                job.state = job.stage = FAILED
+                job.error = "Proceso detenido"
+                raise
+            except Exception as e:
+                logger.error(f"Job {job.id} ({job.kind}) failed: {e}", exc_info=True)
+                job.state = job.stage = FAILED
+                job.error = str(e)
+            finally:
+                job.finished_at = time.time()
+                del self.jobs[job.id]
+                job.changed()
+                self._queue.task_done()
+
+    async def shutdown(self):
+        for worker in self._workers:
+            worker.cancel()
+        for worker in self._workers:
+            try:
+                await worker
+            except asyncio.CancelledError:
+                pass
+        self._workers = []
+        self._queue = None
+        for job in list(self.jobs.values()):
+            # Trabajos en cola o interrumpidos: otro proceso no puede continuarlos
+            job.state = job.stage = FAILED
+            job.error = "Proceso detenido"
+            job.finished_at = time.time()
+            self._save(job)
+        self.jobs.clear()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        self.records.close()
+
+
+job_queue = JobQueue()
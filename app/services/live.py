@@ -0,0 +1,227 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections import deque
+
+import numpy as np
+
+from app.services.canvas import frame_geometry
+from app.services.device_health import DeviceOffline
+from app.services.metrics import live_frames
+from app.services.player import player_manager
+
+logger = logging.getLogger(__name__)
+
+LIVE_IMAGE_ID = "live"  # image_id del reproductor mientras recibe frames en directo
+FPS_WINDOW = 2.0  # Segundos usados para calcular los fps de entrada y salida
+
+
+class RateMeter:
+    """Eventos por segundo en una ventana deslizante"""
+
+    def __init__(self, window: float = FPS_WINDOW):
+        self.window = window
+        self._times = deque()
+
+    def mark(self, now: float):
+        self._times.append(now)
+        self._trim(now)
+
+    def rate(self) -> float:
+        now = time.monotonic()
+        self._trim(now)
+        return round(len(self._times) / self.window, 2)
+
+    def _trim(self, now: float):
+        while self._times and self._times[0] < now - self.window:
+            self._times.popleft()
+
+
+class LiveClient:
+    """Cliente WebSocket que envía frames en directo"""
+
+    def __init__(self, remote: str = None):
+        self.id = uuid.uuid4().hex[:8]
+        self.remote = remote
+        self.received = 0
+        self.sent = 0
+        self.dropped = 0  # Frames sustituidos por otro más reciente antes de enviarse
+        self.rejected = 0  # Mensajes con tamaño distinto al de la matriz
+        self.ingress = RateMeter()
+        self.egress = RateMeter()
+        self.connected_at = time.time()
+
+    def stats(self) -> dict:
+        return {
+            "id": self.id,
+            "remote": self.remote,
+            "received": self.received,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "rejected": self.rejected,
+            "ingress_fps": self.ingress.rate(),
+            "egress_fps": self.egress.rate(),
+            "connected_at": self.connected_at
+        }
+
+
+class LiveRelay:
+    """Reenvía frames en directo al reproductor de una salida con "el último frame gana":
+    hay un único hueco y un frame nuevo sustituye al pendiente, así que un dispositivo lento
+    pierde frames viejos en vez de acumular cola. Los frames pasan por el mismo envío que
+    las animaciones (disposición de LEDs, delta, canvas)."""
+
+    def __init__(self, player, config: dict):
+        self.player = player
+        self.clients = {}  # {id: LiveClient}
+        self.send_errors = 0
+        self.reconfigure_shape(config)
+        self._latest = None  # (frame, cliente) pendiente de enviar
+        self._ready = asyncio.Event()
+        self._generation = None
+        self.task = None
+
+    def reconfigure_shape(self, config: dict):
+        width, height = frame_geometry(config)
+        self.shape = (height, width, 3)
+        self.frame_size = width * height * 3
+
+    async def reconfigure(self, config: dict):
+        """Cambio de matriz: los clientes deben enviar frames del nuevo tamaño"""
+        self.reconfigure_shape(config)
+        self._latest = None
+
+    def start(self):
+        self.player.stop()
+        self.player.image_id = LIVE_IMAGE_ID
+        self.player.controller = self
+        self._generation = self.player.generation
+        self.task = asyncio.create_task(self._run(), name=f"live-{self.player.output.ip}")
+
+    @property
+    def running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    def submit(self, client: LiveClient, data: bytes) -> bool:
+        """Guarda el frame como el último pendiente; False si no tiene el tamaño de la matriz"""
+        now = time.monotonic()
+        client.received += 1
+        client.ingress.mark(now)
+        if len(data) != self.frame_size:
+            client.rejected += 1
+            live_frames.inc("rejected")
+            return False
+        if self._latest is not None:
+            stale_client = self._latest[1]
+            stale_client.dropped += 1
+            live_frames.inc("dropped")
+        self._latest = (np.frombuffer(data, dtype=np.uint8).reshape(self.shape), client)
+        self._ready.set()
+        return True
+
+    async def _watch_player(self):
+        """Despierta al relay cuando otro play() o stop() toma el reproductor, aunque no lleguen más frames"""
+        while True:
+            self.player.clip_changed.clear()
+            if self.player.generation != self._generation:
+                self._ready.set()
+                return
+            await self.player.clip_changed.wait()
+
+    async def _run(self):
+        next_send = 0.0
+        watcher = asyncio.create_task(self._watch_player(), name=f"live-watch-{self.player.output.ip}")
+        try:
+            while self.player.generation == self._generation:
+                await self._ready.wait()
+                # Respetar el ritmo máximo de la salida; lo que llegue mientras tanto sustituye al pendiente
+                delay = next_send - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                self._ready.clear()
+                if self._latest is None or self.player.generation != self._generation:
+                    continue
+                frame, client = self._latest
+                self._latest = None
+                next_send = time.monotonic() + self.player.output.min_interval
+                try:
+                    success, message = await self.player.output.send_frame(frame)
+                except DeviceOffline:
+                    # Sin conexión el frame se descarta; al volver se envía el siguiente que llegue
+                    live_frames.inc("offline")
+                    continue
+                except Exception as e:
+                    success, message = False, f"{type(e).__name__}: {e}"
+                if success:
+                    client.sent += 1
+                    client.egress.mark(time.monotonic())
+                    live_frames.inc("sent")
+                else:
+                    self.send_errors += 1
+                    logger.warning(f"Live frame error: {message}")
+        finally:
+            watcher.cancel()
+            if self.player.controller is self:
+                self.player.controller = None
+                self.player.image_id = None
+
+    async def cancel(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+
+    def status(self) -> dict:
+        return {
+            "running": self.running,
+            "frame_shape": list(self.shape),
+            "frame_bytes": self.frame_size,
+            "send_errors": self.send_errors,
+            "clients": [client.stats() for client in self.clients.values()]
+        }
+
+
+class LiveManager:
+    """Un relay por salida; varios clientes pueden alimentar la misma salida"""
+
+    def __init__(self):
+        self.relays = {}  # {clave de salida: LiveRelay}
+
+    async def connect(self, config: dict, client: LiveClient) -> LiveRelay:
+        key = player_manager.output_key(config)
+        relay = self.relays.get(key)
+        if relay is None or not relay.running:
+            player = await player_manager.get(config)
+            relay = LiveRelay(player, config)
+            relay.start()
+            relay.task.add_done_callback(lambda task: self._forget(relay))
+            self.relays[key] = relay
+        relay.clients[client.id] = client
+        return relay
+
+    async def disconnect(self, relay: LiveRelay, client: LiveClient):
+        relay.clients.pop(client.id, None)
+        if not relay.clients:
+            # Último cliente: liberar el reproductor
+            await relay.cancel()
+            self._forget(relay)
+
+    def _forget(self, relay: LiveRelay):
+        """Libera la salida del relay (también cuando otra reproducción toma el reproductor)"""
+        for key, current in list(self.relays.items()):
+            if current is relay:
+                del self.relays[key]
+
+    def status(self) -> dict:
+        return {key: relay.status() for key, relay in self.relays.items()}
+
+    async def shutdown(self):
+        for relay in self.relays.values():
+            await relay.cancel()
+        self.relays.clear()
+
+
+live_manager = LiveManager()
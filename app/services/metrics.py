@@ -0,0 +1,287 @@
+import asyncio
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+from app.services.jobs import process_alive
+
+logger = logging.getLogger(__name__)
+
+# Métricas de ejecución en formato de texto de Prometheus, sin dependencias externas.
+# Observar un valor es una búsqueda binaria y unas sumas bajo un lock (~1 µs), así que
+# la instrumentación puede quedarse activa a 60 fps.
+
+# Buckets en segundos, de 0.1 ms a 1 s (envíos, codificación, retraso del planificador)
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+LOOP_LAG_INTERVAL = 0.5  # Segundos entre mediciones del retraso del event loop
+# Con varios procesos (app.supervisor) cada worker de la API publica aquí sus valores y el que
+# atiende /metrics los suma a los suyos y a los del proceso de reproducción
+METRICS_DIR = Path(__file__).parent.parent.parent / "data" / "cache" / "metrics"
+PUBLISH_INTERVAL = 5.0  # Segundos entre publicaciones de cada worker
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{str(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name: str, documentation: str, labels: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._values = {}  # {valores de las etiquetas: valor}
+        self._lock = threading.Lock()
+
+    def snapshot(self) -> list:
+        """Valores serializables en JSON: [[etiquetas, valor], ...]"""
+        with self._lock:
+            return [[list(labels), self._copy(value)] for labels, value in self._values.items()]
+
+    def render(self, snapshots: list = ()) -> list:
+        """Líneas de texto con los valores de este proceso sumados a los de snapshots (de otros procesos)"""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        with self._lock:
+            values = {labels: self._copy(value) for labels, value in self._values.items()}
+        for samples in snapshots:
+            for labels, value in samples:
+                labels = tuple(labels)
+                values[labels] = value if labels not in values else self._merge(values[labels], value)
+        for labels, value in sorted(values.items()):
+            lines.extend(self._render_sample(labels, value))
+        return lines
+
+    @staticmethod
+    def _copy(value):
+        return value
+
+    @staticmethod
+    def _merge(value, other):
+        return value + other
+
+    def _render_sample(self, labels: tuple, value) -> list:
+        return [f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}"]
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0)
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def set(self, value: float, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0)
+
+    @staticmethod
+    def _merge(value, other):
+        return max(value, other)  # Entre procesos, el peor caso (retraso, trabajos pendientes)
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(labels)
+            if counts is None:
+                counts = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            counts[0][index] += 1
+            counts[1] += value
+
+    @staticmethod
+    def _copy(value):
+        return [list(value[0]), value[1]]
+
+    @staticmethod
+    def _merge(value, other):
+        return [[a + b for a, b in zip(value[0], other[0])], value[1] + other[1]]
+
+    def _render_sample(self, labels: tuple, value) -> list:
+        counts, total = value
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            le = _format_labels(self.label_names, labels, f'le="{_format_value(bound)}"')
+            lines.append(f"{self.name}_bucket{le} {cumulative}")
+        label_text = _format_labels(self.label_names, labels)
+        lines.append(f"{self.name}_sum{label_text} {_format_value(total)}")
+        lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+        self._lag_task = None
+        self.directory = METRICS_DIR  # Valores publicados por cada proceso
+        self._publish_task = None
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: tuple = ()) -> Counter:
+        return self.register(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: tuple = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labels))
+
+    def histogram(self, name: str, documentation: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def snapshot(self) -> dict:
+        return {metric.name: metric.snapshot() for metric in self.metrics}
+
+    def render(self, snapshots: list = ()) -> str:
+        """Texto de Prometheus; snapshots son valores de otros procesos que se suman a los de este"""
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render([snapshot.get(metric.name, []) for snapshot in snapshots]))
+        return "\n".join(lines) + "\n"
+
+    def publish(self):
+        """Guarda los valores de este proceso para el worker que atienda /metrics"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"{os.getpid()}.json"
+        tmp_path = path.with_name(path.name + ".tmp")
+        tmp_path.write_text(json.dumps(self.snapshot()))
+        os.replace(tmp_path, path)
+
+    def collect(self) -> list:
+        """Valores publicados por los demás procesos vivos; los de procesos terminados se borran"""
+        snapshots = []
+        for path in self.directory.glob("*.json"):
+            try:
+                pid = int(path.stem)
+            except ValueError:
+                continue
+            if pid == os.getpid():
+                continue
+            if not process_alive(pid):
+                path.unlink(missing_ok=True)
+                continue
+            try:
+                snapshots.append(json.loads(path.read_text()))
+            except (OSError, ValueError):
+                continue  # Se está sustituyendo o el proceso acaba de terminar
+        return snapshots
+
+    def start_publisher(self):
+        if self._publish_task is None:
+            self._publish_task = asyncio.create_task(self._publish_loop(), name="metrics-publish")
+
+    async def stop_publisher(self):
+        if self._publish_task is not None:
+            self._publish_task.cancel()
+            try:
+                await self._publish_task
+            except asyncio.CancelledError:
+                pass
+            self._publish_task = None
+        (self.directory / f"{os.getpid()}.json").unlink(missing_ok=True)
+
+    async def _publish_loop(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.publish)
+            except OSError as e:
+                logger.warning(f"Could not publish metrics: {e}")
+            await asyncio.sleep(PUBLISH_INTERVAL)
+
+    def start_loop_monitor(self):
+        """Mide cada LOOP_LAG_INTERVAL cuánto tarda el event loop en despertar respecto a lo pedido"""
+        if self._lag_task is None:
+            self._lag_task = asyncio.create_task(self._monitor_loop_lag(), name="metrics-loop-lag")
+
+    async def stop_loop_monitor(self):
+        if self._lag_task is not None:
+            self._lag_task.cancel()
+            try:
+                await self._lag_task
+            except asyncio.CancelledError:
+                pass
+            self._lag_task = None
+
+    async def _monitor_loop_lag(self):
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(LOOP_LAG_INTERVAL)
+            event_loop_lag.set(max(0.0, time.monotonic() - started - LOOP_LAG_INTERVAL))
+
+
+metrics = MetricsRegistry()
+
+# Ruta de frames
+frame_decode_seconds = metrics.histogram(
+    "wled_frame_decode_seconds", "Decode and transform time per frame when building a frame container")
+frame_cache_requests = metrics.counter(
+    "wled_frame_cache_requests_total", "Frame container lookups by result (memory, disk, build, stream)", ("result",))
+preview_cache_requests = metrics.counter(
+    "wled_preview_cache_requests_total", "Gallery sprite lookups by result (hit, build)", ("result",))
+
+# Envío a dispositivos
+payload_encode_seconds = metrics.histogram(
+    "wled_payload_encode_seconds", "Time to encode a frame into a JSON payload or UDP packets", ("protocol",))
+device_send_seconds = metrics.histogram(
+    "wled_device_send_seconds", "Time to send a frame to a device (HTTP round trip or UDP write)", ("device",))
+device_errors = metrics.counter(
+    "wled_device_errors_total", "Failed frame sends per device", ("device",))
+device_target_fps = metrics.gauge(
+    "wled_device_target_fps", "Highest frame rate the adaptive rate control allows per device", ("device",))
+device_online = metrics.gauge(
+    "wled_device_online", "1 while the device answers, 0 while it is offline and frames are skipped", ("device",))
+
+# Reproductor
+scheduler_lateness_seconds = metrics.histogram(
+    "wled_scheduler_lateness_seconds", "Delay between a frame deadline and its send")
+frames_sent = metrics.counter(
+    "wled_frames_sent_total", "Frames sent by the players")
+frames_dropped = metrics.counter(
+    "wled_frames_dropped_total", "Frames skipped because playback was behind schedule")
+frames_throttled = metrics.counter(
+    "wled_frames_throttled_total", "Frames skipped to stay under the adaptive device frame rate")
+frames_offline = metrics.counter(
+    "wled_frames_offline_total", "Frames skipped because the output device was offline")
+
+event_loop_lag = metrics.gauge(
+    "wled_event_loop_lag_seconds", "Extra delay of the event loop waking up from a sleep")
+players_playing = metrics.gauge(
+    "wled_players_playing", "Players currently playing an animation")
+jobs_pending = metrics.gauge(
+    "wled_jobs_pending", "Background jobs queued or running")
+live_frames = metrics.counter(
+    "wled_live_frames_total", "Live WebSocket frames by result (sent, dropped as stale, rejected, offline)", ("result",))
+effect_render_seconds = metrics.histogram(
+    "wled_effect_render_seconds", "Time to render one frame of a procedural effect", ("effect",))
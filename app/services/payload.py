@@ -0,0 +1,167 @@
+import json
+
+import numpy as np
+from PIL import Image
+
+# Un color en el array "i" cuesta "RRGGBB", = 9 caracteres en el JSON
+HEX_COLOR_COST = 9
+DELTA_MAX_CHANGED = 0.5  # Fracción de LEDs cambiados por encima de la cual se envía el frame completo
+KEYFRAME_INTERVAL = 100  # Frame completo cada N envíos aunque el delta sea pequeño
+
+
+def extract_pixels(img: Image.Image) -> np.ndarray:
+    """Devuelve los pixels de la imagen como array uint8 (alto, ancho, 3) en una sola operación"""
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    return np.asarray(img, dtype=np.uint8)
+
+
+def hex_colors(pixels: np.ndarray) -> list:
+    """Convierte pixels RGB (cualquier forma terminada en 3) a una lista de "rrggbb" """
+    encoded = np.ascontiguousarray(pixels, dtype=np.uint8).tobytes().hex()
+    return [encoded[i:i + 6] for i in range(0, len(encoded), 6)]
+
+
+def encode_ranges(pixels: np.ndarray, offset: int = 0) -> list:
+    """Forma compacta del array "i": tramos de color repetido como [inicio, fin, "rrggbb"]
+    y el resto como colores sueltos que continúan desde el último índice escrito."""
+    flat = np.ascontiguousarray(pixels, dtype=np.uint8).reshape(-1, 3)
+    count = len(flat)
+    if count == 0:
+        return []
+
+    packed = (flat[:, 0].astype(np.uint32) << 16) | (flat[:, 1].astype(np.uint32) << 8) | flat[:, 2]
+    starts = np.flatnonzero(np.concatenate(([True], packed[1:] != packed[:-1])))
+    if len(starts) * 4 > count * 3:
+        # Contenido sin tramos apreciables (foto/ruido): la lista hex es igual de corta y más rápida
+        return ([offset] if offset else []) + hex_colors(flat)
+    stops = np.append(starts[1:], count)
+    colors = hex_colors(flat[starts])
+
+    items = []
+    cursor = 0  # Índice en el que WLED escribe el siguiente color suelto
+    for start, stop, color in zip(starts.tolist(), stops.tolist(), colors):
+        length = stop - start
+        start += offset
+        stop += offset
+        # Un tramo solo compensa si ocupa menos que repetir el color
+        if length > 1 and len(str(start)) + len(str(stop)) + 2 < (length - 1) * HEX_COLOR_COST:
+            items.extend((start, stop, color))
+        else:
+            if start != cursor:
+                items.append(start)
+            items.extend([color] * length)
+        cursor = stop
+    return items
+
+
+def encode_segment(pixels: np.ndarray, ranges: bool = True) -> list:
+    """Array "i" de un segmento WLED a partir del frame empaquetado"""
+    if ranges:
+        return encode_ranges(pixels)
+    return hex_colors(pixels)
+
+
+def build_payload(pixels: np.ndarray, ranges: bool = True) -> bytes:
+    """Cuerpo JSON listo para POST /json (sin espacios)"""
+    payload = {
+        "on": True,
+        "bri": 255,
+        "effect": 0,
+        "seg": [{
+            "i": encode_segment(pixels, ranges)
+        }]
+    }
+    return json.dumps(payload, separators=(",", ":")).encode()
+
+
+def changed_runs(previous: np.ndarray, pixels: np.ndarray) -> tuple:
+    """Tramos [inicio, fin) de LEDs que cambian entre dos frames de la misma forma"""
+    changed = np.any(previous.reshape(-1, 3) != pixels.reshape(-1, 3), axis=1)
+    edges = np.flatnonzero(np.diff(np.concatenate(([False], changed, [False])).astype(np.int8)))
+    return edges[::2], edges[1::2]
+
+
+def encode_delta(pixels: np.ndarray, starts: np.ndarray, stops: np.ndarray) -> list:
+    """Array "i" que solo escribe los tramos indicados; cada tramo empieza con su índice"""
+    flat = np.ascontiguousarray(pixels, dtype=np.uint8).reshape(-1, 3)
+    items = []
+    for start, stop in zip(starts.tolist(), stops.tolist()):
+        items.extend(encode_ranges(flat[start:stop], offset=start))
+    return items
+
+
+class DeltaEncoder:
+    """Codifica cada frame como diferencia respecto al último confirmado por el dispositivo.
+
+    Se envía el frame completo si no hay frame confirmado (inicio, tras un error o cambio
+    de tamaño), si cambia más de DELTA_MAX_CHANGED de los LEDs o cada KEYFRAME_INTERVAL
+    envíos, para recuperar cualquier LED que se haya quedado desfasado.
+    """
+
+    def __init__(self, max_changed: float = DELTA_MAX_CHANGED, keyframe_interval: int = KEYFRAME_INTERVAL):
+        self.max_changed = max_changed
+        self.keyframe_interval = keyframe_interval
+        self.frames_full = 0
+        self.frames_delta = 0
+        self.frames_unchanged = 0
+        self.bytes_sent = 0
+        self.bytes_saved = 0
+        self.reset()
+
+    def reset(self):
+        """Olvida el estado del dispositivo: el próximo envío será un frame completo"""
+        self._acknowledged = None
+        self._pending = None
+        self._since_keyframe = 0
+        self._full_size = 0
+
+    def encode(self, pixels: np.ndarray, force_full: bool = False):
+        """Cuerpo JSON para el frame, o None si es idéntico al último confirmado"""
+        previous = self._acknowledged
+        full = (
+            force_full
+            or previous is None
+            or previous.shape != pixels.shape
+            or self._since_keyframe >= self.keyframe_interval
+        )
+        if not full:
+            starts, stops = changed_runs(previous, pixels)
+            if len(starts) == 0:
+                self.frames_unchanged += 1
+                self.bytes_saved += self._full_size
+                return None
+            changed = int((stops - starts).sum())
+            full = changed > pixels.size // 3 * self.max_changed
+
+        if full:
+            payload = build_payload(pixels)
+            self._full_size = len(payload)
+            self._since_keyframe = 0
+            self.frames_full += 1
+        else:
+            # Sin "on"/"bri"/"effect": el dispositivo ya está en el estado del frame completo
+            payload = json.dumps({"seg": [{"i": encode_delta(pixels, starts, stops)}]}, separators=(",", ":")).encode()
+            self._since_keyframe += 1
+            self.frames_delta += 1
+            self.bytes_saved += max(0, self._full_size - len(payload))
+        self.bytes_sent += len(payload)
+        self._pending = np.array(pixels, dtype=np.uint8, copy=True)
+        return payload
+
+    def acknowledge(self):
+        """El dispositivo aceptó el último frame codificado"""
+        if self._pending is not None:
+            self._acknowledged = self._pending
+            self._pending = None
+
+    def stats(self) -> dict:
+        total = self.bytes_sent + self.bytes_saved
+        return {
+            "frames_full": self.frames_full,
+            "frames_delta": self.frames_delta,
+            "frames_unchanged": self.frames_unchanged,
+            "bytes_sent": self.bytes_sent,
+            "bytes_saved": self.bytes_saved,
+            "saved_ratio": round(self.bytes_saved / total, 3) if total else 0.0
+        }
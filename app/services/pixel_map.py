@@ -0,0 +1,110 @@
+import numpy as np
+
+# Orden físico de los LEDs: rotación, espejo, cableado del panel y ledmap se combinan en un
+# único array de índices por tamaño de frame. Cada frame se reordena con un solo gather
+# (frame[indices]) en lugar de rotar/voltear/copiar la imagen varias veces.
+
+
+def logical_size(width: int, height: int, rotation: int = 0) -> tuple:
+    """Tamaño al que se renderiza el contenido para que, tras rotarlo, ocupe la matriz (ancho, alto)"""
+    if rotation in (90, 270):
+        return height, width
+    return width, height
+
+
+def build_index_map(frame_width: int, frame_height: int, rotation: int = 0, mirror_v: bool = False,
+                    mirror_h: bool = False, serpentine: bool = False, vertical: bool = False, ledmap=None) -> np.ndarray:
+    """Índice del pixel del frame (recorrido por filas) que muestra cada LED físico; -1 = LED apagado.
+
+    - rotation: grados antihorario (como Image.rotate); 90/270 intercambian ancho y alto.
+    - mirror_v / mirror_h: voltear de arriba a abajo / de izquierda a derecha.
+    - vertical: el cableado recorre columnas en lugar de filas.
+    - serpentine: las filas (o columnas) impares van en sentido contrario (zig-zag).
+    - ledmap: "map" de un ledmap.json de WLED; ledmap[i] es el LED físico del pixel lógico i
+      (-1 si el pixel no tiene LED). Como en WLED, los pixeles a partir de len(ledmap) no se remapean.
+    """
+    grid = np.arange(frame_width * frame_height, dtype=np.int32).reshape(frame_height, frame_width)
+    if rotation in (90, 180, 270):
+        grid = np.rot90(grid, rotation // 90)
+    if mirror_v:
+        grid = grid[::-1]
+    if mirror_h:
+        grid = grid[:, ::-1]
+
+    lines = grid.T if vertical else grid
+    if serpentine:
+        lines = lines.copy()
+        lines[1::2] = lines[1::2, ::-1]
+    indices = np.ascontiguousarray(lines).ravel()
+
+    if ledmap:
+        # El ledmap asigna pixeles lógicos a LEDs físicos; se invierte para poder hacer un gather
+        physical = np.asarray(ledmap, dtype=np.int64)
+        logical = np.flatnonzero((physical >= 0) & (np.arange(len(physical)) < len(indices)))
+        mapped = np.full(max(len(indices), int(physical.max(initial=-1)) + 1), -1, dtype=np.int32)
+        unmapped = np.arange(len(physical), len(indices))
+        mapped[unmapped] = indices[unmapped]
+        mapped[physical[logical]] = indices[logical]
+        indices = mapped
+    return indices
+
+
+class PixelLayout:
+    """Orden físico de los LEDs de un dispositivo; el array de índices se calcula una vez por tamaño de frame"""
+
+    def __init__(self, rotation: int = 0, mirror_v: bool = False, mirror_h: bool = False,
+                 serpentine: bool = False, vertical: bool = False, ledmap=None):
+        self.rotation = rotation if rotation in (90, 180, 270) else 0
+        self.mirror_v = bool(mirror_v)
+        self.mirror_h = bool(mirror_h)
+        self.serpentine = bool(serpentine)
+        self.vertical = bool(vertical)
+        self.ledmap = list(ledmap) if ledmap else None
+        self._shape = None  # (alto, ancho, región) del array de índices cacheado
+        self._indices = None
+        self._blank = False  # Hay LEDs sin pixel (ledmap con huecos)
+
+    @classmethod
+    def from_config(cls, device_config: dict):
+        """Disposición de la sección "wled" o de un tile del canvas"""
+        return cls(
+            device_config.get("rotation", 0),
+            device_config.get("mirror_v", False),
+            device_config.get("mirror_h", False),
+            device_config.get("serpentine", False),
+            device_config.get("vertical", False),
+            device_config.get("ledmap")
+        )
+
+    @property
+    def is_identity(self) -> bool:
+        return not (self.rotation or self.mirror_v or self.mirror_h or self.serpentine or self.vertical or self.ledmap)
+
+    def indices(self, frame_height: int, frame_width: int, region: tuple = None) -> np.ndarray:
+        """Índices sobre el frame completo; region=(x, y, ancho, alto) limita el dispositivo a un recorte
+        (tiles del canvas), de modo que el recorte y el reordenamiento son el mismo gather"""
+        key = (frame_height, frame_width, region)
+        if key != self._shape:
+            x, y, width, height = region or (0, 0, frame_width, frame_height)
+            indices = build_index_map(
+                width, height, self.rotation, self.mirror_v, self.mirror_h,
+                self.serpentine, self.vertical, self.ledmap
+            )
+            if region is not None:
+                rows, cols = np.divmod(indices, width)
+                indices = np.where(indices < 0, -1, (y + rows) * frame_width + x + cols).astype(np.int32)
+            self._indices = indices
+            self._blank = bool((indices < 0).any())
+            self._shape = key
+        return self._indices
+
+    def apply(self, frame: np.ndarray, region: tuple = None) -> np.ndarray:
+        """Frame (alto, ancho, 3) en orden lógico -> LEDs (n, 3) en orden físico"""
+        if self.is_identity and region is None:
+            return frame
+        indices = self.indices(frame.shape[0], frame.shape[1], region)
+        flat = frame.reshape(-1, 3)
+        if self._blank:
+            # Un pixel negro al final para los LEDs sin pixel (índice -1)
+            flat = np.concatenate((flat, np.zeros((1, 3), dtype=flat.dtype)))
+        return flat[indices]
@@ -0,0 +1,193 @@
+import asyncio
+import json
+import logging
+
+import aiohttp
+from starlette.routing import Match
+
+logger = logging.getLogger(__name__)
+
+# Reenvío de las rutas de reproducción al proceso de reproducción (app.engine) por su socket
+# Unix. Es HTTP normal, así que el stream de eventos (SSE) y el WebSocket en directo pasan
+# tal cual; si el proceso no responde (p.ej. reiniciándose) la API contesta 503.
+
+CONNECT_TIMEOUT = 2.0  # Segundos para conectar con el socket
+# Cabeceras de la conexión entre cliente y API, que no se reenvían
+HOP_HEADERS = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+    "te", "trailer", "transfer-encoding", "upgrade", "host"
+}
+
+
+class PlaybackClient:
+    """Sesión HTTP con el proceso de reproducción, compartida por todas las peticiones del worker"""
+
+    def __init__(self):
+        self.socket_path = None
+        self._session = None
+
+    def configure(self, socket_path: str):
+        self.socket_path = socket_path
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.UnixConnector(path=self.socket_path),
+                # Sin límite total: el stream de eventos y el WebSocket duran lo que quiera el cliente
+                timeout=aiohttp.ClientTimeout(total=None, sock_connect=CONNECT_TIMEOUT),
+                auto_decompress=False
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+playback_client = PlaybackClient()
+
+
+def _url(scope) -> str:
+    query = scope.get("query_string", b"").decode("latin-1")
+    return f"http://playback{scope['path']}" + (f"?{query}" if query else "")
+
+
+def _request_headers(scope) -> list:
+    return [
+        (name.decode("latin-1"), value.decode("latin-1"))
+        for name, value in scope["headers"]
+        if name.decode("latin-1").lower() not in HOP_HEADERS
+    ]
+
+
+async def _wait_disconnect(receive):
+    while (await receive())["type"] not in ("http.disconnect", "websocket.disconnect"):
+        pass
+
+
+async def _first_completed(*coroutines):
+    """Ejecuta las corrutinas hasta que termina la primera y cancela el resto"""
+    tasks = [asyncio.ensure_future(coroutine) for coroutine in coroutines]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    for task in done:
+        task.result()
+
+
+class PlaybackProxy:
+    """Middleware ASGI: las peticiones que coinciden con una ruta del proceso de reproducción
+    se reenvían a su socket; el resto las atiende la aplicación"""
+
+    def __init__(self, app, routes, client: PlaybackClient = playback_client):
+        self.app = app
+        self.routes = routes
+        self.client = client
+
+    def _matches(self, scope) -> bool:
+        return any(route.matches(scope)[0] != Match.NONE for route in self.routes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket") or not self._matches(scope):
+            await self.app(scope, receive, send)
+        elif scope["type"] == "http":
+            await self._proxy_http(scope, receive, send)
+        else:
+            await self._proxy_websocket(scope, receive, send)
+
+    async def _proxy_http(self, scope, receive, send):
+        body = bytearray()
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+
+        try:
+            response = await self.client.session.request(
+                scope["method"], _url(scope), headers=_request_headers(scope), data=bytes(body), allow_redirects=False
+            )
+        except (aiohttp.ClientError, OSError) as e:
+            logger.warning(f"Playback process unavailable for {scope['method']} {scope['path']}: {e}")
+            await self._unavailable(send)
+            return
+
+        started = False
+
+        async def relay():
+            nonlocal started
+            started = True
+            await send({
+                "type": "http.response.start",
+                "status": response.status,
+                "headers": [
+                    (name.lower(), value) for name, value in response.raw_headers
+                    if name.decode("latin-1").lower() not in HOP_HEADERS
+                ]
+            })
+            async for chunk in response.content.iter_any():
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+
+        try:
+            async with response:
+                # Un stream de eventos no termina nunca: se corta cuando el cliente se desconecta
+                await _first_completed(relay(), _wait_disconnect(receive))
+        except (aiohttp.ClientError, OSError) as e:
+            # El proceso de reproducción terminó a mitad de respuesta
+            logger.warning(f"Playback process closed {scope['method']} {scope['path']}: {e}")
+            if not started:
+                await self._unavailable(send)
+
+    @staticmethod
+    async def _unavailable(send):
+        body = json.dumps({"detail": "El proceso de reproducción no está disponible"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def _proxy_websocket(self, scope, receive, send):
+        if (await receive())["type"] != "websocket.connect":
+            return
+        try:
+            upstream = await self.client.session.ws_connect(_url(scope), autoping=True)
+        except (aiohttp.ClientError, OSError) as e:
+            logger.warning(f"Playback process unavailable for WebSocket {scope['path']}: {e}")
+            await send({"type": "websocket.close", "code": 1013})
+            return
+        await send({"type": "websocket.accept"})
+
+        async def client_to_engine():
+            while True:
+                message = await receive()
+                if message["type"] == "websocket.disconnect":
+                    return
+                if message.get("bytes") is not None:
+                    await upstream.send_bytes(message["bytes"])
+                elif message.get("text") is not None:
+                    await upstream.send_str(message["text"])
+
+        async def engine_to_client():
+            async for message in upstream:
+                if message.type == aiohttp.WSMsgType.BINARY:
+                    await send({"type": "websocket.send", "bytes": message.data})
+                elif message.type == aiohttp.WSMsgType.TEXT:
+                    await send({"type": "websocket.send", "text": message.data})
+            # 1006 (cierre anómalo) no se puede enviar: se informa como error del servidor
+            code = upstream.close_code or 1000
+            await send({"type": "websocket.close", "code": 1011 if code == 1006 else code})
+
+        try:
+            await _first_completed(client_to_engine(), engine_to_client())
+        finally:
+            await upstream.close()
@@ -0,0 +1,546 @@
+import asyncio
+import logging
+import time
+from collections import deque
+
+from app.services.canvas import CanvasOutput, canvas_tiles, frame_geometry
+from app.services.catalog import asset_catalog
+from app.services.config import config_service
+from app.services.device_health import DeviceOffline
+from app.services.frame_store import frame_store
+from app.services.metrics import frames_dropped, frames_offline, frames_sent, frames_throttled, scheduler_lateness_seconds
+from app.services.pixel_map import PixelLayout
+from app.services.wled_service import WledService, STATIC_TIMEOUT
+from app.services.realtime import REALTIME_PROTOCOLS
+
+logger = logging.getLogger(__name__)
+
+# Estados del reproductor
+STOPPED = "stopped"
+PLAYING = "playing"
+PAUSED = "paused"
+
+MIN_FRAME_MS = 16  # ~60 fps como máximo
+DEFAULT_FRAME_MS = 100  # GIFs con duración 0 se muestran a 10 fps, como en los navegadores
+STATS_WINDOW = 240  # Frames usados para calcular fps y retraso
+
+
+class PlaybackStats:
+    """Estadísticas de reproducción: fps conseguidos, retraso respecto al deadline y frames saltados"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self.frames_throttled = 0  # Saltados para no superar el ritmo máximo del dispositivo
+        self.frames_offline = 0  # Saltados con el dispositivo sin conexión
+        self.send_errors = 0
+        self.underruns = 0  # Esperas al decodificador (frames en streaming)
+        self.max_lateness = 0.0
+        self._samples = deque(maxlen=STATS_WINDOW)  # (instante de envío, retraso)
+
+    def record_sent(self, sent_at: float, lateness: float):
+        self.frames_sent += 1
+        self.max_lateness = max(self.max_lateness, lateness)
+        self._samples.append((sent_at, lateness))
+
+    def snapshot(self) -> dict:
+        fps = 0.0
+        lateness = [sample[1] for sample in self._samples]
+        if len(self._samples) > 1:
+            elapsed = self._samples[-1][0] - self._samples[0][0]
+            if elapsed > 0:
+                fps = (len(self._samples) - 1) / elapsed
+        lateness_sorted = sorted(lateness)
+        return {
+            "fps": round(fps, 2),
+            "frames_sent": self.frames_sent,
+            "frames_dropped": self.frames_dropped,
+            "frames_throttled": self.frames_throttled,
+            "frames_offline": self.frames_offline,
+            "send_errors": self.send_errors,
+            "underruns": self.underruns,
+            "lateness_ms": {
+                "avg": round(sum(lateness) / len(lateness) * 1000, 2) if lateness else 0.0,
+                "p95": round(lateness_sorted[int(len(lateness_sorted) * 0.95)] * 1000, 2) if lateness else 0.0,
+                "max": round(self.max_lateness * 1000, 2)
+            }
+        }
+
+
+class Player:
+    """Reproductor de larga duración para un dispositivo WLED.
+
+    Los frames se programan con deadlines absolutos sobre un reloj monótono: la latencia
+    del envío no se suma a la duración del frame y, si el envío va tarde, se saltan los
+    frames cuyo intervalo ya ha pasado en vez de acumular retraso. Con el dispositivo sin
+    conexión los frames siguen avanzando sin enviarse, y al reconectar se continúa por el actual.
+    """
+
+    def __init__(self, output, on_change=None):
+        self.output = output  # WledService o CanvasOutput
+        self.on_change = on_change  # Se llama sin argumentos al cambiar estado, asset o posición
+        self.state = STOPPED
+        self.image_id = None
+        self.frames = None
+        self.loop = False
+        self.frame_delay = None  # ms; si es None se usa la duración de cada frame
+        self.index = 0
+        self.stats = PlaybackStats()
+        self.queue = deque()  # (image_id, frames) que siguen sin hueco al terminar los actuales
+        self.controller = None  # Playlist, relay en directo o efecto que controla el reproductor, si hay
+        self._deadline = 0.0
+        self._next_send = 0.0  # Primer instante permitido por el ritmo adaptativo de la salida
+        self._generation = 0  # Cambia con cada play/stop para descartar envíos en curso
+        self._changed = asyncio.Event()
+        self._seek_pending = False  # En pausa, enviar el frame elegido con seek()
+        self._resend_pending = False  # El dispositivo ha vuelto: reenviar el frame en pausa o la imagen fija
+        self._still = None  # Imagen fija mostrada con show()
+        self.output.on_online = self._output_online
+        self.clip_changed = asyncio.Event()  # Se activa al pasar a los frames encolados, con play/stop y al terminar
+        self._task = None
+
+    async def start(self):
+        """Abre la conexión con el dispositivo y arranca la tarea del reproductor"""
+        if self._task is None:
+            await self.output.open()
+            self._task = asyncio.create_task(self._run(), name=f"player-{self.output.ip}")
+
+    async def shutdown(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.output.close()
+
+    def play(self, image_id: str, frames, loop: bool = False, frame_delay: int = None):
+        """Reproduce desde el primer frame (sustituye lo que se estuviera reproduciendo)"""
+        self.image_id = image_id
+        self._set_frames(frames)
+        self.loop = loop
+        self.frame_delay = frame_delay
+        self.index = 0
+        self.queue.clear()
+        self.controller = None  # Una playlist, relay o efecto se vuelve a asignar tras play()
+        self._still = None
+        self.stats.reset()
+        self._generation += 1
+        self._deadline = time.monotonic()
+        self._set_state(PLAYING)
+        self.clip_changed.set()
+        self._notify()
+
+    def enqueue(self, image_id: str, frames):
+        """Encola frames para reproducirlos justo al terminar los actuales, en el límite de frame"""
+        self.queue.append((image_id, frames))
+
+    @property
+    def generation(self) -> int:
+        """Identifica la reproducción en curso (cambia con cada play/stop, no al pasar a frames encolados)"""
+        return self._generation
+
+    def replace_frames(self, frames):
+        """Sustituye los frames (re-renderizados para otra matriz o transformación) sin cambiar la posición"""
+        self._set_frames(frames)
+        self.index = min(self.index, len(frames) - 1)
+
+    def seek(self, index: int) -> bool:
+        """Salta al frame indicado; se envía en el siguiente ciclo del reproductor, también en pausa"""
+        if self.frames is None:
+            return False
+        self.index = max(0, min(index, len(self.frames) - 1))
+        self._deadline = time.monotonic()
+        self._seek_pending = self.state == PAUSED
+        self._changed.set()
+        self._notify()
+        return True
+
+    def pause(self):
+        if self.state == PLAYING:
+            self._set_state(PAUSED)
+
+    def resume(self):
+        if self.state == PAUSED:
+            # Reanudar sin contar la pausa como retraso
+            self._deadline = time.monotonic()
+            self._set_state(PLAYING)
+
+    def stop(self):
+        self._set_frames(None)
+        self.image_id = None
+        self.queue.clear()
+        self.controller = None
+        self._still = None
+        self._generation += 1
+        self._set_state(STOPPED)
+        self.clip_changed.set()
+
+    async def show(self, image_id: str, frame):
+        """Detiene la reproducción y muestra un único frame de forma indefinida"""
+        self.stop()
+        self.image_id = image_id
+        self._still = frame
+        try:
+            return await self.output.send_frame(frame, hold=True, timeout=STATIC_TIMEOUT)
+        except DeviceOffline as e:
+            return False, f"{e}: se mostrará al reconectar"
+        except asyncio.TimeoutError:
+            return False, "Timeout esperando respuesta de WLED"
+        except Exception as e:
+            return False, f"Error de conexión: {str(e)}"
+
+    def status(self) -> dict:
+        return {
+            "state": self.state,
+            "image_id": self.image_id,
+            "frame": self.index,
+            "frame_count": len(self.frames) if self.frames is not None else 0,
+            "loop": self.loop,
+            "queued": len(self.queue),
+            "output_rate": self.output.rate_status(),
+            "online": self.output.online,
+            "buffer": self.frames.buffer_status() if hasattr(self.frames, "buffer_status") else None,
+            "stats": self.stats.snapshot()
+        }
+
+    def _set_frames(self, frames):
+        """Cambia los frames en curso; los que se dejan de usar liberan su decodificador (streaming)"""
+        previous = self.frames
+        self.frames = frames
+        close = getattr(previous, "close", None)
+        if close is not None and previous is not frames:
+            close()
+
+    async def _frame_available(self) -> bool:
+        """Con frames en streaming, espera a que el decodificador llegue al frame actual.
+        False si mientras tanto se cambió la reproducción o la animación resultó ser más corta."""
+        frames = self.frames
+        if not hasattr(frames, "wait_ready") or frames.is_ready(self.index):
+            return True
+        generation = self._generation
+        self.stats.underruns += 1
+        await frames.wait_ready(self.index)
+        if generation != self._generation or self.frames is not frames:
+            return False
+        if self.index >= len(frames):
+            # El archivo tenía menos frames de los que decía el catálogo
+            if self.loop and len(frames):
+                self.index = 0
+            else:
+                self._finish()
+            return False
+        # La espera al decodificador no cuenta como retraso de envío
+        self._deadline = time.monotonic()
+        return True
+
+    def _set_state(self, state: str):
+        self.state = state
+        self._changed.set()
+        self._notify()
+
+    def _output_online(self):
+        """El dispositivo (o un tile) vuelve a responder; reproduciendo, el siguiente frame ya va completo"""
+        self._resend_pending = True
+        self._changed.set()
+        self._notify()
+
+    def _notify(self):
+        if self.on_change is not None:
+            self.on_change()
+
+    def _duration(self, index: int) -> float:
+        """Duración del frame en segundos"""
+        if self.frame_delay is not None:
+            return max(self.frame_delay, MIN_FRAME_MS) / 1000.0
+        duration = self.frames.durations[index] or DEFAULT_FRAME_MS
+        return max(duration, MIN_FRAME_MS) / 1000.0
+
+    def _advance(self) -> bool:
+        """Pasa al siguiente frame; devuelve False si la animación ha terminado"""
+        self.index += 1
+        if self.index >= len(self.frames):
+            if self.queue:
+                # Cambio sin hueco: el deadline sigue corriendo y la conexión no se cierra
+                self.image_id, frames = self.queue.popleft()
+                self._set_frames(frames)
+                self.index = 0
+                self.clip_changed.set()
+                self._notify()
+                return True
+            if not self.loop:
+                return False
+            self.index = 0
+        return True
+
+    async def _run(self):
+        while True:
+            self._changed.clear()
+            if self._seek_pending:
+                self._seek_pending = False
+                if self.state == PAUSED and self.frames is not None and await self._frame_available():
+                    await self._send_frame(self.index)
+                continue
+            if self._resend_pending:
+                self._resend_pending = False
+                await self._resend()
+                continue
+            if self.state != PLAYING:
+                await self._changed.wait()
+                continue
+
+            delay = max(self._deadline, self._next_send) - time.monotonic()
+            if delay > 0:
+                # Despertar en el deadline o antes si cambia el control; después reevaluar
+                await self._wait_changed(delay)
+                continue
+
+            await self._send_due_frame()
+
+    async def _wait_changed(self, timeout: float):
+        """Espera a un cambio de control como mucho timeout segundos (sin tareas extra, a diferencia de wait_for)"""
+        timer = asyncio.get_running_loop().call_later(timeout, self._changed.set)
+        try:
+            await self._changed.wait()
+        finally:
+            timer.cancel()
+
+    async def _send_due_frame(self):
+        if not await self._frame_available() or self.state != PLAYING:
+            return
+        now = time.monotonic()
+        # Esperando al ritmo máximo de la salida: los frames saltados no son retraso
+        throttled = self._next_send > self._deadline
+
+        # Si vamos tarde, saltar los frames cuyo intervalo ya ha pasado por completo
+        while now >= self._deadline + self._duration(self.index):
+            self._deadline += self._duration(self.index)
+            if throttled:
+                self.stats.frames_throttled += 1
+                frames_throttled.inc()
+            else:
+                self.stats.frames_dropped += 1
+                frames_dropped.inc()
+            if not self._advance():
+                self._finish()
+                return
+            if hasattr(self.frames, "wait_ready") and not self.frames.is_ready(self.index):
+                # El decodificador va por detrás: esperar al frame en vez de seguir saltando
+                return
+
+        generation = self._generation
+        sent = await self._send_frame(self.index)
+
+        if generation != self._generation:
+            return  # Se cambió o detuvo la reproducción mientras se enviaba
+        if not sent:
+            # Sin conexión: el frame se salta y se sigue el calendario, sin acumular frames pendientes
+            self._deadline += self._duration(self.index)
+            if not self._advance():
+                self._finish()
+            return
+        lateness = now - max(self._deadline, self._next_send)
+        self.stats.record_sent(now, lateness)
+        frames_sent.inc()
+        scheduler_lateness_seconds.observe(lateness)
+        self._next_send = now + self.output.min_interval
+        self._deadline += self._duration(self.index)
+        if not self._advance():
+            self._finish()
+
+    async def _send_frame(self, index: int) -> bool:
+        """False si la salida está sin conexión y el frame no se ha intentado enviar. El envío
+        tiene como timeout el periodo del frame: un dispositivo que no responde no retrasa más de uno."""
+        period = max(self._duration(index), self.output.min_interval)
+        try:
+            success, message = await self.output.send_frame(self.frames.frame(index), timeout=period)
+            if not success:
+                self.stats.send_errors += 1
+                logger.warning(f"Frame {index} error: {message}")
+        except DeviceOffline:
+            # Ya se avisó al perder la conexión: no llenar el log con un error por frame
+            self.stats.frames_offline += 1
+            frames_offline.inc()
+            return False
+        except Exception as e:
+            self.stats.send_errors += 1
+            logger.error(f"Error enviando frame {index}: {str(e)}")
+        return True
+
+    async def _resend(self):
+        """Tras reconectar, el frame en pausa o la imagen fija (reproduciendo no hace falta)"""
+        if self.state == PAUSED and self.frames is not None and await self._frame_available():
+            await self._send_frame(self.index)
+        elif self.state == STOPPED and self._still is not None:
+            try:
+                success, message = await self.output.send_frame(self._still, hold=True, timeout=STATIC_TIMEOUT)
+            except Exception as e:
+                success, message = False, f"{type(e).__name__}: {e}"
+            if not success:
+                logger.warning(f"Error reenviando la imagen {self.image_id}: {message}")
+
+    def _finish(self):
+        logger.info(f"Animación {self.image_id} terminada ({self.stats.frames_sent} frames enviados, {self.stats.frames_dropped} saltados)")
+        self.index = len(self.frames) - 1
+        self._set_frames(None)
+        self.state = STOPPED
+        self.clip_changed.set()
+        self._notify()
+
+
+class PlayerManager:
+    """Un reproductor por dispositivo (o canvas de varios dispositivos), vivo mientras dura la aplicación"""
+
+    def __init__(self):
+        self.players = {}  # {clave de salida: Player}
+        self._loop = None
+        self._updated = asyncio.Event()  # Se sustituye en cada aviso para despertar a todos los suscriptores
+
+    def notify(self):
+        """Avisa a los suscriptores (stream de eventos de la UI) de un cambio en algún reproductor"""
+        self._updated.set()
+        self._updated = asyncio.Event()
+
+    async def wait_changed(self, timeout: float) -> bool:
+        """Espera al siguiente cambio de cualquier reproductor; False si pasa timeout sin cambios"""
+        updated = self._updated
+        try:
+            async with asyncio.timeout(timeout):
+                await updated.wait()
+            return True
+        except TimeoutError:
+            return False
+
+    @staticmethod
+    def device_key(wled_config: dict) -> str:
+        protocol = wled_config.get("protocol", "http")
+        port = wled_config.get("udp_port") or wled_config.get("port", 80)
+        key = f"{protocol}://{wled_config.get('ip')}:{port}"
+        if not wled_config.get("delta", True) and protocol not in REALTIME_PROTOCOLS:
+            key += "?delta=0"  # Activar/desactivar delta crea una salida nueva
+        return key
+
+    def output_key(self, config: dict) -> str:
+        tiles = canvas_tiles(config)
+        if tiles:
+            return "canvas:" + ",".join(self.device_key(tile) for tile in tiles)
+        return self.device_key(config.get("wled", {}))
+
+    @staticmethod
+    def create_output(config: dict):
+        """Salida configurada: canvas de varios tiles o un único WLED"""
+        tiles = canvas_tiles(config)
+        if tiles:
+            canvas = config["canvas"]
+            return CanvasOutput(canvas.get("width", 20), canvas.get("height", 20), tiles)
+        wled_config = config.get("wled", {})
+        return WledService(
+            ip=wled_config.get("ip"),
+            port=wled_config.get("port", 80),
+            protocol=wled_config.get("protocol", "http"),
+            udp_port=wled_config.get("udp_port"),
+            delta=wled_config.get("delta", True),
+            layout=PixelLayout.from_config(wled_config),
+            adaptive=True
+        )
+
+    async def get(self, config: dict) -> Player:
+        """Obtiene (o crea y arranca) el reproductor de la salida configurada"""
+        self._loop = asyncio.get_running_loop()
+        key = self.output_key(config)
+        player = self.players.get(key)
+        if player is None:
+            player = Player(self.create_output(config), on_change=self.notify)
+            await player.start()
+            self.players[key] = player
+            self.notify()
+        return player
+
+    def find(self, config: dict) -> Player:
+        """Reproductor existente de la salida configurada, sin crearlo"""
+        return self.players.get(self.output_key(config))
+
+    def on_config_changed(self, previous: dict, config: dict):
+        """Suscriptor de la configuración; puede llamarse desde cualquier hilo"""
+        if self._loop is not None and self.players:
+            asyncio.run_coroutine_threadsafe(self._apply_config(previous, config), self._loop)
+
+    async def _apply_config(self, previous: dict, config: dict):
+        key = self.output_key(config)
+        geometry = frame_geometry(config)
+        for player_key, player in list(self.players.items()):
+            if player_key != key:
+                # La salida ya no está configurada: no seguir enviando al dispositivo anterior
+                logger.info(f"Output {player_key} no longer configured, stopping its player")
+                del self.players[player_key]
+                player.stop()
+                await player.shutdown()
+                self.notify()
+                continue
+
+            # Rotación, espejo, cableado y regiones de los tiles: solo cambia el gather al enviar
+            self.configure_output(player.output, config)
+            if player.image_id is None:
+                continue
+            if geometry == frame_geometry(previous):
+                if player.frames is None and self.layout_changed(previous, config):
+                    # Imagen fija: volver a enviarla con la nueva disposición
+                    asset = asset_catalog.get(player.image_id)
+                    if asset is not None:
+                        frames = await frame_store.get_async(asset_catalog.assets_dir / asset["filename"], *geometry)
+                        await player.show(player.image_id, frames.frame(min(player.index, len(frames) - 1)))
+                continue
+            if player.controller is not None:
+                # Una playlist re-renderiza sus propias entradas
+                await player.controller.reconfigure(config)
+                continue
+            image_id = player.image_id
+            asset = asset_catalog.get(image_id)
+            if asset is None:
+                continue
+            # Re-renderizar el asset en curso para el nuevo tamaño de matriz
+            frames = await frame_store.get_async(asset_catalog.assets_dir / asset["filename"], *geometry)
+            if player.image_id != image_id:
+                continue  # Se cambió de asset mientras se renderizaba
+            if player.frames is not None:
+                player.replace_frames(frames)
+            else:
+                await player.show(image_id, frames.frame(min(player.index, len(frames) - 1)))
+            logger.info(f"Player {player_key} switched to {geometry[0]}x{geometry[1]} frames")
+
+    @staticmethod
+    def configure_output(output, config: dict):
+        if isinstance(output, CanvasOutput):
+            output.configure(config)
+        else:
+            output.layout = PixelLayout.from_config(config.get("wled", {}))
+
+    @staticmethod
+    def layout_changed(previous: dict, config: dict) -> bool:
+        if canvas_tiles(config):
+            return previous.get("canvas") != config.get("canvas")
+        keys = ("rotation", "mirror_v", "mirror_h", "serpentine", "vertical", "ledmap")
+        return any(previous.get("wled", {}).get(key) != config.get("wled", {}).get(key) for key in keys)
+
+    async def shutdown(self):
+        for player in self.players.values():
+            await player.shutdown()
+        self.players.clear()
+
+
+player_manager = PlayerManager()
+
+
+def invalidate_frames(previous: dict, config: dict):
+    """Los frames pre-renderizados dependen del tamaño de la matriz (y de si la rotación intercambia ancho y alto)"""
+    if frame_geometry(config) != frame_geometry(previous):
+        frame_store.invalidate()
+
+
+# La caché se invalida antes de que los reproductores vuelvan a renderizar sus assets
+config_service.subscribe(invalidate_frames)
+config_service.subscribe(player_manager.on_config_changed)
@@ -0,0 +1,303 @@
+import asyncio
+import copy
+import json
+import logging
+import os
+import threading
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from app.services.canvas import frame_geometry
+from app.services.catalog import asset_catalog
+from app.services.config import config_service
+from app.services.frame_store import frame_store
+from app.services.player import player_manager
+
+logger = logging.getLogger(__name__)
+
+PLAYLISTS_PATH = Path(__file__).parent.parent.parent / "data" / "playlists.json"
+DEFAULT_HOLD_MS = 5000  # Tiempo que se muestra una imagen estática si la entrada no indica duración
+HOLD_FRAME_MS = 1000  # Una imagen estática se reenvía cada segundo para que WLED no salga del modo realtime
+CROSSFADE_FRAME_MS = 33  # ~30 fps durante el fundido
+
+
+class FrameBuffer:
+    """Frames en memoria con la misma interfaz que PackedFrames"""
+
+    def __init__(self, frames: np.ndarray, durations: list):
+        self.frames = frames
+        self.durations = durations
+
+    def __len__(self):
+        return len(self.frames)
+
+    def frame(self, index: int) -> np.ndarray:
+        return self.frames[index]
+
+
+class PlaylistClip:
+    """Una entrada de playlist sobre los frames empaquetados del asset: repite la animación
+    'repeat' veces o hasta cubrir duration_ms, y divide las imágenes estáticas en reenvíos"""
+
+    def __init__(self, packed, duration_ms: int = None, repeat: int = 1):
+        self.packed = packed
+        count = len(packed)
+        if count == 1:
+            total = duration_ms or DEFAULT_HOLD_MS
+            holds = max(1, -(-total // HOLD_FRAME_MS))
+            self._indices = [0] * holds
+            self.durations = [total // holds + (1 if i < total % holds else 0) for i in range(holds)]
+        elif duration_ms:
+            # Repetir la animación hasta cubrir la duración y cortar en el límite de frame
+            self._indices, self.durations, elapsed = [], [], 0
+            while elapsed < duration_ms:
+                index = len(self._indices) % count
+                self._indices.append(index)
+                self.durations.append(packed.durations[index])
+                elapsed += packed.durations[index] or 1
+        else:
+            self._indices = list(range(count)) * max(1, repeat)
+            self.durations = [packed.durations[index] for index in self._indices]
+
+    def __len__(self):
+        return len(self._indices)
+
+    def frame(self, index: int) -> np.ndarray:
+        return self.packed.frame(self._indices[index])
+
+
+def crossfade(last: np.ndarray, first: np.ndarray, duration_ms: int) -> FrameBuffer:
+    """Fundido entre el último frame de una entrada y el primero de la siguiente.
+    Todos los frames se calculan de una vez con broadcasting (sin bucles por píxel)."""
+    steps = max(1, duration_ms // CROSSFADE_FRAME_MS)
+    weights = (np.arange(1, steps + 1, dtype=np.uint16) * 256 // (steps + 1)).reshape(-1, 1, 1, 1)
+    a = last.astype(np.uint16)[np.newaxis]
+    b = first.astype(np.uint16)[np.newaxis]
+    frames = ((a * (256 - weights) + b * weights) >> 8).astype(np.uint8)
+    return FrameBuffer(frames, [duration_ms // steps] * steps)
+
+
+class PlaylistStore:
+    """Playlists persistidas en data/playlists.json (escritura atómica)"""
+
+    def __init__(self, path: Path = PLAYLISTS_PATH):
+        self.path = path
+        self._playlists = None
+        self._lock = threading.Lock()
+
+    def _all(self) -> dict:
+        if self._playlists is None:
+            self._playlists = {}
+            if self.path.exists():
+                with open(self.path, "r") as f:
+                    self._playlists = {playlist["id"]: playlist for playlist in json.load(f)}
+        return self._playlists
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(list(self._playlists.values()), f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def list(self) -> list:
+        with self._lock:
+            return copy.deepcopy(list(self._all().values()))
+
+    def get(self, playlist_id: str):
+        with self._lock:
+            return copy.deepcopy(self._all().get(playlist_id))
+
+    def create(self, data: dict) -> dict:
+        with self._lock:
+            playlist = {
+                "id": str(uuid.uuid4())[:8],
+                **data,
+                "created_at": datetime.now().isoformat()
+            }
+            self._all()[playlist["id"]] = playlist
+            self._save()
+            return copy.deepcopy(playlist)
+
+    def update(self, playlist_id: str, data: dict):
+        with self._lock:
+            playlist = self._all().get(playlist_id)
+            if playlist is None:
+                return None
+            playlist.update(data)
+            self._save()
+            return copy.deepcopy(playlist)
+
+    def delete(self, playlist_id: str) -> bool:
+        with self._lock:
+            if self._all().pop(playlist_id, None) is None:
+                return False
+            self._save()
+            return True
+
+
+class PlaylistRunner:
+    """Reproduce una playlist en un reproductor. Mientras suena una entrada se pre-renderiza
+    la siguiente y se encola en el reproductor, que cambia sin hueco en el límite de frame."""
+
+    def __init__(self, player, playlist: dict, config: dict):
+        self.player = player
+        self.playlist = playlist
+        self.geometry = frame_geometry(config)
+        self.position = 0
+        self.task = None
+
+    def start(self, position: int = 0):
+        self.task = asyncio.create_task(self._run(position), name=f"playlist-{self.playlist['id']}")
+
+    async def reconfigure(self, config: dict):
+        """Cambio de matriz o transformación: volver a renderizar desde la entrada actual"""
+        await self.cancel()
+        self.geometry = frame_geometry(config)
+        self.start(self.position)
+
+    async def cancel(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+
+    def status(self) -> dict:
+        entries = self.playlist["entries"]
+        return {
+            "playlist_id": self.playlist["id"],
+            "name": self.playlist["name"],
+            "position": self.position,
+            "entries": len(entries),
+            "asset_id": entries[self.position]["asset_id"] if entries else None,
+            "running": self.task is not None and not self.task.done()
+        }
+
+    async def _render(self, position: int):
+        """Frames de la entrada (del contenedor en disco, construido si hace falta)"""
+        entry = self.playlist["entries"][position]
+        asset = asset_catalog.get(entry["asset_id"])
+        if asset is None:
+            raise ValueError(f"Asset {entry['asset_id']} no encontrado")
+        packed = await frame_store.get_async(asset_catalog.assets_dir / asset["filename"], *self.geometry)
+        return entry["asset_id"], PlaylistClip(packed, entry.get("duration_ms"), entry.get("repeat", 1))
+
+    def _next_position(self, position: int):
+        position += 1
+        if position >= len(self.playlist["entries"]):
+            if not self.playlist.get("loop", False):
+                return None
+            position = 0
+        return position
+
+    async def _render_next(self, position: int):
+        """Siguiente entrada reproducible, saltando las que fallan; None si se acaba la playlist"""
+        for _ in range(len(self.playlist["entries"])):
+            position = self._next_position(position)
+            if position is None:
+                return None
+            try:
+                return (position, *await self._render(position))
+            except Exception as e:
+                logger.warning(f"Playlist {self.playlist['id']}: entrada {position} omitida: {e}")
+        return None
+
+    async def _run(self, position: int):
+        try:
+            await self._play_from(position)
+        finally:
+            if self.player.controller is self:
+                self.player.controller = None
+
+    async def _play_from(self, position: int):
+        crossfade_ms = self.playlist.get("crossfade_ms", 0)
+        rendered = await self._render_next(position - 1)
+        if rendered is None:
+            return
+        self.position, asset_id, clip = rendered
+        self.player.play(asset_id, clip, loop=False)
+        self.player.controller = self
+        generation = self.player.generation
+
+        while True:
+            # Pre-renderizar la siguiente entrada mientras suena la actual
+            rendered = await self._render_next(self.position)
+            if rendered is None or self.player.generation != generation:
+                return
+            position, next_asset_id, next_clip = rendered
+
+            if self.player.frames is None:
+                # La entrada actual terminó antes de tener lista la siguiente
+                self.player.play(next_asset_id, next_clip, loop=False)
+                self.player.controller = self
+                generation = self.player.generation
+            else:
+                if crossfade_ms > 0:
+                    self.player.enqueue(next_asset_id, crossfade(clip.frame(len(clip) - 1), next_clip.frame(0), crossfade_ms))
+                self.player.enqueue(next_asset_id, next_clip)
+
+                # Esperar a que el reproductor pase a la siguiente entrada
+                while self.player.frames is not next_clip:
+                    if self.player.generation != generation:
+                        return  # Detenido o sustituido por otra reproducción
+                    self.player.clip_changed.clear()
+                    await self.player.clip_changed.wait()
+            self.position, clip = position, next_clip
+
+
+class PlaylistManager:
+    """CRUD de playlists y una reproducción de playlist por salida"""
+
+    def __init__(self):
+        self.store = PlaylistStore()
+        self.runners = {}  # {clave de salida: PlaylistRunner}
+        self._loop = None
+
+    async def play(self, playlist: dict, config: dict) -> PlaylistRunner:
+        self._loop = asyncio.get_running_loop()
+        player = await player_manager.get(config)
+        await self.stop(config)
+        runner = PlaylistRunner(player, playlist, config)
+        runner.start()
+        self.runners[player_manager.output_key(config)] = runner
+        return runner
+
+    async def stop(self, config: dict):
+        runner = self.runners.pop(player_manager.output_key(config), None)
+        if runner is not None:
+            await runner.cancel()
+            runner.player.stop()
+
+    def status(self) -> dict:
+        return {key: runner.status() for key, runner in self.runners.items()}
+
+    def on_config_changed(self, previous: dict, config: dict):
+        """Suscriptor de la configuración; puede llamarse desde cualquier hilo"""
+        if self._loop is not None and self.runners:
+            asyncio.run_coroutine_threadsafe(self._apply_config(config), self._loop)
+
+    async def _apply_config(self, config: dict):
+        # El reproductor de una salida que ya no está configurada se detiene (PlayerManager):
+        # su playlist tampoco debe seguir figurando como en reproducción
+        key = player_manager.output_key(config)
+        for runner_key, runner in list(self.runners.items()):
+            if runner_key != key:
+                logger.info(f"Output {runner_key} no longer configured, stopping playlist {runner.playlist['id']}")
+                del self.runners[runner_key]
+                await runner.cancel()
+
+    async def shutdown(self):
+        for runner in self.runners.values():
+            await runner.cancel()
+        self.runners.clear()
+
+
+playlist_manager = PlaylistManager()
+config_service.subscribe(playlist_manager.on_config_changed)
@@ -0,0 +1,105 @@
+import hashlib
+import io
+import json
+import math
+import os
+import uuid
+from pathlib import Path
+
+from PIL import Image
+
+from app.services.video import is_video, render_video_frames
+
+# Vista previa de la galería: todos los frames de un asset en un único PNG (sprite sheet)
+# más un manifiesto con las duraciones. Se genera una vez por asset en el pool de procesos.
+PREVIEW_DIR = Path(__file__).parent.parent.parent / "data" / "cache" / "previews"
+PREVIEW_MAX_SIZE = 96  # Lado máximo de cada frame en píxeles
+MAX_PREVIEW_FRAMES = 240  # Por encima se toman frames espaciados y se suman sus duraciones
+
+
+def sprite_path(asset_id: str) -> Path:
+    return PREVIEW_DIR / f"{asset_id}_sprite.png"
+
+
+def manifest_path(asset_id: str) -> Path:
+    return PREVIEW_DIR / f"{asset_id}_sprite.json"
+
+
+def preview_size(width: int, height: int) -> tuple:
+    scale = min(1.0, PREVIEW_MAX_SIZE / max(width, height))
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def _image_frames(path: Path, size: tuple):
+    with Image.open(path) as img:
+        for index in range(getattr(img, "n_frames", 1)):
+            img.seek(index)
+            frame = img.convert("RGB").resize(size, Image.Resampling.BOX)
+            yield frame, img.info.get("duration", 100)
+
+
+def _video_frames(path: Path, size: tuple):
+    for data, duration in render_video_frames(path, size[0], size[1]):
+        yield Image.frombytes("RGB", size, data), duration
+
+
+def _write_atomic(path: Path, data: bytes):
+    # Temporal único: otro worker puede estar generando la misma vista previa
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{uuid.uuid4().hex}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def build_preview(asset_id: str, path: Path, frame_count: int, width: int, height: int) -> dict:
+    """Genera sprite sheet y manifiesto del asset; devuelve el manifiesto"""
+    path = Path(path)
+    size = preview_size(width, height)
+    step = max(1, math.ceil(frame_count / MAX_PREVIEW_FRAMES))
+    frames = _video_frames(path, size) if is_video(path) else _image_frames(path, size)
+
+    # Con más frames que el máximo, cada frame de la vista previa agrupa 'step' frames
+    selected, durations = [], []
+    for index, (frame, duration) in enumerate(frames):
+        if index % step == 0:
+            selected.append(frame)
+            durations.append(0)
+        durations[-1] += duration or 100
+
+    columns = math.ceil(math.sqrt(len(selected)))
+    rows = math.ceil(len(selected) / columns)
+    sheet = Image.new("RGB", (columns * size[0], rows * size[1]))
+    for index, frame in enumerate(selected):
+        sheet.paste(frame, ((index % columns) * size[0], (index // columns) * size[1]))
+
+    output = io.BytesIO()
+    sheet.save(output, format="PNG", optimize=True)
+    data = output.getvalue()
+    manifest = {
+        "id": asset_id,
+        "frame_width": size[0],
+        "frame_height": size[1],
+        "columns": columns,
+        "frame_count": len(selected),
+        "durations": durations,
+        "etag": hashlib.sha1(data).hexdigest()[:20]
+    }
+
+    PREVIEW_DIR.mkdir(parents=True, exist_ok=True)
+    _write_atomic(sprite_path(asset_id), data)
+    _write_atomic(manifest_path(asset_id), json.dumps(manifest, separators=(",", ":")).encode())
+    return manifest
+
+
+def load_manifest(asset_id: str):
+    """Manifiesto ya generado, o None"""
+    try:
+        with open(manifest_path(asset_id), "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def purge_preview(asset_id: str):
+    sprite_path(asset_id).unlink(missing_ok=True)
+    manifest_path(asset_id).unlink(missing_ok=True)
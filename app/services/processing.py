@@ -0,0 +1,67 @@
+import io
+from pathlib import Path
+
+from PIL import Image
+
+# Funciones de procesado de assets que se ejecutan en el pool de procesos (app.services.jobs):
+# deben ser de nivel de módulo y recibir/devolver datos serializables
+
+
+def process_gif(image_data: bytes, matrix_width: int, matrix_height: int) -> bytes:
+    """Procesa un GIF redimensionándolo manteniendo la animación"""
+    try:
+        gif = Image.open(io.BytesIO(image_data))
+        
+        # Obtener información del GIF
+        frames = []
+        durations = []
+        
+        try:
+            while True:
+                durations.append(gif.info.get('duration', 100))
+                
+                # Redimensionar frame manteniendo aspect ratio
+                img_aspect = gif.width / gif.height
+                matrix_aspect = matrix_width / matrix_height
+                
+                if img_aspect > matrix_aspect:
+                    new_height = matrix_height
+                    new_width = int(new_height * img_aspect)
+                else:
+                    new_width = matrix_width
+                    new_height = int(new_width / img_aspect)
+                
+                resized = gif.resize((new_width, new_height), Image.Resampling.LANCZOS)
+                
+                # Crear canvas con fondo
+                frame = Image.new('RGB', (matrix_width, matrix_height), (0, 0, 0))
+                x = (matrix_width - new_width) // 2
+                y = (matrix_height - new_height) // 2
+                frame.paste(resized, (x, y))
+                
+                frames.append(frame)
+                gif.seek(gif.tell() + 1)
+        except EOFError:
+            pass
+        
+        # Guardar como GIF animado
+        output = io.BytesIO()
+        frames[0].save(
+            output,
+            format='GIF',
+            save_all=True,
+            append_images=frames[1:] if len(frames) > 1 else [],
+            duration=durations,
+            loop=0,
+            optimize=False
+        )
+        return output.getvalue()
+    except Exception as e:
+        raise Exception(f"Error procesando GIF: {str(e)}")
+
+
+def process_gif_file(source: Path, destination: Path, matrix_width: int, matrix_height: int) -> int:
+    """Procesa un GIF de disco a disco (sin pasar los datos por el proceso principal); devuelve el tamaño"""
+    data = process_gif(Path(source).read_bytes(), matrix_width, matrix_height)
+    Path(destination).write_bytes(data)
+    return len(data)
@@ -0,0 +1,253 @@
+import asyncio
+import logging
+import time
+from collections import deque
+
+import aiohttp
+
+from app.services.metrics import device_target_fps
+
+logger = logging.getLogger(__name__)
+
+# Ritmo de salida adaptativo por dispositivo. El techo sale de /json/info (arquitectura y
+# número de LEDs); por debajo, el intervalo mínimo entre envíos sigue al RTT medido y se
+# alarga multiplicativamente si hay errores (y se recupera poco a poco cuando desaparecen).
+# El reproductor no adelanta ningún envío al intervalo: salta frames en vez de acumular retraso.
+
+DEFAULT_MAX_FPS = 60.0  # Sin datos del dispositivo (igual que MIN_FRAME_MS del reproductor)
+ARCH_MAX_FPS = {"esp8266": 40.0, "esp32": 60.0}  # Por prefijo de "arch" en /json/info
+LED_WIRE_SECONDS = 30e-6  # WS281x: 24 bits a 800 kHz por LED
+WINDOW = 60  # Envíos usados para RTT y tasa de errores
+MIN_SAMPLES = 10  # Envíos necesarios antes de decidir
+EVALUATE_INTERVAL = 1.0  # Segundos entre reajustes del ritmo
+RTT_HEADROOM = 1.1  # El intervalo deja un 10% sobre el RTT p90
+MAX_ERROR_RATE = 0.05
+BACKOFF = 1.5  # Factor del intervalo cuando hay errores
+BACKOFF_EFFECTIVE = 0.7  # Si tras bajar el ritmo los errores no caen por debajo de esta fracción, son pérdidas
+RECOVERY = 0.9  # Factor del intervalo por reajuste sin errores
+MAX_INTERVAL = 0.5  # Como mucho se baja a 2 fps
+DELTA_WINDOW = 5.0  # Segundos usados para medir el ahorro del envío delta
+DELTA_MIN_SAVING = 0.1  # Por debajo, el diff no compensa y se envían frames completos
+DELTA_RETRY = 30.0  # Segundos hasta volver a probar el envío delta
+PROBE_INTERVAL = 5.0  # Segundos entre consultas de /json/info (también, por UDP, la medida de RTT)
+PROBE_TIMEOUT = 1.0
+
+
+def device_limit(info: dict) -> tuple:
+    """(fps máximos, motivo) según la arquitectura y el número de LEDs de /json/info"""
+    arch = str(info.get("arch", "")).lower()
+    leds = info.get("leds", {}).get("count") or 0
+    for prefix, fps in ARCH_MAX_FPS.items():
+        if arch.startswith(prefix):
+            break
+    else:
+        return DEFAULT_MAX_FPS, f"arquitectura {arch or 'desconocida'}"
+    reason = f"límite de {arch.upper()}"
+    if prefix == "esp8266" and leds:
+        # El ESP8266 suele sacar todos los LEDs por una sola salida: el tiempo de transmisión manda
+        wire_fps = 1.0 / (leds * LED_WIRE_SECONDS)
+        if wire_fps < fps:
+            return wire_fps, f"{leds} LEDs por una salida de {arch.upper()}"
+    return fps, reason
+
+
+class RateController:
+    """Intervalo mínimo entre frames y uso del envío delta para un dispositivo"""
+
+    def __init__(self, name: str, realtime: bool = False, delta=None, health=None):
+        self.name = name
+        self.realtime = realtime  # Por UDP no hay respuesta: el RTT se mide con /json/info
+        self.delta = delta  # DeltaEncoder del dispositivo, si lo usa
+        self.health = health  # DeviceHealth: por UDP, /json/info es lo único que dice si el dispositivo responde
+        self.info = None
+        self.ceiling_fps = DEFAULT_MAX_FPS
+        self.ceiling_reason = "sin datos del dispositivo"
+        self.interval = 1.0 / DEFAULT_MAX_FPS
+        self.reason = self.ceiling_reason
+        self.use_delta = delta is not None
+        self.delta_reason = "activado" if delta is not None else "desactivado en la configuración"
+        self.error_rate = 0.0
+        self._backoff_errors = None  # Tasa de errores que provocó la última bajada de ritmo
+        self._rtt = deque(maxlen=WINDOW)
+        self._results = deque(maxlen=WINDOW)
+        self._evaluated_at = time.monotonic()
+        self._delta_checked_at = self._evaluated_at
+        self._delta_baseline = None
+        self._delta_retry_at = None
+        self._task = None
+        device_target_fps.set(DEFAULT_MAX_FPS, name)
+
+    def start(self, session):
+        """Consulta /json/info en segundo plano (y, por UDP, sigue midiendo el RTT)"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(session), name=f"rate-{self.name}")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self, session):
+        await self.probe(session)
+        while self.realtime or self.info is None:
+            await asyncio.sleep(PROBE_INTERVAL)
+            await self.probe(session)
+
+    async def probe(self, session):
+        started = time.perf_counter()
+        try:
+            info = await session.get_json("/json/info", PROBE_TIMEOUT)
+        except (asyncio.TimeoutError, aiohttp.ClientError, ValueError) as e:
+            logger.debug(f"{self.name}: /json/info failed: {type(e).__name__}: {e}")
+            if self.realtime and self.health is not None and self.info is not None:
+                # Solo si alguna vez respondió: un receptor DDP sin API HTTP sigue recibiendo frames
+                self.health.record(False, f"{type(e).__name__}: {e}")
+            info = None
+        else:
+            if self.realtime and self.health is not None:
+                self.health.record(True)
+        if info is None:
+            if self.realtime:
+                self.record(None, False)
+            return
+        if self.realtime:
+            self.record(time.perf_counter() - started, True)
+        else:
+            self._rtt.append(time.perf_counter() - started)  # Referencia de RTT antes del primer frame
+        if self.info is None:
+            self.ceiling_fps, self.ceiling_reason = device_limit(info)
+            logger.info(f"{self.name}: {info.get('arch')} with {info.get('leds', {}).get('count')} LEDs, "
+                        f"up to {self.ceiling_fps:.1f} fps ({self.ceiling_reason})")
+        self.info = info
+        self._evaluate(time.monotonic())
+
+    def record(self, rtt: float, ok: bool):
+        """Resultado de un envío: RTT en segundos (None si no hay respuesta que medir)"""
+        if rtt is not None:
+            self._rtt.append(rtt)
+        self._results.append(ok)
+        now = time.monotonic()
+        if now - self._evaluated_at >= EVALUATE_INTERVAL:
+            self._evaluate(now)
+
+    def reset(self):
+        """Tras una desconexión: los errores y RTTs de entonces no dicen nada del dispositivo reconectado"""
+        self._rtt.clear()
+        self._results.clear()
+        self.error_rate = 0.0
+        self._backoff_errors = None
+        self._delta_retry_at = None
+        self.interval = 1.0 / self.ceiling_fps
+        self._evaluate(time.monotonic())
+
+    def send_timeout(self, period: float) -> float:
+        """Timeout de un envío: el periodo del frame, de modo que un dispositivo que no responde
+        cuesta como mucho un frame; si el RTT medido es mayor, ese RTT con margen (lento no es caído)"""
+        if self.realtime or not self._rtt:
+            return period
+        return max(period, self.rtt_percentile(0.9) * RTT_HEADROOM)
+
+    def rtt_percentile(self, fraction: float) -> float:
+        if not self._rtt:
+            return 0.0
+        ordered = sorted(self._rtt)
+        return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+    def _evaluate(self, now: float):
+        self._evaluated_at = now
+        floor = 1.0 / self.ceiling_fps
+        reason = self.ceiling_reason
+        if not self.realtime and len(self._rtt) >= MIN_SAMPLES:
+            # Por HTTP el reproductor espera la respuesta: no tiene sentido pedir más frames que RTTs
+            rtt_floor = self.rtt_percentile(0.9) * RTT_HEADROOM
+            if rtt_floor > floor:
+                floor, reason = rtt_floor, f"RTT p90 de {self.rtt_percentile(0.9) * 1000:.1f} ms"
+
+        if len(self._results) >= MIN_SAMPLES:
+            self.error_rate = self._results.count(False) / len(self._results)
+        if len(self._results) >= MIN_SAMPLES and self.error_rate > MAX_ERROR_RATE:
+            if self._backoff_errors is not None and self.error_rate >= self._backoff_errors * BACKOFF_EFFECTIVE:
+                # Bajar el ritmo no redujo los errores: son pérdidas de la red, no saturación del dispositivo
+                self.interval = max(floor, self.interval * RECOVERY)
+                reason = f"{self.error_rate:.0%} de errores que no dependen del ritmo ({reason})"
+            else:
+                self.interval = min(max(self.interval, floor) * BACKOFF, MAX_INTERVAL)
+                self._backoff_errors = self.error_rate
+                reason = f"{self.error_rate:.0%} de errores"
+            self._results.clear()  # El siguiente ajuste se decide con envíos al nuevo ritmo
+        else:
+            self._backoff_errors = None
+            self.interval = max(floor, self.interval * RECOVERY)
+            if self.interval > floor:
+                reason = f"recuperándose tras errores ({reason})"
+        if reason != self.reason:
+            logger.debug(f"{self.name}: {1.0 / self.interval:.1f} fps ({reason})")
+        self.reason = reason
+        device_target_fps.set(round(1.0 / self.interval, 2), self.name)
+        self._evaluate_delta(now)
+
+    def _evaluate_delta(self, now: float):
+        """Frames completos con errores (cada error obliga a reenviar todo) o si el diff apenas ahorra"""
+        if self.delta is None:
+            return
+        if self.error_rate > MAX_ERROR_RATE:
+            self._set_delta(False, f"{self.error_rate:.0%} de errores: frames completos")
+            self._delta_retry_at = now + DELTA_RETRY
+            return
+        if not self.use_delta:
+            if self._delta_retry_at is None or now >= self._delta_retry_at:
+                self._set_delta(True, "reactivado")
+                self._delta_baseline = None
+            return
+        if self._delta_baseline is None:
+            self._delta_baseline = self.delta.stats()
+            self._delta_checked_at = now
+            return
+        if now - self._delta_checked_at < DELTA_WINDOW:
+            return
+        stats = self.delta.stats()
+        sent = stats["bytes_sent"] - self._delta_baseline["bytes_sent"]
+        saved = stats["bytes_saved"] - self._delta_baseline["bytes_saved"]
+        self._delta_baseline = stats
+        self._delta_checked_at = now
+        if sent + saved and saved / (sent + saved) < DELTA_MIN_SAVING:
+            self._set_delta(False, f"ahorro del {saved / (sent + saved):.0%}: frames completos")
+            self._delta_retry_at = now + DELTA_RETRY
+        else:
+            self._set_delta(True, "activado")
+
+    def _set_delta(self, enabled: bool, reason: str):
+        if enabled != self.use_delta:
+            logger.info(f"{self.name}: delta {'on' if enabled else 'off'} ({reason})")
+        self.use_delta = enabled
+        self.delta_reason = reason
+
+    @property
+    def target_fps(self) -> float:
+        return round(1.0 / self.interval, 2)
+
+    def status(self) -> dict:
+        info = self.info or {}
+        return {
+            "device": self.name,
+            "target_fps": self.target_fps,
+            "reason": self.reason,
+            "ceiling_fps": round(self.ceiling_fps, 2),
+            "rtt_ms": {
+                "p50": round(self.rtt_percentile(0.5) * 1000, 2),
+                "p90": round(self.rtt_percentile(0.9) * 1000, 2)
+            },
+            "error_rate": round(self.error_rate, 3),
+            "delta": {"enabled": self.use_delta, "reason": self.delta_reason},
+            "info": {
+                "name": info.get("name"),
+                "version": info.get("ver"),
+                "arch": info.get("arch"),
+                "leds": info.get("leds", {}).get("count"),
+                "fps": info.get("leds", {}).get("fps")
+            } if self.info else None
+        }
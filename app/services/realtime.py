@@ -0,0 +1,111 @@
+import asyncio
+import logging
+import struct
+
+logger = logging.getLogger(__name__)
+
+# Protocolos de tiempo real soportados por WLED sobre UDP
+DDP = "ddp"
+DRGB = "drgb"
+DNRGB = "dnrgb"
+REALTIME_PROTOCOLS = (DDP, DRGB, DNRGB)
+
+DEFAULT_PORTS = {
+    DDP: 4048,
+    DRGB: 21324,
+    DNRGB: 21324,
+}
+
+# DDP: cabecera de 10 bytes, versión 1, datos RGB de 8 bits
+DDP_HEADER = struct.Struct(">BBBBIH")  # flags, secuencia, tipo, destino, offset, longitud
+DDP_FLAG_VERSION_1 = 0x40
+DDP_FLAG_PUSH = 0x01
+DDP_TYPE_RGB24 = 0x0B
+DDP_ID_DISPLAY = 1
+DDP_MAX_DATA = 1440  # 480 LEDs por paquete, igual que WLED
+
+# Protocolo UDP realtime de WLED: [protocolo, timeout(s), ...]
+WLED_UDP_DRGB = 2
+WLED_UDP_DNRGB = 4
+DRGB_MAX_LEDS = 490
+DNRGB_MAX_LEDS = 489
+REALTIME_TIMEOUT_FOREVER = 255  # WLED no vuelve al modo normal hasta recibir otro comando
+
+
+def ddp_packets(frame: bytes, sequence: int) -> list:
+    """Divide un frame RGB en paquetes DDP; el último lleva el flag PUSH"""
+    packets = []
+    total = len(frame)
+    for offset in range(0, total, DDP_MAX_DATA):
+        chunk = frame[offset:offset + DDP_MAX_DATA]
+        flags = DDP_FLAG_VERSION_1
+        if offset + len(chunk) >= total:
+            flags |= DDP_FLAG_PUSH
+        header = DDP_HEADER.pack(flags, sequence & 0x0F, DDP_TYPE_RGB24, DDP_ID_DISPLAY, offset, len(chunk))
+        packets.append(header + chunk)
+    return packets
+
+
+def drgb_packets(frame: bytes, timeout: int) -> list:
+    """Un único paquete DRGB (máximo 490 LEDs)"""
+    if len(frame) > DRGB_MAX_LEDS * 3:
+        raise ValueError(f"DRGB admite como máximo {DRGB_MAX_LEDS} LEDs; usa DNRGB o DDP")
+    return [bytes((WLED_UDP_DRGB, timeout)) + frame]
+
+
+def dnrgb_packets(frame: bytes, timeout: int) -> list:
+    """Paquetes DNRGB con índice de LED inicial (hasta 489 LEDs por paquete)"""
+    packets = []
+    step = DNRGB_MAX_LEDS * 3
+    for offset in range(0, len(frame), step):
+        start_index = offset // 3
+        header = struct.pack(">BBH", WLED_UDP_DNRGB, timeout, start_index)
+        packets.append(header + frame[offset:offset + step])
+    return packets
+
+
+class RealtimeSender:
+    """Envía frames RGB crudos a WLED por UDP (DDP, DRGB o DNRGB)"""
+
+    def __init__(self, ip: str, port: int = None, protocol: str = DDP, timeout: int = 2):
+        if protocol not in REALTIME_PROTOCOLS:
+            raise ValueError(f"Protocolo realtime no soportado: {protocol}")
+        self.ip = ip
+        self.port = port or DEFAULT_PORTS[protocol]
+        self.protocol = protocol
+        self.timeout = timeout  # Segundos que WLED mantiene el modo realtime sin datos (DRGB/DNRGB)
+        self.sequence = 0
+        self.transport = None
+
+    async def open(self):
+        loop = asyncio.get_running_loop()
+        self.transport, _ = await loop.create_datagram_endpoint(
+            asyncio.DatagramProtocol,
+            remote_addr=(self.ip, self.port)
+        )
+
+    def close(self):
+        if self.transport is not None:
+            self.transport.close()
+            self.transport = None
+
+    def packets(self, frame: bytes, timeout: int = None) -> list:
+        """Construye los paquetes para un frame según el protocolo configurado"""
+        timeout = self.timeout if timeout is None else timeout
+        if self.protocol == DDP:
+            # Secuencia 1..15 (0 significa "sin secuencia" en DDP)
+            self.sequence = self.sequence % 15 + 1
+            return ddp_packets(frame, self.sequence)
+        if self.protocol == DRGB:
+            return drgb_packets(frame, timeout)
+        return dnrgb_packets(frame, timeout)
+
+    def send(self, frame: bytes, timeout: int = None):
+        """Envía un frame RGB empaquetado (3 bytes por LED)"""
+        self.send_packets(self.packets(frame, timeout))
+
+    def send_packets(self, packets: list):
+        if self.transport is None:
+            raise RuntimeError("RealtimeSender no está abierto")
+        for packet in packets:
+            self.transport.sendto(packet)
@@ -0,0 +1,287 @@
+import logging
+import string
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from app.services.canvas import frame_geometry
+from app.services.effects import DEFAULT_FPS, MAX_FPS, ConstantDurations, coerce_param, parse_color
+from app.services.metrics import effect_render_seconds
+
+logger = logging.getLogger(__name__)
+
+# Texto y marquesinas. La fuente se rasteriza una vez, a la altura de la matriz, en un atlas
+# de glifos (alto x columnas, canal alfa); el texto es la concatenación de las columnas de sus
+# glifos, coloreada una vez, y cada frame del scroll es una selección de columnas de esa tira.
+# Pillow solo se usa al crear el atlas, nunca por frame.
+
+FONTS_DIR = Path(__file__).parent.parent.parent / "data" / "fonts"
+SYSTEM_FONTS_DIR = Path("/usr/share/fonts")
+FONT_SUFFIXES = (".ttf", ".otf")
+DEFAULT_FONT = "default"  # Fuente incluida en Pillow
+ATLAS_CHARSET = string.digits + string.ascii_letters + string.punctuation + " ÁÉÍÓÚÜÑáéíóúüñ¡¿€°·"
+ATLAS_CACHE_SIZE = 8  # Atlas (fuente, altura) en memoria
+MAX_TEXT_LENGTH = 500
+MAX_SPEED = 500.0  # Columnas por segundo
+FONT_SCAN_INTERVAL = 30.0  # Segundos que se reutiliza la lista de fuentes (GET /fonts la refresca)
+
+DEFAULTS = {
+    "text": "WLED",
+    "font": DEFAULT_FONT,
+    "color": "#ffffff",
+    "background": "#000000",
+    "speed": 20.0,  # Columnas por segundo; negativo hacia la derecha, 0 texto fijo (centrado si cabe)
+    "gap": None,  # Columnas vacías entre repeticiones; por defecto el ancho de la matriz
+    "clock": False  # El texto es un formato de strftime (p.ej. "%H:%M") que se actualiza solo
+}
+
+
+_font_scan = (None, {})  # (instante del último recorrido, {nombre: ruta})
+
+
+def font_paths(refresh: bool = False) -> dict:
+    """Fuentes disponibles además de la de Pillow: data/fonts y las del sistema ({nombre: ruta}).
+    Los directorios se recorren como mucho cada FONT_SCAN_INTERVAL, no en cada validación."""
+    global _font_scan
+    scanned_at, paths = _font_scan
+    now = time.monotonic()
+    if refresh or scanned_at is None or now - scanned_at >= FONT_SCAN_INTERVAL:
+        paths = {}
+        for directory in (SYSTEM_FONTS_DIR, FONTS_DIR):
+            if directory.exists():
+                for path in sorted(directory.rglob("*")):
+                    if path.suffix.lower() in FONT_SUFFIXES:
+                        paths[path.stem] = path  # Las de data/fonts sustituyen a las del sistema
+        _font_scan = (now, paths)
+    return paths
+
+
+def list_fonts(refresh: bool = False) -> list:
+    return [DEFAULT_FONT] + sorted(font_paths(refresh))
+
+
+def load_font(name: str, height: int) -> ImageFont.FreeTypeFont:
+    """Fuente al mayor tamaño cuyo alto (ascendente + descendente) cabe en la matriz"""
+    if name == DEFAULT_FONT:
+        def load(size): return ImageFont.load_default(size=size)
+    else:
+        path = font_paths().get(name)
+        if path is None:
+            raise ValueError(f"Fuente desconocida: {name}")
+        def load(size): return ImageFont.truetype(str(path), size)
+    for size in range(height, 0, -1):
+        font = load(size)
+        ascent, descent = font.getmetrics()
+        if ascent + descent <= height:
+            return font
+    return load(1)
+
+
+class GlyphAtlas:
+    """Glifos de una fuente a una altura: columnas (alto x n, alfa uint8) y posición de cada carácter"""
+
+    def __init__(self, font_name: str, height: int):
+        self.font_name = font_name
+        self.height = height
+        self.font = load_font(font_name, height)
+        ascent, descent = self.font.getmetrics()
+        self._top = (height - ascent - descent) // 2  # Centrado vertical de la línea
+        self.columns = np.zeros((height, 0), dtype=np.uint8)
+        self.glyphs = {}  # {carácter: (primera columna, ancho)}
+        self._lock = threading.Lock()
+        self.add(ATLAS_CHARSET)
+
+    def add(self, chars: str):
+        """Rasteriza los caracteres que falten y los añade al final del atlas"""
+        with self._lock:
+            missing = [char for char in dict.fromkeys(chars) if char not in self.glyphs]
+            if not missing:
+                return
+            rendered = []
+            start = self.columns.shape[1]
+            for char in missing:
+                width = max(1, round(self.font.getlength(char)))
+                image = Image.new("L", (width, self.height))
+                ImageDraw.Draw(image).text((0, self._top), char, font=self.font, fill=255)
+                rendered.append(np.asarray(image))
+                self.glyphs[char] = (start, width)
+                start += width
+            # Se sustituye el array entero: una tira que se está componiendo sigue viendo el anterior
+            self.columns = np.concatenate([self.columns] + rendered, axis=1)
+
+    def strip(self, text: str) -> np.ndarray:
+        """Alfa del texto (alto x ancho): las columnas de sus glifos concatenadas"""
+        self.add(text)
+        columns = self.columns
+        if not text:
+            return np.zeros((self.height, 0), dtype=np.uint8)
+        return np.concatenate([columns[:, start:start + width] for start, width in map(self.glyphs.__getitem__, text)], axis=1)
+
+
+class AtlasCache:
+    """Atlas por (fuente, altura), creados la primera vez y compartidos por todos los textos"""
+
+    def __init__(self, size: int = ATLAS_CACHE_SIZE):
+        self.size = size
+        self._atlases = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, font_name: str, height: int) -> GlyphAtlas:
+        key = (font_name, height)
+        with self._lock:
+            atlas = self._atlases.get(key)
+            if atlas is not None:
+                self._atlases.move_to_end(key)
+                return atlas
+        started = time.perf_counter()
+        atlas = GlyphAtlas(font_name, height)
+        logger.info(f"Glyph atlas {font_name} at {height} px: {len(atlas.glyphs)} glyphs, "
+                    f"{atlas.columns.shape[1]} columns in {(time.perf_counter() - started) * 1000:.1f} ms")
+        with self._lock:
+            self._atlases[key] = atlas
+            while len(self._atlases) > self.size:
+                self._atlases.popitem(last=False)
+        return atlas
+
+
+glyph_atlases = AtlasCache()
+
+
+def validate(params: dict, current: dict = None) -> dict:
+    """Parámetros completos (sobre current o los valores por defecto); ValueError si no son válidos"""
+    unknown = set(params) - set(DEFAULTS)
+    if unknown:
+        raise ValueError(f"Parámetros desconocidos: {', '.join(sorted(unknown))}")
+    merged = dict(current or DEFAULTS)
+    merged.update(params)
+    merged["text"] = str(merged["text"])
+    if len(merged["text"]) > MAX_TEXT_LENGTH:
+        raise ValueError(f"El texto supera {MAX_TEXT_LENGTH} caracteres")
+    if merged["font"] not in list_fonts():
+        raise ValueError(f"Fuente desconocida: {merged['font']}")
+    parse_color(merged["color"])
+    parse_color(merged["background"])
+    merged["speed"] = coerce_param("speed", DEFAULTS["speed"], merged["speed"])
+    merged["gap"] = None if merged["gap"] is None else coerce_param("gap", 0, merged["gap"])
+    if abs(merged["speed"]) > MAX_SPEED:
+        raise ValueError(f"La velocidad máxima es {MAX_SPEED:g} columnas por segundo")
+    if merged["gap"] is not None and merged["gap"] < 0:
+        raise ValueError("gap no puede ser negativo")
+    merged["clock"] = coerce_param("clock", DEFAULTS["clock"], merged["clock"])
+    return merged
+
+
+class TextLayout:
+    """Tira de color de un texto ya compuesta; se sustituye entera al cambiar algo"""
+
+    def __init__(self, width: int, height: int, params: dict):
+        self.params = params
+        self.atlas = glyph_atlases.get(params["font"], height)
+        self.text = time.strftime(params["text"]) if params["clock"] else params["text"]
+        alpha = self.atlas.strip(self.text)
+        self.text_width = alpha.shape[1]
+        gap = width if params["gap"] is None else params["gap"]
+        # Tira de un periodo: el texto y el hueco hasta la siguiente repetición
+        self.period = max(self.text_width + gap, 1)
+        color = parse_color(params["color"])
+        background = parse_color(params["background"])
+        weight = np.zeros((height, self.period, 1), dtype=np.float32)
+        weight[:, :self.text_width, 0] = alpha / 255.0
+        self.strip = (background + weight * (color - background)).round().astype(np.uint8)
+        self.still = None
+        if params["speed"] == 0:
+            # Texto fijo: centrado si cabe, si no desde el principio
+            self.still = np.empty((height, width, 3), dtype=np.uint8)
+            self.still[:] = background.astype(np.uint8)
+            shown = min(self.text_width, width)
+            left = (width - shown) // 2
+            self.still[:, left:left + shown] = self.strip[:, :shown]
+
+
+class TextFrames:
+    """Texto con la interfaz de PackedFrames para el Player, como EffectFrames: el frame i
+    es la ventana de la tira que empieza en la columna correspondiente a t = i / fps.
+    update() cambia el texto, la fuente, el color o la velocidad sin saltos en el scroll.
+    La tira, el origen del scroll y la ventana se sustituyen juntos en una tupla: frame() los
+    lee de una vez y nunca combina el origen nuevo con la tira anterior."""
+
+    FRAME_COUNT = 2 ** 31 - 1  # Sin fin: el índice avanza con el reloj del reproductor
+    name = "text"
+
+    def __init__(self, width: int, height: int, params: dict = None, fps: float = DEFAULT_FPS):
+        self.width = width
+        self.height = height
+        self.fps = min(max(fps, 1), MAX_FPS)
+        self.durations = ConstantDurations(round(1000 / self.fps), self.FRAME_COUNT)
+        # (tira, (índice, columna) desde la que avanza el scroll, columnas de la ventana)
+        self._state = (TextLayout(width, height, validate(params or {})), (0, 0.0), np.arange(width))
+        self._last_index = 0
+        self._lock = threading.Lock()  # update() se llama desde otro hilo
+        self.frames_rendered = 0
+
+    def __len__(self):
+        return self.FRAME_COUNT
+
+    @property
+    def layout(self) -> TextLayout:
+        return self._state[0]
+
+    def offset(self, index: int, state: tuple = None) -> float:
+        layout, (origin_index, origin_column), _ = state or self._state
+        return origin_column + (index - origin_index) * layout.params["speed"] / self.fps
+
+    def frame(self, index: int) -> np.ndarray:
+        started = time.perf_counter()
+        self._last_index = index
+        state = self._state
+        layout = state[0]
+        if layout.params["clock"] and time.strftime(layout.params["text"]) != layout.text:
+            with self._lock:
+                if self._state[0] is layout:
+                    self._state = (TextLayout(self.width, self.height, layout.params),) + self._state[1:]
+                state = self._state
+                layout = state[0]
+        if layout.still is not None:
+            frame = layout.still
+        else:
+            columns = (state[2] + int(self.offset(index, state))) % layout.period
+            frame = layout.strip[:, columns]
+        effect_render_seconds.observe(time.perf_counter() - started, self.name)
+        self.frames_rendered += 1
+        return frame
+
+    def update(self, params: dict) -> dict:
+        """Aplica los parámetros indicados sobre los actuales; la tira nueva se compone antes de
+        sustituir la anterior y el scroll sigue desde la columna en la que estaba"""
+        with self._lock:
+            current = self.layout.params
+            merged = validate(params, current)
+            layout = TextLayout(self.width, self.height, merged)
+            index = self._last_index
+            self._state = (layout, (index, self.offset(index) % layout.period), self._state[2])
+        return merged
+
+    async def reconfigure(self, config: dict):
+        """Cambio de matriz: atlas y tira a la nueva altura (lo llama PlayerManager)"""
+        width, height = frame_geometry(config)
+        with self._lock:
+            self.width, self.height = width, height
+            self._state = (TextLayout(width, height, self.layout.params), self._state[1], np.arange(width))
+
+    def status(self) -> dict:
+        layout = self.layout
+        return {
+            "params": layout.params,
+            "shown_text": layout.text,
+            "fps": self.fps,
+            "width": self.width,
+            "height": self.height,
+            "text_width": layout.text_width,
+            "period": layout.period,
+            "font_size": layout.atlas.font.size,
+            "frames_rendered": self.frames_rendered
+        }
@@ -0,0 +1,134 @@
+import asyncio
+import json
+import logging
+import subprocess
+from fractions import Fraction
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+VIDEO_SUFFIXES = (".mp4", ".webm", ".mov", ".mkv", ".m4v")
+CHUNK_SIZE = 1024 * 1024  # Bloques de 1 MB al guardar la subida en disco
+DEFAULT_FPS = Fraction(25)
+MAX_FPS = Fraction(60)
+
+
+def is_video(path: Path) -> bool:
+    return path.suffix.lower() in VIDEO_SUFFIXES
+
+
+def _write_chunk(f, chunk: bytes, hasher):
+    f.write(chunk)
+    if hasher is not None:
+        hasher.update(chunk)
+
+
+async def save_upload(upload, path: Path, hasher=None) -> int:
+    """Guarda un UploadFile en disco por bloques, sin cargarlo entero en memoria.
+    hasher (p.ej. hashlib.sha256()) recibe los bloques según llegan."""
+    size = 0
+    with open(path, "wb") as f:
+        while True:
+            chunk = await upload.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            await asyncio.to_thread(_write_chunk, f, chunk, hasher)
+            size += len(chunk)
+    return size
+
+
+def probe_stream(path: Path) -> dict:
+    """Datos del primer stream de vídeo según ffprobe (tamaño y fps)"""
+    result = subprocess.run(
+        [
+            "ffprobe", "-v", "error",
+            "-select_streams", "v:0",
+            "-show_entries", "stream=width,height,avg_frame_rate,r_frame_rate",
+            "-of", "json",
+            str(path)
+        ],
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    streams = json.loads(result.stdout).get("streams", [])
+    if not streams:
+        raise ValueError(f"El archivo no contiene vídeo: {path.name}")
+    return streams[0]
+
+
+def probe_fps(path: Path) -> Fraction:
+    """fps original del primer stream de vídeo según ffprobe"""
+    stream = probe_stream(path)
+    for key in ("avg_frame_rate", "r_frame_rate"):
+        try:
+            fps = Fraction(stream.get(key, "0/0"))
+        except (ValueError, ZeroDivisionError):
+            continue
+        if fps > 0:
+            return min(fps, MAX_FPS)
+    return DEFAULT_FPS
+
+
+def video_filters(width: int, height: int, fps: Fraction) -> str:
+    """Filtros de ffmpeg: escala a la matriz (recorte centrado, como process_gif) y fps constantes.
+    La rotación y el espejo los aplica PixelLayout al enviar."""
+    return ",".join((
+        f"scale={width}:{height}:force_original_aspect_ratio=increase:flags=area",
+        f"crop={width}:{height}",
+        f"fps={fps.numerator}/{fps.denominator}"
+    ))
+
+
+def render_video_frames(path: Path, width: int, height: int):
+    """Genera (bytes RGB, duración ms) decodificando con ffmpeg en streaming: un frame en memoria cada vez"""
+    fps = probe_fps(path)
+    frame_size = width * height * 3
+    command = [
+        "ffmpeg", "-nostdin", "-v", "error",
+        "-i", str(path),
+        "-an",
+        "-vf", video_filters(width, height, fps),
+        "-pix_fmt", "rgb24",
+        "-f", "rawvideo",
+        "pipe:1"
+    ]
+    logger.info(f"Decoding {path.name} at {float(fps):.2f} fps to {width}x{height}")
+
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=frame_size)
+    frame_count = 0
+    previous_end = 0
+    try:
+        while True:
+            frame = process.stdout.read(frame_size)
+            if len(frame) < frame_size:
+                break
+            # Duraciones enteras en ms que suman el tiempo real (p.ej. 33/34/33 ms a 29.97 fps)
+            frame_count += 1
+            end = round(frame_count * 1000 / fps)
+            yield frame, end - previous_end
+            previous_end = end
+    finally:
+        if process.poll() is None:
+            process.kill()
+        _, stderr = process.communicate()
+
+    if process.returncode not in (0, -9) and frame_count:
+        logger.warning(f"ffmpeg terminó con código {process.returncode} tras {frame_count} frames: {stderr.decode(errors='replace').strip()}")
+    if frame_count == 0:
+        raise ValueError(f"ffmpeg no devolvió frames: {stderr.decode(errors='replace').strip()}")
+
+
+def extract_poster(path: Path, poster_path: Path, width: int = 320):
+    """Primer frame del vídeo como JPEG para la galería"""
+    subprocess.run(
+        [
+            "ffmpeg", "-nostdin", "-v", "error", "-y",
+            "-i", str(path),
+            "-frames:v", "1",
+            "-vf", f"scale={width}:-2",
+            str(poster_path)
+        ],
+        capture_output=True,
+        check=True
+    )
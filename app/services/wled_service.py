@@ -1,191 +1,212 @@
 import aiohttp
 import json
-from PIL import Image
-import io
 from pathlib import Path
 import asyncio
 import logging
+import time
+import numpy as np
+from app.services.device_health import DeviceHealth, DeviceOffline
+from app.services.frame_store import frame_store
+from app.services.http_pool import connection_manager
+from app.services.metrics import device_errors, device_send_seconds, payload_encode_seconds
+from app.services.payload import DeltaEncoder, build_payload
+from app.services.pixel_map import PixelLayout, logical_size
+from app.services.rate_control import RateController
+from app.services.realtime import RealtimeSender, REALTIME_PROTOCOLS, REALTIME_TIMEOUT_FOREVER, DEFAULT_PORTS, DRGB, DRGB_MAX_LEDS
 
 logger = logging.getLogger(__name__)
 
+STATIC_TIMEOUT = 2.0  # Una imagen suelta puede esperar más que un frame de animación
+
 
 class WledService:
-    def __init__(self, ip: str, port: int, protocol: str = "http", image_id: str = None, should_continue: dict = None):
+    def __init__(self, ip: str, port: int, protocol: str = "http", udp_port: int = None, delta: bool = True,
+                 layout: PixelLayout = None, adaptive: bool = False):
         self.ip = ip
         self.port = port
-        self.protocol = protocol
-        self.base_url = f"{protocol}://{ip}:{port}"
-        self.image_id = image_id
-        self.should_continue = should_continue or {}  # Dict para controlar si continuar
+        self.protocol = (protocol or "http").lower()
+        self.is_realtime = self.protocol in REALTIME_PROTOCOLS
+        # En modo realtime el puerto HTTP no aplica; se usa el puerto UDP del protocolo
+        self.base_url = f"{'http' if self.is_realtime else self.protocol}://{ip}:{port}"
+        self.udp_port = udp_port
+        self.session = None
+        self.sender = None
+        # Por HTTP solo se envían los LEDs que cambian respecto al último frame confirmado
+        self.delta = DeltaEncoder() if delta and not self.is_realtime else None
+        self.layout = layout  # Rotación, espejo y cableado; None si el frame ya va en orden físico
+        # Ritmo máximo y delta/completo según /json/info, RTT y errores (solo salidas del reproductor)
+        # Online/sin conexión: sin conexión los frames se saltan sin intentar el envío
+        self.health = DeviceHealth(self.name) if adaptive else None
+        self.rate = RateController(self.name, self.is_realtime, self.delta, self.health) if adaptive else None
+        self.on_online = None  # Se llama sin argumentos cuando el dispositivo vuelve a responder
+        if self.health is not None:
+            self.health.on_online = self._on_online
+    
+    @property
+    def name(self) -> str:
+        """Dispositivo como protocolo://ip:puerto (en realtime, el puerto UDP)"""
+        port = (self.udp_port or DEFAULT_PORTS[self.protocol]) if self.is_realtime else self.port
+        return f"{self.protocol}://{self.ip}:{port}"
+    
+    async def open(self):
+        """Abre la sesión HTTP o el socket UDP según el protocolo"""
+        if self.is_realtime:
+            self.sender = RealtimeSender(self.ip, self.udp_port, self.protocol)
+            await self.sender.open()
+        else:
+            # Sesión persistente compartida por dispositivo (keep-alive)
+            self.session = connection_manager.get(self.base_url)
+        if self.rate is not None:
+            # /json/info va siempre por HTTP, también con protocolos realtime
+            self.rate.start(connection_manager.get(self.base_url))
+        if self.health is not None:
+            self.health.start(connection_manager.get(self.base_url))
+    
+    async def close(self):
+        if self.rate is not None:
+            await self.rate.stop()
+        if self.health is not None:
+            await self.health.stop()
+        if self.sender is not None:
+            self.sender.close()
+            self.sender = None
+        # La sesión HTTP pertenece al pool y se cierra al apagar la aplicación
+        self.session = None
+    
+    async def __aenter__(self):
+        await self.open()
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+    
+    async def send_frame(self, frame: np.ndarray, hold: bool = False, timeout: float = None):
+        """Envía un frame (alto, ancho, 3). hold=True mantiene la imagen en modo realtime.
+        timeout sustituye al timeout por frame del pool: el periodo del frame (reproductor) o
+        un margen mayor para envíos puntuales; con control adaptativo nunca baja del RTT medido.
+        DeviceOffline si el dispositivo está sin conexión (el frame no se intenta enviar)."""
+        if self.health is not None and not self.health.available:
+            raise DeviceOffline(f"{self.name} sin conexión")
+        started = time.perf_counter()
+        if self.layout is not None:
+            frame = self.layout.apply(frame)
+        if self.is_realtime:
+            realtime_timeout = REALTIME_TIMEOUT_FOREVER if hold else None
+            try:
+                packets = self.sender.packets(frame.tobytes(), realtime_timeout)
+                encoded = time.perf_counter()
+                payload_encode_seconds.observe(encoded - started, self.protocol)
+                self.sender.send_packets(packets)
+            except Exception as e:
+                device_errors.inc(self.name)
+                self._record(None, False)
+                self._record_health(False, e)
+                raise
+            device_send_seconds.observe(time.perf_counter() - encoded, self.name)
+            self._record(None, True)
+            return True, "Frame enviado por UDP"
+        
+        # Colores en hex compacto y tramos [inicio, fin, color] directamente desde el buffer.
+        # hold=True (imagen suelta) siempre envía el frame completo.
+        if self.delta is None:
+            payload = build_payload(frame)
+        elif self.rate is not None and not self.rate.use_delta:
+            payload = build_payload(frame)
+            self.delta.reset()
+        else:
+            payload = self.delta.encode(frame, force_full=hold)
+        encoded = time.perf_counter()
+        payload_encode_seconds.observe(encoded - started, self.protocol)
+        if payload is None:
+            return True, "Frame sin cambios"
+        
+        if timeout is not None and self.rate is not None:
+            timeout = self.rate.send_timeout(timeout)
+        try:
+            status = await self.session.post("/json", payload, timeout)
+        except Exception as e:
+            device_errors.inc(self.name)
+            self._reset_delta()
+            self._record(None, False)
+            self._record_health(False, e)
+            raise
+        finally:
+            device_send_seconds.observe(time.perf_counter() - encoded, self.name)
+        self._record(time.perf_counter() - encoded, status == 200)
+        self._record_health(True)  # Con cualquier código HTTP, el dispositivo responde
+        if status == 200:
+            if self.delta is not None:
+                self.delta.acknowledge()
+            return True, "Frame enviado"
+        device_errors.inc(self.name)
+        self._reset_delta()
+        return False, f"Error del servidor WLED: {status}"
     
-    async def send_image(self, image_path: Path, matrix_width: int, matrix_height: int, rotation: int = 0, mirror_v: bool = False, mirror_h: bool = False, animation_loop: bool = False, animation_frame_delay: int = None):
-        """Envía una imagen al WLED como datos de pixels. Si es GIF animado, envía todos los frames."""
+    def _record(self, rtt: float, ok: bool):
+        if self.rate is not None:
+            self.rate.record(rtt, ok)
+    
+    def _record_health(self, ok: bool, error: Exception = None):
+        # Por UDP un envío correcto no dice si el dispositivo está ahí: lo dicen las consultas a /json/info
+        if self.health is not None:
+            self.health.record(ok, f"{type(error).__name__}: {error}" if error is not None else None)
+    
+    def _on_online(self):
+        """Reconectado: ritmo desde el máximo y un frame completo, no un delta sobre lo que había antes"""
+        if self.rate is not None:
+            self.rate.reset()
+        self._reset_delta()
+        if self.on_online is not None:
+            self.on_online()
+    
+    @property
+    def online(self) -> bool:
+        return self.health is None or self.health.available
+    
+    def health_status(self):
+        """Estado de conexión; None sin control adaptativo"""
+        return self.health.status() if self.health is not None else None
+    
+    @property
+    def min_interval(self) -> float:
+        """Segundos mínimos entre frames que admite el dispositivo (0 sin control adaptativo)"""
+        return self.rate.interval if self.rate is not None else 0.0
+    
+    def rate_status(self):
+        """Ritmo elegido y su motivo; None sin control adaptativo"""
+        return self.rate.status() if self.rate is not None else None
+    
+    def _reset_delta(self):
+        """Tras un error no se sabe qué tiene el dispositivo: el siguiente envío es completo"""
+        if self.delta is not None:
+            self.delta.reset()
+    
+    def delta_stats(self):
+        """Frames completos/delta y bytes ahorrados; None si no se usa delta"""
+        return self.delta.stats() if self.delta is not None else None
+    
+    async def send_image(self, image_path: Path, matrix_width: int, matrix_height: int, rotation: int = 0, mirror_v: bool = False, mirror_h: bool = False):
+        """Envía una imagen estática al WLED (primer frame). Las animaciones se reproducen con el Player."""
         try:
-            logger.info(f"send_image called with: animation_loop={animation_loop}, animation_frame_delay={animation_frame_delay}")
-            # Abrir imagen
-            img = Image.open(image_path)
-            is_gif_animated = image_path.suffix.lower() == '.gif' and hasattr(img, 'n_frames') and img.n_frames > 1
+            # Obtener frames pre-renderizados (se construyen una sola vez por asset y tamaño);
+            # la rotación y el espejo se aplican al enviar con la disposición del dispositivo
+            packed = await frame_store.get_async(image_path, *logical_size(matrix_width, matrix_height, rotation))
+            if self.layout is None:
+                self.layout = PixelLayout(rotation, mirror_v, mirror_h)
             
-            if is_gif_animated:
-                # Procesar GIF animado frame por frame
-                logger.info(f"Procesando GIF animado con {img.n_frames} frames")
-                frames_data = []
-                
-                try:
-                    for frame_idx in range(img.n_frames):
-                        img.seek(frame_idx)
-                        duration = img.info.get('duration', 100)
-                        
-                        # Procesar el frame
-                        frame = img.convert('RGB')
-                        
-                        # Aplicar transformaciones
-                        if rotation == 90:
-                            frame = frame.rotate(90, expand=False)
-                        elif rotation == 180:
-                            frame = frame.rotate(180, expand=False)
-                        elif rotation == 270:
-                            frame = frame.rotate(270, expand=False)
-                        
-                        if mirror_v:
-                            frame = frame.transpose(Image.Transpose.FLIP_TOP_BOTTOM)
-                        
-                        if mirror_h:
-                            frame = frame.transpose(Image.Transpose.FLIP_LEFT_RIGHT)
-                        
-                        # Redimensionar
-                        frame = frame.resize((matrix_width, matrix_height), Image.Resampling.LANCZOS)
-                        
-                        # Extraer pixels
-                        pixels = []
-                        for y in range(matrix_height):
-                            for x in range(matrix_width):
-                                r, g, b = frame.getpixel((x, y))
-                                pixels.append([r, g, b])
-                        
-                        frames_data.append({"pixels": pixels, "duration": max(duration, 50)})  # Mínimo 50ms
-                except EOFError:
-                    pass
-                
-                # Enviar frames
-                logger.info(f"Enviando {len(frames_data)} frames a WLED (loop={animation_loop}, delay={animation_frame_delay}ms)")
-                async with aiohttp.ClientSession() as session:
-                    loop_count = 0
-                    max_loops = 10  # Máximo 10 iteraciones del loop para evitar bloqueos indefinidos
-                    
-                    while True:
-                        # Verificar si debe continuar
-                        if self.image_id and self.image_id not in self.should_continue:
-                            logger.info(f"Animación {self.image_id} detenida por usuario")
-                            break
-                        
-                        # Si está pausada (False), esperar
-                        if self.image_id and self.should_continue.get(self.image_id) is False:
-                            logger.info(f"Animación {self.image_id} pausada")
-                            await asyncio.sleep(0.5)  # Verificar cada 500ms si se reanuda
-                            continue
-                        
-                        for frame_num, frame_data in enumerate(frames_data):
-                            # Revisar nuevamente si debe continuar en cada frame
-                            if self.image_id and self.image_id not in self.should_continue:
-                                logger.info(f"Animación {self.image_id} detenida en frame {frame_num}")
-                                break
-                            
-                            try:
-                                # Usar el delay configurado o el del GIF
-                                if animation_frame_delay is not None:
-                                    frame_delay = animation_frame_delay / 1000.0
-                                else:
-                                    frame_delay = frame_data["duration"] / 1000.0
-                                
-                                payload = {
-                                    "on": True,
-                                    "bri": 255,
-                                    "effect": 0,
-                                    "seg": [{
-                                        "i": frame_data["pixels"]
-                                    }]
-                                }
-                                
-                                async with session.post(
-                                    f"{self.base_url}/json",
-                                    json=payload,
-                                    timeout=aiohttp.ClientTimeout(total=5)
-                                ) as resp:
-                                    if resp.status != 200:
-                                        logger.warning(f"Frame {frame_num} error: {resp.status}")
-                                
-                                # Esperar el delay antes del siguiente frame
-                                await asyncio.sleep(frame_delay)
-                            
-                            except Exception as e:
-                                logger.error(f"Error enviando frame {frame_num}: {str(e)}")
-                        
-                        # Si no es loop infinito, terminar después de una iteración
-                        if not animation_loop:
-                            break
-                        
-                        # Si es loop infinito, limitar a max_loops para evitar bloqueos
-                        loop_count += 1
-                        if loop_count >= max_loops:
-                            break
-                
-                return True, f"Animación enviada a WLED ({len(frames_data)} frames)"
+            if self.protocol == DRGB and packed.width * packed.height > DRGB_MAX_LEDS:
+                return False, f"DRGB admite como máximo {DRGB_MAX_LEDS} LEDs; usa DNRGB o DDP"
             
-            else:
-                # Imagen estática
-                if img.mode != 'RGB':
-                    img = img.convert('RGB')
-                
-                # Aplicar rotación
-                if rotation == 90:
-                    img = img.rotate(90, expand=False)
-                elif rotation == 180:
-                    img = img.rotate(180, expand=False)
-                elif rotation == 270:
-                    img = img.rotate(270, expand=False)
-                
-                # Aplicar mirror vertical
-                if mirror_v:
-                    img = img.transpose(Image.Transpose.FLIP_TOP_BOTTOM)
-                
-                # Aplicar mirror horizontal
-                if mirror_h:
-                    img = img.transpose(Image.Transpose.FLIP_LEFT_RIGHT)
-                
-                # Redimensionar a matriz
-                img = img.resize((matrix_width, matrix_height), Image.Resampling.LANCZOS)
-                
-                # Obtener colores de cada pixel
-                pixels = []
-                for y in range(matrix_height):
-                    for x in range(matrix_width):
-                        r, g, b = img.getpixel((x, y))
-                        pixels.append([r, g, b])
-                
-                # Enviar a WLED
-                async with aiohttp.ClientSession() as session:
-                    try:
-                        payload = {
-                            "on": True,
-                            "bri": 255,
-                            "effect": 0,
-                            "seg": [{
-                                "i": pixels
-                            }]
-                        }
-                        
-                        async with session.post(
-                            f"{self.base_url}/json",
-                            json=payload,
-                            timeout=aiohttp.ClientTimeout(total=5)
-                        ) as resp:
-                            if resp.status == 200:
-                                return True, "Imagen enviada a WLED correctamente"
-                            else:
-                                return False, f"Error del servidor WLED: {resp.status}"
-                    except aiohttp.ClientError as e:
-                        return False, f"Error de conexión: {str(e)}"
+            async with self:
+                try:
+                    success, message = await self.send_frame(packed.frame(0), hold=True, timeout=STATIC_TIMEOUT)
+                    if success:
+                        return True, "Imagen enviada a WLED correctamente"
+                    return False, message
+                except asyncio.TimeoutError:
+                    return False, "Timeout esperando respuesta de WLED"
+                except (aiohttp.ClientError, OSError) as e:
+                    return False, f"Error de conexión: {str(e)}"
         
         except Exception as e:
             logger.error(f"Error procesando imagen: {str(e)}")
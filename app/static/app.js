@@ -25,6 +25,7 @@ const saveMessage = document.getElementById("saveMessage");
 let currentImageFile = null;
 let matrixWidth = 20;
 let matrixHeight = 20;
+let playlistSelection = [];  // ids marcados para crear una playlist, en orden
 
 function checkHealth() {
   fetch("/api/health")
@@ -102,14 +103,14 @@ uploadArea.addEventListener("drop", (e) => {
   e.preventDefault();
   uploadArea.classList.remove("dragover");
   const file = e.dataTransfer.files[0];
-  if (file && file.type.startsWith("image/")) {
+  if (file && (file.type.startsWith("image/") || file.type.startsWith("video/"))) {
     handleImageUpload(file);
   }
 });
 
 fileInput.addEventListener("change", (e) => {
   const file = e.target.files[0];
-  if (file && file.type.startsWith("image/")) {
+  if (file && (file.type.startsWith("image/") || file.type.startsWith("video/"))) {
     handleImageUpload(file);
   }
 });
@@ -118,6 +119,11 @@ function handleImageUpload(file) {
   currentImageFile = file;
   imageName.value = file.name.replace(/\.[^/.]+$/, "");
   
+  if (file.type.startsWith("video/")) {
+    handleVideoUpload(file);
+    return;
+  }
+  
   const reader = new FileReader();
   reader.onload = (e) => {
     const img = new Image();
@@ -134,6 +140,27 @@ function handleImageUpload(file) {
   reader.readAsDataURL(file);
 }
 
+function handleVideoUpload(file) {
+  // Vista previa con el primer fotograma; el vídeo se decodifica en el servidor
+  const video = document.createElement("video");
+  video.muted = true;
+  video.preload = "auto";
+  video.onloadeddata = () => {
+    const poster = document.createElement("canvas");
+    poster.width = video.videoWidth;
+    poster.height = video.videoHeight;
+    poster.getContext("2d").drawImage(video, 0, 0);
+    originalImage.src = poster.toDataURL("image/png");
+    loadMatrixDimensions().then(() => {
+      generateMatrixPreview(poster);
+      uploadStep1.style.display = "none";
+      uploadStep2.style.display = "block";
+      URL.revokeObjectURL(video.src);
+    });
+  };
+  video.src = URL.createObjectURL(file);
+}
+
 function loadMatrixDimensions() {
   return fetch("/api/config/")
     .then(r => r.json())
@@ -205,26 +232,31 @@ saveBtn.addEventListener("click", () => {
   }
   
   const isGif = currentImageFile.type === "image/gif";
+  const isVideo = currentImageFile.type.startsWith("video/");
   
-  console.log("File type:", currentImageFile.type, "Is GIF:", isGif);
+  console.log("File type:", currentImageFile.type, "Is GIF:", isGif, "Is video:", isVideo);
   
-  if (isGif) {
-    // Para GIF, enviar el archivo original al backend
+  if (isGif || isVideo) {
+    // Para GIF y vídeo, enviar el archivo original al backend
     const formData = new FormData();
     formData.append("image", currentImageFile);
     formData.append("name", imageName.value);
-    formData.append("is_gif", "true");
+    formData.append("is_gif", isGif ? "true" : "false");
     
-    console.log("Uploading as GIF");
+    console.log(isVideo ? "Uploading as video" : "Uploading as GIF");
+    if (isVideo) {
+      showSaveMessage("Procesando vídeo...", "info");
+    }
     
     fetch("/api/upload", {
       method: "POST",
       body: formData
     })
       .then(r => r.json())
+      .then(data => data.success ? waitForJob(data.data.job_id) : data)
       .then(data => {
         if (data.success) {
-          showSaveMessage("GIF guardado exitosamente", "success");
+          showSaveMessage(isVideo ? "Vídeo guardado exitosamente" : "GIF guardado exitosamente", "success");
           setTimeout(() => {
             uploadStep1.style.display = "block";
             uploadStep2.style.display = "none";
@@ -279,6 +311,7 @@ saveBtn.addEventListener("click", () => {
           body: formData
         })
           .then(r => r.json())
+          .then(data => data.success ? waitForJob(data.data.job_id) : data)
           .then(data => {
             if (data.success) {
               showSaveMessage("Imagen guardada exitosamente", "success");
@@ -302,6 +335,26 @@ saveBtn.addEventListener("click", () => {
   }
 });
 
+function waitForJob(jobId) {
+  // El procesado se hace en segundo plano: consultar el trabajo hasta que termine
+  return fetch(`/api/upload/jobs/${jobId}`)
+    .then(r => r.json())
+    .then(data => {
+      const job = data.data;
+      if (!data.success) {
+        return {success: false, message: data.detail};
+      }
+      if (job.state === "done") {
+        return {success: true};
+      }
+      if (job.state === "failed") {
+        return {success: false, message: job.error};
+      }
+      showSaveMessage(`Procesando... ${Math.round(job.progress * 100)}%`, "info");
+      return new Promise(resolve => setTimeout(resolve, 500)).then(() => waitForJob(jobId));
+    });
+}
+
 function showSaveMessage(message, type) {
   saveMessage.innerHTML = `
     <div class="alert alert-${type} alert-dismissible fade show" role="alert">
@@ -345,6 +398,10 @@ function loadConfig() {
           document.getElementById("wledRotation").value = config.wled.rotation || "0";
           document.getElementById("wledMirrorV").checked = config.wled.mirror_v || false;
           document.getElementById("wledMirrorH").checked = config.wled.mirror_h || false;
+          document.getElementById("wledDelta").checked = config.wled.delta !== false;
+          document.getElementById("wledSerpentine").checked = config.wled.serpentine || false;
+          document.getElementById("wledVertical").checked = config.wled.vertical || false;
+          showLedmapStatus(config.wled.ledmap);
         }
         
         if (config.animation) {
@@ -352,6 +409,7 @@ function loadConfig() {
           document.getElementById("animationDelay").value = delayValue;
           document.getElementById("delayValue").textContent = delayValue + "ms";
           document.getElementById("animationLoop").checked = config.animation.loop || false;
+          document.getElementById("animationStreamMemory").value = config.animation.stream_memory_mb || 32;
         }
       } else {
         showConfigMessage("Estructura de configuración inválida", "warning");
@@ -362,6 +420,41 @@ function loadConfig() {
     });
 }
 
+// ledmap.json de WLED: se lee en el navegador y se envía con la configuración
+let pendingLedmap = null;
+
+function showLedmapStatus(ledmap) {
+  const status = document.getElementById("wledLedmapStatus");
+  status.textContent = ledmap && ledmap.length
+    ? `ledmap con ${ledmap.length} LEDs`
+    : "ledmap.json de WLED (opcional)";
+  document.getElementById("wledLedmapClear").classList.toggle("d-none", !(ledmap && ledmap.length));
+}
+
+document.getElementById("wledLedmap").addEventListener("change", (e) => {
+  const file = e.target.files[0];
+  if (!file) return;
+  file.text()
+    .then(text => {
+      const data = JSON.parse(text);
+      const map = Array.isArray(data) ? data : data.map;
+      if (!Array.isArray(map)) throw new Error("falta el array \"map\"");
+      pendingLedmap = map;
+      showLedmapStatus(map);
+    })
+    .catch(error => {
+      pendingLedmap = null;
+      e.target.value = "";
+      showConfigMessage("ledmap no válido: " + error.message, "danger");
+    });
+});
+
+document.getElementById("wledLedmapClear").addEventListener("click", () => {
+  pendingLedmap = [];
+  document.getElementById("wledLedmap").value = "";
+  showLedmapStatus(null);
+});
+
 // Actualizar display del delay cuando se mueve el slider
 document.getElementById("animationDelay").addEventListener("input", (e) => {
   document.getElementById("delayValue").textContent = e.target.value + "ms";
@@ -380,9 +473,16 @@ configForm.addEventListener("submit", (e) => {
     wled_rotation: parseInt(document.getElementById("wledRotation").value),
     wled_mirror_v: document.getElementById("wledMirrorV").checked,
     wled_mirror_h: document.getElementById("wledMirrorH").checked,
+    wled_delta: document.getElementById("wledDelta").checked,
+    wled_serpentine: document.getElementById("wledSerpentine").checked,
+    wled_vertical: document.getElementById("wledVertical").checked,
     animation_loop: document.getElementById("animationLoop").checked,
-    animation_frame_delay: parseInt(document.getElementById("animationDelay").value)
+    animation_frame_delay: parseInt(document.getElementById("animationDelay").value),
+    animation_stream_memory_mb: parseInt(document.getElementById("animationStreamMemory").value) || null
   };
+  if (pendingLedmap !== null) {
+    formData.wled_ledmap = pendingLedmap;
+  }
   
   fetch("/api/config/", {
     method: "POST",
@@ -394,6 +494,7 @@ configForm.addEventListener("submit", (e) => {
     .then(r => r.json())
     .then(data => {
       if (data.success) {
+        pendingLedmap = null;
         showConfigMessage("Configuración guardada exitosamente", "success");
       } else {
         showConfigMessage(data.message || "Error al guardar", "danger");
@@ -419,9 +520,13 @@ function showConfigMessage(message, type) {
 // Cargar imágenes cuando se abre la sección
 document.querySelectorAll('a[data-section="playlists"]').forEach(link => {
   link.addEventListener("click", loadImages);
+  link.addEventListener("click", loadPlaylists);
+  link.addEventListener("click", loadEffects);
+  link.addEventListener("click", loadFonts);
 });
 
 function loadImages() {
+  playlistSelection = [];
   fetch("/api/upload/images")
     .then(r => r.json())
     .then(data => {
@@ -436,23 +541,17 @@ function loadImages() {
         return;
       }
       
-      // Para cada imagen, obtener info de frames
-      Promise.all(data.data.map(img => 
-        fetch(`/api/upload/${img.id}/frames`)
-          .then(r => r.json())
-          .then(frames => ({...img, frames_info: frames}))
-          .catch(() => ({...img, frames_info: {is_animated: false}}))
-      )).then(imagesWithFrames => {
-        imagesList.innerHTML = imagesWithFrames.map(img => {
-          const isAnimated = img.frames_info?.is_animated || false;
-          const frames = img.frames_info?.frames || [];
+      // El catálogo ya incluye el número de frames de cada asset
+      Promise.resolve(data.data).then(images => {
+        imagesList.innerHTML = images.map(img => {
+          const frameCount = img.frame_count || 1;
           
           let animationControls = '';
-          if (isAnimated && frames.length > 1) {
+          if (frameCount > 1) {
             animationControls = `
               <div class="mt-2 pt-2 border-top">
                 <small class="text-muted d-block mb-2">
-                  <i class="bi bi-film me-1"></i>Animación: ${frames.length} frames
+                  <i class="bi bi-film me-1"></i>Animación: ${frameCount} frames
                 </small>
                 <div class="btn-group btn-group-sm w-100" role="group">
                   <button class="btn btn-outline-primary btn-sm flex-grow-1" onclick="animateImage('${img.id}', 'play')">
@@ -471,11 +570,16 @@ function loadImages() {
           
           return `
             <div class="col-md-6 col-lg-4 mb-4">
-              <div class="card h-100 shadow-sm">
+              <div class="card h-100 shadow-sm" data-image-card="${img.id}">
                 <div class="card-body p-0">
-                  <img src="/api/upload/preview/${img.id}" alt="${img.name}" class="card-img-top" style="max-height: 200px; object-fit: contain; background-color: #f0f0f0;">
+                  ${frameCount > 1
+                    ? `<canvas data-sprite="${img.id}" class="card-img-top sprite-preview" style="height: 200px; object-fit: contain; background-color: #f0f0f0; image-rendering: pixelated;"></canvas>`
+                    : `<img src="/api/upload/preview/${img.id}" alt="${img.name}" class="card-img-top" style="max-height: 200px; object-fit: contain; background-color: #f0f0f0;">`}
                 </div>
                 <div class="card-footer bg-light">
+                  <div class="form-check float-end" title="Añadir a playlist">
+                    <input class="form-check-input playlist-select" type="checkbox" value="${img.id}">
+                  </div>
                   <h6 class="mb-2">${img.name}</h6>
                   <small class="text-muted d-block mb-2">${new Date(img.uploaded_at).toLocaleString()}</small>
                   <div class="btn-group btn-group-sm w-100" role="group">
@@ -495,11 +599,53 @@ function loadImages() {
             </div>
           `;
         }).join("");
+        imagesList.querySelectorAll("canvas[data-sprite]").forEach(initSpritePreview);
       });
     })
     .catch(error => console.error("Error loading images:", error));
 }
 
+function initSpritePreview(canvas) {
+  // Vista previa animada desde el sprite sheet del asset (un PNG + manifiesto, revalidados con ETag)
+  const imageId = canvas.dataset.sprite;
+  fetch(`/api/upload/${imageId}/sprite`)
+    .then(r => r.json())
+    .then(data => {
+      const manifest = data.data;
+      const sheet = new Image();
+      sheet.onload = () => {
+        canvas.width = manifest.frame_width;
+        canvas.height = manifest.frame_height;
+        const ctx = canvas.getContext("2d");
+        let index = 0;
+        let timer = null;
+        
+        const draw = () => {
+          const x = (index % manifest.columns) * manifest.frame_width;
+          const y = Math.floor(index / manifest.columns) * manifest.frame_height;
+          ctx.drawImage(sheet, x, y, manifest.frame_width, manifest.frame_height, 0, 0, manifest.frame_width, manifest.frame_height);
+        };
+        const step = () => {
+          draw();
+          timer = setTimeout(step, manifest.durations[index] || 100);
+          index = (index + 1) % manifest.frame_count;
+        };
+        
+        // Solo se anima con el ratón encima para no tener cientos de temporizadores activos
+        draw();
+        canvas.addEventListener("mouseenter", () => { if (!timer) step(); });
+        canvas.addEventListener("mouseleave", () => {
+          clearTimeout(timer);
+          timer = null;
+          index = 0;
+          draw();
+        });
+      };
+      sheet.src = manifest.sprite_url;
+    })
+    .catch(error => console.error("Error loading preview:", error));
+}
+
 function downloadImage(filename, name) {
   const link = document.createElement("a");
   link.href = `/api/upload/download/${filename}`;
@@ -572,17 +718,11 @@ function animateImage(imageId, action) {
   })
     .then(r => r.json())
     .then(data => {
-      if (data.success) {
-        button.innerHTML = originalText;
-        button.classList.add('active');
-        setTimeout(() => {
-          button.disabled = false;
-          button.classList.remove('active');
-        }, 500);
-      } else {
+      // El estado real llega por el stream de eventos del reproductor
+      button.disabled = false;
+      button.innerHTML = originalText;
+      if (!data.success) {
         alert("Error: " + (data.message || "No se pudo " + action + " animación"));
-        button.disabled = false;
-        button.innerHTML = originalText;
       }
     })
     .catch(error => {
@@ -590,4 +730,315 @@ function animateImage(imageId, action) {
       button.disabled = false;
       button.innerHTML = originalText;
     });
-}
\ No newline at end of file
+}
+// ====== ESTADO DEL REPRODUCTOR ======
+
+const playerBar = document.getElementById("playerBar");
+const playerSeek = document.getElementById("playerSeek");
+let playerSeeking = false;  // No mover el slider mientras el usuario lo arrastra
+
+function renderPlayerStatus(players) {
+  // Un reproductor por salida; se muestra el de la salida que está activa
+  const statuses = Object.values(players);
+  const status = statuses.find(s => s.state !== "stopped") || statuses[0];
+  document.querySelectorAll("[data-image-card]").forEach(card => {
+    card.classList.toggle("border-primary", !!status && status.state !== "stopped" && card.dataset.imageCard === status.image_id);
+  });
+  if (!status || (status.state === "stopped" && !status.image_id)) {
+    playerBar.classList.add("d-none");
+    return;
+  }
+  playerBar.classList.remove("d-none");
+
+  const stateBadge = document.getElementById("playerState");
+  stateBadge.textContent = status.state;
+  stateBadge.className = "badge " + ({playing: "bg-success", paused: "bg-warning text-dark"}[status.state] || "bg-secondary");
+  document.getElementById("playerOffline").classList.toggle("d-none", status.online !== false);
+  document.getElementById("playerAsset").textContent = status.image_id || "";
+
+  const frameCount = status.frame_count || 0;
+  playerSeek.disabled = frameCount < 2;
+  playerSeek.max = Math.max(frameCount - 1, 0);
+  if (!playerSeeking) {
+    playerSeek.value = status.frame;
+  }
+  document.getElementById("playerFrame").textContent = `${frameCount ? status.frame + 1 : 0} / ${frameCount}`;
+  const stats = status.stats || {};
+  const rate = status.output_rate;
+  const playerStats = document.getElementById("playerStats");
+  playerStats.textContent = status.state === "playing"
+    ? `${stats.fps || 0} fps · retraso p95 ${(stats.lateness_ms || {}).p95 || 0} ms`
+      + (rate ? ` · máx ${rate.target_fps} fps` : "")
+    : "";
+  playerStats.title = rate ? `${rate.reason}; delta: ${rate.delta.reason}` : "";
+}
+
+function playerCommand(action, body) {
+  fetch(`/api/player/${action}`, {
+    method: "POST",
+    headers: {"Content-Type": "application/json"},
+    body: body ? JSON.stringify(body) : undefined
+  })
+    .then(r => r.json())
+    .then(data => {
+      if (!data.success) {
+        alert("Error: " + (data.detail || data.message));
+      }
+    })
+    .catch(error => alert("Error: " + error.message));
+}
+
+document.getElementById("playerPause").addEventListener("click", () => playerCommand("pause"));
+document.getElementById("playerResume").addEventListener("click", () => playerCommand("resume"));
+document.getElementById("playerStop").addEventListener("click", () => playerCommand("stop"));
+playerSeek.addEventListener("input", () => { playerSeeking = true; });
+playerSeek.addEventListener("change", () => {
+  playerSeeking = false;
+  playerCommand("seek", {frame: parseInt(playerSeek.value, 10)});
+});
+
+// EventSource se reconecta solo si se corta la conexión
+const playerEvents = new EventSource("/api/player/events");
+playerEvents.onmessage = (e) => renderPlayerStatus(JSON.parse(e.data));
+
+// ====== PLAYLISTS ======
+
+document.getElementById("imagesList").addEventListener("change", (e) => {
+  // Mantener el orden en que se marcan las imágenes
+  if (!e.target.classList.contains("playlist-select")) return;
+  playlistSelection = playlistSelection.filter(id => id !== e.target.value);
+  if (e.target.checked) {
+    playlistSelection.push(e.target.value);
+  }
+});
+
+function showPlaylistMessage(message, type) {
+  document.getElementById("playlistMessage").innerHTML = `
+    <div class="alert alert-${type} alert-dismissible fade show" role="alert">
+      ${message}
+      <button type="button" class="btn-close" data-bs-dismiss="alert"></button>
+    </div>
+  `;
+}
+
+function loadPlaylists() {
+  fetch("/api/playlists")
+    .then(r => r.json())
+    .then(data => {
+      const list = document.getElementById("playlistsList");
+      if (!data.success || data.data.length === 0) {
+        list.innerHTML = `<li class="list-group-item text-muted">No hay playlists</li>`;
+        return;
+      }
+      list.innerHTML = data.data.map(playlist => `
+        <li class="list-group-item d-flex align-items-center">
+          <div class="flex-grow-1">
+            <strong>${playlist.name}</strong>
+            <small class="text-muted ms-2">${playlist.entries.length} entradas${playlist.loop ? " · repetir" : ""}${playlist.crossfade_ms ? ` · fundido ${playlist.crossfade_ms} ms` : ""}</small>
+          </div>
+          <div class="btn-group btn-group-sm">
+            <button class="btn btn-outline-primary" onclick="playPlaylist('${playlist.id}')"><i class="bi bi-play-fill"></i></button>
+            <button class="btn btn-outline-danger" onclick="stopPlaylist()"><i class="bi bi-stop-fill"></i></button>
+            <button class="btn btn-outline-secondary" onclick="deletePlaylist('${playlist.id}')"><i class="bi bi-trash"></i></button>
+          </div>
+        </li>
+      `).join("");
+    })
+    .catch(error => console.error("Error loading playlists:", error));
+}
+
+document.getElementById("createPlaylistBtn").addEventListener("click", () => {
+  const name = document.getElementById("playlistName").value;
+  if (!name || playlistSelection.length === 0) {
+    showPlaylistMessage("Indica un nombre y marca al menos una imagen", "warning");
+    return;
+  }
+  const duration = parseInt(document.getElementById("playlistHold").value) || null;
+  fetch("/api/playlists", {
+    method: "POST",
+    headers: {"Content-Type": "application/json"},
+    body: JSON.stringify({
+      name: name,
+      entries: playlistSelection.map(id => ({asset_id: id, duration_ms: duration})),
+      loop: document.getElementById("playlistLoop").checked,
+      crossfade_ms: parseInt(document.getElementById("playlistCrossfade").value) || 0
+    })
+  })
+    .then(r => r.json())
+    .then(data => {
+      if (data.success) {
+        showPlaylistMessage("Playlist creada", "success");
+        document.getElementById("playlistName").value = "";
+        loadPlaylists();
+      } else {
+        showPlaylistMessage(data.detail || "Error al crear la playlist", "danger");
+      }
+    })
+    .catch(error => showPlaylistMessage("Error: " + error.message, "danger"));
+});
+
+function playPlaylist(playlistId) {
+  fetch(`/api/playlists/${playlistId}/play`, {method: "POST"})
+    .then(r => r.json())
+    .then(data => showPlaylistMessage(data.message || data.detail, data.success ? "success" : "danger"))
+    .catch(error => showPlaylistMessage("Error: " + error.message, "danger"));
+}
+
+function stopPlaylist() {
+  fetch("/api/playlists/stop", {method: "POST"})
+    .then(r => r.json())
+    .then(data => showPlaylistMessage(data.message, "info"))
+    .catch(error => showPlaylistMessage("Error: " + error.message, "danger"));
+}
+
+function deletePlaylist(playlistId) {
+  if (confirm("¿Eliminar esta playlist?")) {
+    fetch(`/api/playlists/${playlistId}`, {method: "DELETE"})
+      .then(() => loadPlaylists())
+      .catch(error => showPlaylistMessage("Error: " + error.message, "danger"));
+  }
+}
+
+// Efectos procedurales
+let effectDefaults = {};
+
+function showEffectMessage(message, type) {
+  document.getElementById("effectMessage").innerHTML = `
+    <div class="alert alert-${type} alert-dismissible fade show" role="alert">
+      ${message}
+      <button type="button" class="btn-close" data-bs-dismiss="alert"></button>
+    </div>
+  `;
+}
+
+function loadEffects() {
+  fetch("/api/effects")
+    .then(r => r.json())
+    .then(data => {
+      const select = document.getElementById("effectName");
+      const current = select.value;
+      effectDefaults = {};
+      select.innerHTML = data.data.map(effect => {
+        effectDefaults[effect.name] = effect.params;
+        return `<option value="${effect.name}" title="${effect.description}">${effect.name}</option>`;
+      }).join("");
+      if (current) select.value = current;
+      document.getElementById("effectParams").value = JSON.stringify(effectDefaults[select.value] || {});
+    })
+    .catch(error => console.error("Error loading effects:", error));
+}
+
+document.getElementById("effectName").addEventListener("change", (e) => {
+  document.getElementById("effectParams").value = JSON.stringify(effectDefaults[e.target.value] || {});
+});
+
+document.getElementById("playEffectBtn").addEventListener("click", () => {
+  let params;
+  try {
+    params = JSON.parse(document.getElementById("effectParams").value || "{}");
+  } catch (error) {
+    showEffectMessage("Parámetros no válidos: " + error.message, "danger");
+    return;
+  }
+  const name = document.getElementById("effectName").value;
+  fetch(`/api/effects/${name}/play`, {
+    method: "POST",
+    headers: {"Content-Type": "application/json"},
+    body: JSON.stringify({params, fps: parseFloat(document.getElementById("effectFps").value) || 30})
+  })
+    .then(r => r.json())
+    .then(data => {
+      const overBudget = data.data && data.data.budget && !data.data.budget.within_budget;
+      showEffectMessage(data.message || data.detail, data.success ? (overBudget ? "warning" : "success") : "danger");
+    })
+    .catch(error => showEffectMessage("Error: " + error.message, "danger"));
+});
+
+document.getElementById("stopEffectBtn").addEventListener("click", () => {
+  fetch("/api/effects/stop", {method: "POST"})
+    .then(r => r.json())
+    .then(data => showEffectMessage(data.message, "info"))
+    .catch(error => showEffectMessage("Error: " + error.message, "danger"));
+});
+
+// Texto y marquesinas
+const TEXT_UPDATE_DELAY = 150;  // ms sin cambios antes de enviar la actualización en directo
+let textPlaying = false;
+let textUpdateTimer = null;
+
+function showTextMessage(message, type) {
+  document.getElementById("textMessage").innerHTML = `
+    <div class="alert alert-${type} alert-dismissible fade show" role="alert">
+      ${message}
+      <button type="button" class="btn-close" data-bs-dismiss="alert"></button>
+    </div>
+  `;
+}
+
+function loadFonts() {
+  fetch("/api/text/fonts")
+    .then(r => r.json())
+    .then(data => {
+      const select = document.getElementById("textFont");
+      const current = select.value;
+      select.innerHTML = data.data.fonts.map(font => `<option value="${font}">${font}</option>`).join("");
+      if (current) select.value = current;
+    })
+    .catch(error => console.error("Error loading fonts:", error));
+}
+
+function textParams() {
+  return {
+    text: document.getElementById("textContent").value,
+    font: document.getElementById("textFont").value || "default",
+    color: document.getElementById("textColor").value,
+    background: document.getElementById("textBackground").value,
+    speed: parseFloat(document.getElementById("textSpeed").value) || 0,
+    clock: document.getElementById("textClock").checked
+  };
+}
+
+document.getElementById("playTextBtn").addEventListener("click", () => {
+  fetch("/api/text/play", {
+    method: "POST",
+    headers: {"Content-Type": "application/json"},
+    body: JSON.stringify(textParams())
+  })
+    .then(r => r.json())
+    .then(data => {
+      textPlaying = Boolean(data.success);
+      showTextMessage(data.message || data.detail, data.success ? "success" : "danger");
+    })
+    .catch(error => showTextMessage("Error: " + error.message, "danger"));
+});
+
+document.getElementById("stopTextBtn").addEventListener("click", () => {
+  textPlaying = false;
+  fetch("/api/text/stop", {method: "POST"})
+    .then(r => r.json())
+    .then(data => showTextMessage(data.message, "info"))
+    .catch(error => showTextMessage("Error: " + error.message, "danger"));
+});
+
+// Cambios en directo mientras se muestra el texto
+["textContent", "textFont", "textColor", "textBackground", "textSpeed", "textClock"].forEach(id => {
+  document.getElementById(id).addEventListener("input", () => {
+    if (!textPlaying) return;
+    clearTimeout(textUpdateTimer);
+    textUpdateTimer = setTimeout(() => {
+      fetch("/api/text/update", {
+        method: "POST",
+        headers: {"Content-Type": "application/json"},
+        body: JSON.stringify(textParams())
+      })
+        .then(r => {
+          if (r.status === 409) textPlaying = false;  // Se reprodujo otra cosa
+          return r.json();
+        })
+        .then(data => {
+          if (!data.success) showTextMessage(data.detail, "danger");
+        })
+        .catch(error => showTextMessage("Error: " + error.message, "danger"));
+    }, TEXT_UPDATE_DELAY);
+  });
+});
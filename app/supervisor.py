@@ -0,0 +1,107 @@
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import sys
+import time
+
+logger = logging.getLogger("app.supervisor")
+
+# Arranca el proceso de reproducción (app.engine, en un socket Unix) y la API (app.main, con
+# los workers que se pidan) como procesos separados y reinicia el que termine. La API puede
+# reiniciarse (--reload, un fallo) sin cortar lo que se está mostrando en la matriz.
+#
+#   python -m app.supervisor --host 0.0.0.0 --port 8000 --workers 3
+
+DEFAULT_SOCKET = "/tmp/wled-playback.sock"
+RESTART_MIN_DELAY = 1.0  # Segundos antes del primer reinicio; se duplica en cada fallo seguido
+RESTART_MAX_DELAY = 30.0
+STABLE_AFTER = 60.0  # Un proceso que aguanta esto se considera estable y el retardo vuelve al mínimo
+STOP_TIMEOUT = 10.0  # Segundos de margen para terminar antes de matar el proceso
+
+
+class Supervised:
+    """Proceso hijo que se reinicia con retardo creciente si termina"""
+
+    def __init__(self, name: str, args: list, env: dict):
+        self.name = name
+        self.args = args
+        self.env = env
+        self.process = None
+        self.restarts = 0
+        self._stopping = False
+
+    async def run(self):
+        delay = RESTART_MIN_DELAY
+        while not self._stopping:
+            started = time.monotonic()
+            self.process = await asyncio.create_subprocess_exec(*self.args, env=self.env)
+            logger.info(f"{self.name} started (pid {self.process.pid})")
+            code = await self.process.wait()
+            if self._stopping:
+                return
+            if time.monotonic() - started >= STABLE_AFTER:
+                delay = RESTART_MIN_DELAY
+            logger.warning(f"{self.name} exited with code {code}, restarting in {delay:.0f} s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RESTART_MAX_DELAY)
+            self.restarts += 1
+
+    async def stop(self):
+        self._stopping = True
+        if self.process is None or self.process.returncode is not None:
+            return
+        self.process.terminate()
+        try:
+            async with asyncio.timeout(STOP_TIMEOUT):
+                await self.process.wait()
+        except TimeoutError:
+            logger.warning(f"{self.name} did not stop in {STOP_TIMEOUT:.0f} s, killing it")
+            self.process.kill()
+            await self.process.wait()
+
+
+async def supervise(args):
+    # API_WORKERS: cada worker reparte con los demás los trabajos de CPU (app.services.jobs)
+    env = dict(os.environ, PLAYBACK_SOCKET=args.socket, API_WORKERS=str(1 if args.reload else args.workers))
+    uvicorn = [sys.executable, "-m", "uvicorn", "--log-level", args.log_level]
+    api_args = uvicorn + ["app.main:app", "--host", args.host, "--port", str(args.port)]
+    api_args += ["--reload", "--reload-dir", "app"] if args.reload else ["--workers", str(args.workers)]
+    children = [
+        Supervised("playback", uvicorn + ["app.engine:engine", "--uds", args.socket], env),
+        Supervised("api", api_args, env)
+    ]
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+
+    tasks = [asyncio.create_task(child.run(), name=f"supervise-{child.name}") for child in children]
+    await stop.wait()
+    logger.info("Stopping")
+    # Primero la API, para que no reenvíe peticiones a un proceso de reproducción que se está cerrando
+    for child in reversed(children):
+        await child.stop()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API y proceso de reproducción supervisados")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("API_WORKERS", 1)),
+                        help="Workers de la API (la reproducción es siempre un proceso); por defecto API_WORKERS")
+    parser.add_argument("--reload", action="store_true", help="Reiniciar la API al cambiar el código (desarrollo)")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, help="Socket Unix del proceso de reproducción")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    asyncio.run(supervise(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Benchmark: bytes enviados por HTTP con frames completos vs delta, por animación.
+
+Uso: python -m benchmarks.delta_frames [--size N]
+"""
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from app.services.payload import DeltaEncoder, build_payload
+
+ASSETS_DIR = Path(__file__).parent.parent / "data" / "assets"
+
+
+def gif_frames(path: Path, size: int) -> list:
+    with Image.open(path) as img:
+        frames = []
+        for index in range(getattr(img, "n_frames", 1)):
+            img.seek(index)
+            frames.append(np.asarray(img.convert("RGB").resize((size, size), Image.Resampling.NEAREST), dtype=np.uint8))
+        return frames
+
+
+def sample_animations(size: int) -> dict:
+    """GIFs de los assets y una animación sintética de bajo movimiento (un punto que recorre la matriz)"""
+    animations = {path.stem.split("_", 1)[0]: gif_frames(path, size) for path in sorted(ASSETS_DIR.glob("*.gif"))}
+    dot = []
+    for index in range(size * 2):
+        frame = np.zeros((size, size, 3), dtype=np.uint8)
+        frame[size // 2, index % size] = (255, 0, 0)
+        dot.append(frame)
+    animations["dot"] = dot
+    return animations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=32)
+    args = parser.parse_args()
+
+    print(f"{'anim':>10} {'frames':>7} {'full B':>9} {'delta B':>9} {'saved':>7} {'full us':>8} {'delta us':>9}")
+    for name, frames in sample_animations(args.size).items():
+        started = time.perf_counter()
+        full_bytes = sum(len(build_payload(frame)) for frame in frames)
+        full_us = (time.perf_counter() - started) / len(frames) * 1e6
+
+        encoder = DeltaEncoder()
+        started = time.perf_counter()
+        for frame in frames:
+            encoder.encode(frame)
+            encoder.acknowledge()
+        delta_us = (time.perf_counter() - started) / len(frames) * 1e6
+        stats = encoder.stats()
+        print(f"{name:>10} {len(frames):>7} {full_bytes:>9} {stats['bytes_sent']:>9} {1 - stats['bytes_sent'] / full_bytes:>7.1%} {full_us:>8.0f} {delta_us:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""Dispositivos WLED de prueba para los benchmarks: servidor HTTP /json y receptor DDP por UDP,
+ambos con latencia y pérdida configurables. Reconstruyen el estado de los LEDs igual que WLED
+y anotan cuándo se muestra cada frame (reloj monótono, comparable entre procesos)."""
+import asyncio
+import json
+import random
+import time
+
+import numpy as np
+from aiohttp import web
+
+from app.services.realtime import DDP_FLAG_PUSH, DDP_HEADER
+
+
+def apply_segment(leds: np.ndarray, items: list):
+    """Aplica el array "i" de un segmento: índice suelto, tramo [inicio, fin, color] o color"""
+    cursor = 0
+    index = 0
+    while index < len(items):
+        item = items[index]
+        if isinstance(item, int):
+            following = items[index + 1:index + 3]
+            if len(following) == 2 and isinstance(following[0], int) and isinstance(following[1], str):
+                leds[item:following[0]] = np.frombuffer(bytes.fromhex(following[1]), dtype=np.uint8)
+                cursor = following[0]
+                index += 3
+                continue
+            cursor = item
+        else:
+            if cursor < len(leds):
+                leds[cursor] = np.frombuffer(bytes.fromhex(item), dtype=np.uint8)
+            cursor += 1
+        index += 1
+
+
+class FakeDevice:
+    """Estado de LEDs y registro de frames mostrados: (marca del frame, instante)"""
+
+    def __init__(self, led_count: int, latency_ms: float = 0.0, loss: float = 0.0, seed: int = 0, arch: str = "esp32"):
+        self.arch = arch
+        self.leds = np.zeros((led_count, 3), dtype=np.uint8)
+        self.latency = latency_ms / 1000.0
+        self.loss = loss
+        self.random = random.Random(seed)
+        self.displayed = []
+        self.received = 0
+        self.lost = 0
+        self.bytes_received = 0
+
+    def lose(self) -> bool:
+        if self.loss > 0 and self.random.random() < self.loss:
+            self.lost += 1
+            return True
+        return False
+
+    def marker(self) -> int:
+        """Los benchmarks marcan cada frame en el LED 0 (24 bits)"""
+        r, g, b = self.leds[0].tolist()
+        return (r << 16) | (g << 8) | b
+
+    def display(self, displayed_at: float):
+        self.displayed.append((self.marker(), displayed_at))
+
+    def info(self) -> dict:
+        """Respuesta de /json/info con los campos que usa el control de ritmo"""
+        return {"name": "fake", "ver": "fake", "arch": self.arch, "leds": {"count": len(self.leds), "fps": 0}}
+
+    def results(self) -> dict:
+        return {
+            "displayed": self.displayed,
+            "received": self.received,
+            "lost": self.lost,
+            "bytes_received": self.bytes_received
+        }
+
+
+class FakeHttpWled(FakeDevice):
+    """POST /json como WLED; la latencia retrasa la respuesta y la pérdida corta la conexión"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.runner = None
+        self.port = None
+
+    async def handle_json(self, request: web.Request):
+        body = await request.read()
+        self.received += 1
+        self.bytes_received += len(body)
+        if self.lose():
+            request.transport.abort()
+            return web.Response(status=500)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        for segment in json.loads(body).get("seg", []):
+            apply_segment(self.leds, segment.get("i", []))
+        self.display(time.monotonic())
+        return web.json_response({"success": True})
+
+    async def handle_info(self, request: web.Request):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return web.json_response(self.info())
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0):
+        app = web.Application()
+        app.router.add_post("/json", self.handle_json)
+        app.router.add_get("/json/info", self.handle_info)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, host, port)
+        await site.start()
+        self.port = self.runner.addresses[0][1]
+        return self.port
+
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+
+
+class FakeDdpWled(FakeDevice, asyncio.DatagramProtocol):
+    """Receptor DDP: cada paquete se pierde con probabilidad 'loss' y el frame se muestra
+    'latency' después de recibir el paquete con PUSH"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.transport = None
+        self.port = None
+
+    def datagram_received(self, data: bytes, addr):
+        self.received += 1
+        self.bytes_received += len(data)
+        if self.lose() or len(data) < DDP_HEADER.size:
+            return
+        flags, _, _, _, offset, length = DDP_HEADER.unpack_from(data)
+        pixels = np.frombuffer(data, dtype=np.uint8, offset=DDP_HEADER.size, count=length)
+        start = offset // 3
+        count = min(len(pixels) // 3, len(self.leds) - start)
+        self.leds[start:start + count] = pixels[:count * 3].reshape(-1, 3)
+        if flags & DDP_FLAG_PUSH:
+            self.display(time.monotonic() + self.latency)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0):
+        loop = asyncio.get_running_loop()
+        self.transport, _ = await loop.create_datagram_endpoint(lambda: self, local_addr=(host, port))
+        self.port = self.transport.get_extra_info("sockname")[1]
+        return self.port
+
+    async def stop(self):
+        if self.transport is not None:
+            self.transport.close()
+
+
+def serve(connection, protocol: str, led_count: int, latency_ms: float, loss: float):
+    """Proceso del dispositivo de prueba: envía el puerto, espera "stop" y devuelve los resultados.
+    Va en un proceso aparte para que su CPU no cuente en la del envío."""
+    async def run():
+        device_class = FakeDdpWled if protocol == "ddp" else FakeHttpWled
+        device = device_class(led_count, latency_ms, loss)
+        connection.send(await device.start())
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, connection.recv)
+        await device.stop()
+        connection.send(device.results())
+
+    asyncio.run(run())
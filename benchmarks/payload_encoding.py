@@ -0,0 +1,58 @@
+"""Micro-benchmark: extracción de pixels y payload JSON de WLED, ruta antigua vs nueva.
+
+Uso: python -m benchmarks.payload_encoding [--repeat N]
+"""
+import argparse
+import json
+import timeit
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from app.services.payload import build_payload, extract_pixels
+
+ASSETS_DIR = Path(__file__).parent.parent / "data" / "assets"
+SIZES = (16, 32, 64)
+
+
+def legacy_payload(img: Image.Image, width: int, height: int) -> bytes:
+    """Ruta original: getpixel por pixel y lista de [r, g, b]"""
+    pixels = []
+    for y in range(height):
+        for x in range(width):
+            r, g, b = img.getpixel((x, y))
+            pixels.append([r, g, b])
+    payload = {"on": True, "bri": 255, "effect": 0, "seg": [{"i": pixels}]}
+    return json.dumps(payload).encode()
+
+
+def sample_images(size: int) -> dict:
+    """Un frame real de los assets (pixel-art/animación) y ruido aleatorio como peor caso"""
+    images = {}
+    for path in sorted(ASSETS_DIR.glob("*.gif")) + sorted(ASSETS_DIR.glob("*.png")):
+        images[path.stem.split("_", 1)[0]] = Image.open(path).convert("RGB").resize((size, size), Image.Resampling.LANCZOS)
+    rng = np.random.default_rng(0)
+    images["noise"] = Image.fromarray(rng.integers(0, 256, (size, size, 3), dtype=np.uint8))
+    return images
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'size':>6} {'image':>10} {'legacy us':>10} {'hex us':>8} {'ranges us':>10} {'legacy B':>9} {'hex B':>7} {'ranges B':>9}")
+    for size in SIZES:
+        for name, img in sample_images(size).items():
+            legacy = lambda: legacy_payload(img, size, size)
+            hex_only = lambda: build_payload(extract_pixels(img), ranges=False)
+            ranges = lambda: build_payload(extract_pixels(img), ranges=True)
+
+            times = [timeit.timeit(fn, number=args.repeat) / args.repeat * 1e6 for fn in (legacy, hex_only, ranges)]
+            sizes = [len(fn()) for fn in (legacy, hex_only, ranges)]
+            print(f"{size:>6} {name:>10} {times[0]:>10.0f} {times[1]:>8.0f} {times[2]:>10.0f} {sizes[0]:>9} {sizes[1]:>7} {sizes[2]:>9}")
+
+
+if __name__ == "__main__":
+    main()
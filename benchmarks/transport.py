@@ -0,0 +1,188 @@
+"""Benchmark del envío a WLED contra dispositivos de prueba (HTTP /json y DDP) con latencia y pérdida.
+
+Reproduce los assets de data/assets con el Player y WledService reales y mide, por protocolo y
+tamaño de matriz: fps conseguidos, latencia de extremo a extremo, jitter entre frames y CPU por frame.
+
+Uso: python -m benchmarks.transport [--sizes 16,32,64] [--protocols http,ddp] [--fps 30]
+     [--seconds 3] [--latency-ms 0] [--loss 0] [--no-delta] [--adaptive] [--json resultados.json]
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import platform
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from app.services.frame_store import frame_store
+from app.services.http_pool import connection_manager
+from app.services.player import Player
+from app.services.wled_service import WledService
+from benchmarks.fake_wled import serve
+
+ASSETS_DIR = Path(__file__).parent.parent / "data" / "assets"
+
+
+class StampedFrames:
+    """Frames del asset con un número de secuencia en el LED 0 para emparejar envío y recepción"""
+
+    def __init__(self, packed):
+        self.packed = packed
+        self.durations = packed.durations
+        self.sent = {}  # {secuencia: instante de envío}
+        self._sequence = 0
+
+    def __len__(self):
+        return len(self.packed)
+
+    def frame(self, index: int) -> np.ndarray:
+        self._sequence = self._sequence % 0xFFFFFF + 1
+        frame = np.array(self.packed.frame(index), copy=True)
+        frame[0, 0] = ((self._sequence >> 16) & 0xFF, (self._sequence >> 8) & 0xFF, self._sequence & 0xFF)
+        self.sent[self._sequence] = time.monotonic()
+        return frame
+
+
+def percentiles(values: list) -> dict:
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "max": None}
+    ms = np.array(values) * 1000
+    return {
+        "p50": round(float(np.percentile(ms, 50)), 3),
+        "p95": round(float(np.percentile(ms, 95)), 3),
+        "p99": round(float(np.percentile(ms, 99)), 3),
+        "max": round(float(ms.max()), 3)
+    }
+
+
+def summarize(frames: StampedFrames, device: dict, frame_ms: float) -> dict:
+    """Frames mostrados (primera vez que aparece cada secuencia), latencia y jitter"""
+    shown = {}
+    for sequence, displayed_at in device["displayed"]:
+        if sequence in frames.sent and sequence not in shown:
+            shown[sequence] = displayed_at
+    times = sorted(shown.values())
+    latency = [displayed_at - frames.sent[sequence] for sequence, displayed_at in shown.items()]
+    intervals = np.diff(times) if len(times) > 1 else np.array([])
+    return {
+        "frames_displayed": len(shown),
+        "fps": round((len(times) - 1) / (times[-1] - times[0]), 2) if len(times) > 1 and times[-1] > times[0] else 0.0,
+        "latency_ms": percentiles(latency),
+        "jitter_ms": percentiles(list(np.abs(intervals - frame_ms / 1000.0))),
+        "bytes_received": device["bytes_received"],
+        "requests_lost": device["lost"]
+    }
+
+
+async def run_case(asset: Path, protocol: str, size: int, args) -> dict:
+    packed = await frame_store.get_async(asset, size, size)
+    frames = StampedFrames(packed)
+    frame_ms = 1000.0 / args.fps
+
+    context = multiprocessing.get_context("spawn")
+    connection, child_connection = context.Pipe()
+    process = context.Process(target=serve, args=(child_connection, protocol, size * size, args.latency_ms, args.loss))
+    process.start()
+    try:
+        port = await asyncio.to_thread(connection.recv)
+        output = WledService("127.0.0.1", port, protocol, udp_port=port, delta=not args.no_delta, adaptive=args.adaptive)
+        player = Player(output)
+        await player.start()
+
+        cpu_started = time.process_time()
+        player.play(asset.stem, frames, loop=True, frame_delay=round(frame_ms))
+        await asyncio.sleep(args.seconds)
+        player.stop()
+        cpu = time.process_time() - cpu_started
+        stats = player.stats.snapshot()
+        await player.shutdown()
+
+        await asyncio.sleep(0.2)  # Respuestas y paquetes en vuelo
+        connection.send("stop")
+        device = await asyncio.to_thread(connection.recv)
+    finally:
+        process.join(timeout=5)
+        if process.is_alive():
+            process.kill()
+
+    result = {
+        "asset": asset.name,
+        "protocol": protocol,
+        "size": size,
+        "leds": size * size,
+        "target_fps": args.fps,
+        "frames_sent": stats["frames_sent"],
+        "frames_dropped": stats["frames_dropped"],
+        "frames_throttled": stats["frames_throttled"],
+        "send_errors": stats["send_errors"],
+        "cpu_ms_per_frame": round(cpu / stats["frames_sent"] * 1000, 3) if stats["frames_sent"] else None,
+        **summarize(frames, device, frame_ms)
+    }
+    if output.delta is not None:
+        result["delta"] = output.delta_stats()
+    if output.rate is not None:
+        result["rate"] = output.rate_status()
+    return result
+
+
+def assets(limit: int) -> list:
+    paths = [path for path in sorted(ASSETS_DIR.iterdir()) if path.is_file() and path.suffix.lower() != ".json"]
+    return paths[:limit] if limit else paths
+
+
+async def run(args) -> list:
+    results = []
+    try:
+        for asset in assets(args.assets):
+            for protocol in args.protocols:
+                for size in args.sizes:
+                    result = await run_case(asset, protocol, size, args)
+                    results.append(result)
+                    print(
+                        f"{asset.stem[:10]:>10} {protocol:>5} {size:>4} {result['fps']:>7.2f} "
+                        f"{result['latency_ms']['p50'] or 0:>8.2f} {result['latency_ms']['p95'] or 0:>8.2f} "
+                        f"{result['jitter_ms']['p95'] or 0:>10.2f} {result['cpu_ms_per_frame'] or 0:>9.3f} "
+                        f"{result['send_errors']:>6}",
+                        file=sys.stderr
+                    )
+    finally:
+        await connection_manager.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=lambda value: [int(size) for size in value.split(",")], default=[16, 32, 64])
+    parser.add_argument("--protocols", type=lambda value: value.split(","), default=["http", "ddp"])
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Latencia añadida por el dispositivo de prueba")
+    parser.add_argument("--loss", type=float, default=0.0, help="Probabilidad de perder una petición/paquete")
+    parser.add_argument("--no-delta", action="store_true", help="Enviar siempre frames completos por HTTP")
+    parser.add_argument("--adaptive", action="store_true", help="Limitar el ritmo según RTT y errores, como el reproductor")
+    parser.add_argument("--assets", type=int, default=0, help="Número máximo de assets (0 = todos)")
+    parser.add_argument("--json", help="Archivo de resultados (por defecto, salida estándar)")
+    args = parser.parse_args()
+
+    print(f"{'asset':>10} {'proto':>5} {'size':>4} {'fps':>7} {'lat p50':>8} {'lat p95':>8} {'jitter p95':>10} {'cpu ms/f':>9} {'errors':>6}", file=sys.stderr)
+    report = {
+        "benchmark": "transport",
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "options": {key: value for key, value in vars(args).items() if key != "json"},
+        "results": asyncio.run(run(args))
+    }
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
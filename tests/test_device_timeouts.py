@@ -0,0 +1,97 @@
+import asyncio
+import time
+
+import numpy as np
+import pytest
+
+from app.services.device_health import OFFLINE, DeviceOffline
+from app.services.effects import ConstantDurations
+from app.services.http_pool import connection_manager
+from app.services.player import Player
+from app.services.wled_service import WledService
+
+FRAME_MS = 40
+SLACK = 0.02  # Margen del planificador y de aiohttp al cancelar la petición
+
+
+class Frames:
+    def __init__(self, count=1000):
+        self.durations = ConstantDurations(FRAME_MS, count)
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def frame(self, index):
+        frame = np.zeros((4, 4, 3), dtype=np.uint8)
+        frame[0, 0, 0] = index % 256
+        return frame
+
+
+async def silent_device():
+    """Acepta conexiones y lee las peticiones, pero nunca responde"""
+    connections = []
+
+    async def handle(reader, writer):
+        connections.append(writer)
+        while await reader.read(65536):
+            pass
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[1], connections
+
+
+def test_send_to_a_silent_device_costs_at_most_one_frame_period():
+    async def run():
+        server, port, connections = await silent_device()
+        output = WledService("127.0.0.1", port, adaptive=True)
+        player = Player(output)
+        durations = []
+        send_frame = output.send_frame
+
+        async def timed_send(frame, hold=False, timeout=None):
+            started = time.monotonic()
+            try:
+                return await send_frame(frame, hold, timeout)
+            finally:
+                durations.append(time.monotonic() - started)
+
+        output.send_frame = timed_send
+        try:
+            await player.start()
+            player.play("silent", Frames())
+            await asyncio.sleep(0.5)
+            attempted = [duration for duration in durations if duration > 0.001]
+            assert len(attempted) >= 3
+            assert max(attempted) <= FRAME_MS / 1000 + SLACK
+            # Tres timeouts seguidos: sin conexión, y los frames siguientes se saltan sin esperar
+            assert output.health.state == OFFLINE
+            assert player.stats.frames_offline > 0
+            assert player.index > 5  # La reproducción sigue su calendario
+        finally:
+            await player.shutdown()
+            server.close()
+            for writer in connections:
+                writer.close()
+            await connection_manager.close()
+
+    asyncio.run(run())
+
+
+def test_timeout_never_drops_below_the_measured_rtt():
+    output = WledService("127.0.0.1", 80, adaptive=True)
+    assert output.rate.send_timeout(0.02) == 0.02
+    output.rate._rtt.extend([0.05] * 10)
+    assert output.rate.send_timeout(0.02) == pytest.approx(0.055)
+    assert output.rate.send_timeout(0.2) == 0.2
+
+
+def test_offline_device_raises_without_sending():
+    async def run():
+        output = WledService("127.0.0.1", 9, adaptive=True)
+        for _ in range(3):
+            output.health.record(False, "TimeoutError")
+        with pytest.raises(DeviceOffline):
+            await output.send_frame(np.zeros((4, 4, 3), dtype=np.uint8), timeout=0.01)
+
+    asyncio.run(run())
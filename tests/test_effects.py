@@ -0,0 +1,51 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.effects import router
+from app.services.effects import EFFECTS
+
+app = FastAPI()
+app.include_router(router)
+client = TestClient(app)
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("false", False), ("FALSE", False), ("0", False), (0, False), (False, False),
+    ("true", True), ("True", True), ("1", True), (1, True), (True, True)
+])
+def test_bool_params_accept_form_values(value, expected):
+    assert EFFECTS["gradient"].validate({"rainbow": value})["rainbow"] is expected
+
+
+@pytest.mark.parametrize("value", ["yes", "", "2", None])
+def test_bool_params_reject_other_values(value):
+    with pytest.raises(ValueError, match="rainbow"):
+        EFFECTS["gradient"].validate({"rainbow": value})
+
+
+def test_numeric_params_are_coerced():
+    params = EFFECTS["fire"].validate({"seed": "3", "cooling": "0.1"})
+    assert params["seed"] == 3 and isinstance(params["seed"], int)
+    assert params["cooling"] == 0.1
+    assert EFFECTS["fire"].validate({"seed": 2.0})["seed"] == 2
+
+
+@pytest.mark.parametrize("params", [{"seed": "1.5"}, {"seed": 1.5}, {"seed": True}, {"cooling": "nan"}, {"cooling": "hot"}])
+def test_invalid_numbers_are_validation_errors(params):
+    with pytest.raises(ValueError, match="Valor no válido"):
+        EFFECTS["fire"].validate(params)
+
+
+def test_api_rejects_invalid_params_with_400():
+    response = client.post("/api/effects/fire/check", json={"params": {"seed": "1.5"}})
+    assert response.status_code == 400
+    assert "seed" in response.json()["detail"]
+
+    response = client.post("/api/effects/gradient/check", json={"params": {"rainbow": "maybe"}})
+    assert response.status_code == 400
+
+
+def test_api_turns_flags_off_with_string_values():
+    response = client.post("/api/effects/gradient/check", json={"params": {"rainbow": "false"}})
+    assert response.status_code == 200
@@ -0,0 +1,57 @@
+import asyncio
+import subprocess
+import sys
+import time
+
+import pytest
+
+from app.services.file_lock import FileLock
+
+# Otro proceso toma el lock, avisa por stdout y lo suelta al cabo de HOLD segundos
+HOLDER = """
+import asyncio, sys, time
+from pathlib import Path
+from app.services.file_lock import FileLock
+
+async def main():
+    async with FileLock(Path(sys.argv[1])):
+        print("locked", flush=True)
+        time.sleep(float(sys.argv[2]))
+
+asyncio.run(main())
+"""
+HOLD = 0.3
+
+
+def test_lock_excludes_other_processes(tmp_path):
+    path = tmp_path / "cache" / "test.lock"
+    holder = subprocess.Popen([sys.executable, "-c", HOLDER, str(path), str(HOLD)], stdout=subprocess.PIPE, text=True)
+    try:
+        assert holder.stdout.readline().strip() == "locked"
+
+        async def run():
+            started = time.monotonic()
+            async with FileLock(path):
+                return time.monotonic() - started
+
+        assert asyncio.run(run()) >= HOLD * 0.5
+    finally:
+        holder.wait(10)
+
+
+def test_cancelled_waiter_does_not_keep_the_lock(tmp_path):
+    path = tmp_path / "test.lock"
+
+    async def run():
+        first, second = FileLock(path), FileLock(path)  # Como dos procesos distintos
+        async with first:
+            waiter = asyncio.create_task(second.__aenter__())
+            await asyncio.sleep(0.05)
+            waiter.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiter
+        async with asyncio.timeout(1.0):
+            async with second:
+                pass
+
+    asyncio.run(run())
@@ -0,0 +1,31 @@
+import asyncio
+
+from app.services.file_lock import FileSemaphore
+from app.services.jobs import JobQueue
+
+
+def test_cpu_jobs_are_split_between_api_workers():
+    assert JobQueue(max_cpu_jobs=2, workers=2).process_cpu_jobs == 1
+    assert JobQueue(max_cpu_jobs=2, workers=4).process_cpu_jobs == 1
+    assert JobQueue(max_cpu_jobs=2, workers=1).process_cpu_jobs == 2
+
+
+def test_cpu_job_waits_for_a_slot_held_by_another_process(tmp_path):
+    async def run():
+        queue = JobQueue(max_cpu_jobs=1, workers=1, slots_dir=tmp_path)
+        other = FileSemaphore(tmp_path, 1)  # Otro worker de la API con el único hueco
+        slot = await other.acquire()
+        try:
+            job = asyncio.create_task(queue.run_cpu(pow, 2, 10))
+            await asyncio.sleep(0.2)
+            assert not job.done()
+            other.release(slot)
+            assert await asyncio.wait_for(job, 30) == 1024
+
+            # Al terminar, el hueco vuelve a estar libre
+            slot = await asyncio.wait_for(other.acquire(), 1)
+            other.release(slot)
+        finally:
+            await queue.shutdown()
+
+    asyncio.run(run())
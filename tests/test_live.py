@@ -0,0 +1,80 @@
+import asyncio
+
+import numpy as np
+
+from app.services.effects import ConstantDurations
+from app.services.live import LiveClient, LiveManager, LiveRelay
+from app.services.player import Player
+
+CONFIG = {"matrix": {"width": 4, "height": 4}, "wled": {"ip": "127.0.0.1"}}
+
+
+class FakeOutput:
+    """Salida que acepta todos los frames sin enviarlos"""
+
+    ip = "fake"
+    min_interval = 0.0
+    online = True
+    on_online = None
+
+    def __init__(self):
+        self.frames = []
+
+    async def open(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def send_frame(self, frame, hold=False, timeout=None):
+        self.frames.append(frame)
+        return True, "Frame enviado"
+
+    def rate_status(self):
+        return None
+
+
+class Frames:
+    def __init__(self, count=10):
+        self.durations = ConstantDurations(50, count)
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def frame(self, index):
+        return np.zeros((4, 4, 3), dtype=np.uint8)
+
+
+def test_relay_sends_live_frames():
+    async def run():
+        player = Player(FakeOutput())
+        relay = LiveRelay(player, CONFIG)
+        relay.start()
+        client = LiveClient()
+        assert relay.submit(client, bytes(4 * 4 * 3))
+        await asyncio.sleep(0.05)
+        assert client.sent == 1
+        await relay.cancel()
+
+    asyncio.run(run())
+
+
+def test_relay_exits_when_another_playback_takes_the_player():
+    async def run():
+        manager = LiveManager()
+        player = Player(FakeOutput())
+        relay = LiveRelay(player, CONFIG)
+        relay.start()
+        relay.task.add_done_callback(lambda task: manager._forget(relay))
+        manager.relays["fake"] = relay
+        await asyncio.sleep(0.01)
+
+        # Sin más frames en directo: el relay debe terminar igualmente
+        player.play("asset", Frames())
+        await asyncio.wait_for(relay.task, 1.0)
+        assert not relay.running
+        assert player.controller is None
+        assert manager.relays == {}
+
+    asyncio.run(run())
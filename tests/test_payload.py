@@ -0,0 +1,142 @@
+import json
+
+import numpy as np
+import pytest
+
+from app.services.payload import (
+    KEYFRAME_INTERVAL, DeltaEncoder, build_payload, changed_runs, encode_delta, encode_ranges
+)
+from benchmarks.fake_wled import apply_segment
+
+LEDS = 64
+
+
+def frame(seed: int) -> np.ndarray:
+    """Frame de 8x8 con tramos de color repetido y píxeles sueltos"""
+    rng = np.random.default_rng(seed)
+    pixels = np.repeat(rng.integers(0, 256, (16, 3), dtype=np.uint8), 4, axis=0)
+    pixels[rng.choice(LEDS, 8, replace=False)] = rng.integers(0, 256, (8, 3), dtype=np.uint8)
+    return pixels.reshape(8, 8, 3)
+
+
+def apply(leds: np.ndarray, payload: bytes) -> dict:
+    """Aplica el cuerpo JSON al estado de los LEDs como lo haría WLED"""
+    body = json.loads(payload)
+    apply_segment(leds, body["seg"][0]["i"])
+    return body
+
+
+def with_changes(pixels: np.ndarray, indices) -> np.ndarray:
+    changed = pixels.copy().reshape(-1, 3)
+    changed[list(indices)] ^= 0xFF
+    return changed.reshape(pixels.shape)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_full_payload_rebuilds_the_frame(seed):
+    pixels = frame(seed)
+    leds = np.zeros((LEDS, 3), dtype=np.uint8)
+    body = apply(leds, build_payload(pixels))
+    assert body["on"] is True
+    assert np.array_equal(leds, pixels.reshape(-1, 3))
+
+
+def test_noise_falls_back_to_plain_colors():
+    pixels = np.random.default_rng(1).integers(0, 256, (LEDS, 3), dtype=np.uint8)
+    items = encode_ranges(pixels)
+    assert all(isinstance(item, str) for item in items)
+    leds = np.zeros_like(pixels)
+    apply_segment(leds, items)
+    assert np.array_equal(leds, pixels)
+
+
+def test_loose_colors_continue_after_a_range():
+    a, b, c = [255, 0, 0], [0, 255, 0], [0, 0, 255]
+    pixels = np.array([a] * 5 + [b, c], dtype=np.uint8)
+    # Tras el tramo [0, 5) el cursor de WLED queda en 5: los colores sueltos no llevan índice
+    assert encode_ranges(pixels) == [0, 5, "ff0000", "00ff00", "0000ff"]
+    # Con offset, el primer color suelto lleva su índice y los demás continúan desde él
+    assert encode_ranges(pixels[5:], offset=10) == [10, "00ff00", "0000ff"]
+
+
+def test_delta_payload_rebuilds_the_frame_from_the_previous_one():
+    previous = frame(0)
+    pixels = with_changes(previous, [0, 1, 2, 3, 9, 20, 21, 40, 63])
+    starts, stops = changed_runs(previous, pixels)
+    assert starts.tolist() == [0, 9, 20, 40, 63]
+    assert stops.tolist() == [4, 10, 22, 41, 64]
+
+    leds = previous.reshape(-1, 3).copy()
+    apply_segment(leds, encode_delta(pixels, starts, stops))
+    assert np.array_equal(leds, pixels.reshape(-1, 3))
+
+
+def test_encoder_sequence_rebuilds_every_frame():
+    encoder = DeltaEncoder()
+    leds = np.zeros((LEDS, 3), dtype=np.uint8)
+    pixels = frame(0)
+    for step in range(30):
+        if step:
+            pixels = with_changes(pixels, [step, (step * 7) % LEDS])
+        payload = encoder.encode(pixels)
+        apply(leds, payload)
+        encoder.acknowledge()
+        assert np.array_equal(leds, pixels.reshape(-1, 3))
+    assert encoder.frames_full == 1
+    assert encoder.frames_delta == 29
+    assert encoder.encode(pixels) is None  # Sin cambios no se envía nada
+
+
+def test_more_than_half_changed_sends_the_full_frame():
+    encoder = DeltaEncoder()
+    previous = frame(0)
+    encoder.encode(previous)
+    encoder.acknowledge()
+
+    half = with_changes(previous, range(LEDS // 2))
+    assert "on" not in json.loads(encoder.encode(half))
+
+    most = with_changes(previous, range(LEDS // 2 + 1))
+    leds = np.zeros((LEDS, 3), dtype=np.uint8)  # Un frame completo no depende del anterior
+    assert "on" in apply(leds, encoder.encode(most))
+    assert np.array_equal(leds, most.reshape(-1, 3))
+
+
+def test_keyframe_every_interval():
+    encoder = DeltaEncoder()
+    pixels = frame(0)
+    full = []
+    for step in range(2 * KEYFRAME_INTERVAL + 3):
+        pixels = with_changes(pixels, [step % LEDS])
+        full.append("on" in json.loads(encoder.encode(pixels)))
+        encoder.acknowledge()
+    assert [i for i, is_full in enumerate(full) if is_full] == [0, KEYFRAME_INTERVAL + 1, 2 * KEYFRAME_INTERVAL + 2]
+
+
+def test_unacknowledged_send_is_not_used_as_the_base():
+    encoder = DeltaEncoder()
+    first = frame(0)
+    leds = np.zeros((LEDS, 3), dtype=np.uint8)
+    apply(leds, encoder.encode(first))
+    encoder.acknowledge()
+
+    # El dispositivo no llega a recibir el segundo frame: el tercero se codifica sobre el primero
+    encoder.encode(with_changes(first, [1]))
+    third = with_changes(first, [2])
+    apply(leds, encoder.encode(third))
+    encoder.acknowledge()
+    assert np.array_equal(leds, third.reshape(-1, 3))
+
+
+def test_reset_after_a_failed_send_sends_the_full_frame():
+    encoder = DeltaEncoder()
+    first = frame(0)
+    encoder.encode(first)
+    encoder.acknowledge()
+
+    encoder.encode(with_changes(first, [1]))
+    encoder.reset()  # Error de envío: no se sabe qué muestra el dispositivo
+    second = with_changes(first, [2])
+    leds = np.full((LEDS, 3), 7, dtype=np.uint8)
+    assert "on" in apply(leds, encoder.encode(second))
+    assert np.array_equal(leds, second.reshape(-1, 3))
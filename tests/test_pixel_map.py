@@ -0,0 +1,34 @@
+import numpy as np
+
+from app.services.pixel_map import PixelLayout, build_index_map
+
+# Frame de 3x2 recorrido por filas:
+#   0 1 2
+#   3 4 5
+
+
+def test_serpentine_and_rotation():
+    assert build_index_map(3, 2, serpentine=True).tolist() == [0, 1, 2, 5, 4, 3]
+    assert build_index_map(3, 2, rotation=90).tolist() == [2, 5, 1, 4, 0, 3]
+    assert build_index_map(3, 2, vertical=True, serpentine=True).tolist() == [0, 3, 4, 1, 2, 5]
+
+
+def test_short_ledmap_keeps_identity_past_its_end():
+    # Como en WLED, solo se remapean los primeros len(ledmap) pixeles
+    assert build_index_map(3, 2, serpentine=True, ledmap=[2, 1, 0]).tolist() == [2, 1, 0, 5, 4, 3]
+    assert build_index_map(3, 2, rotation=90, ledmap=[1, 0]).tolist() == [5, 2, 1, 4, 0, 3]
+
+
+def test_ledmap_gaps_are_dark():
+    assert build_index_map(3, 2, ledmap=[0, -1, 1]).tolist() == [0, 2, -1, 3, 4, 5]
+
+
+def test_layout_applies_short_ledmap_to_the_frame():
+    frame = np.arange(3 * 2 * 3, dtype=np.uint8).reshape(2, 3, 3)
+    leds = PixelLayout(serpentine=True, ledmap=[2, 1, 0]).apply(frame)
+    pixels = frame.reshape(-1, 3)
+    assert np.array_equal(leds, pixels[[2, 1, 0, 5, 4, 3]])
+
+    leds = PixelLayout(ledmap=[0, -1, 1]).apply(frame)
+    assert np.array_equal(leds[2], [0, 0, 0])
+    assert np.array_equal(leds[3:], pixels[3:])
@@ -0,0 +1,111 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.health import api_router, router as health_router
+from app.services.metrics import frames_sent, metrics, preview_cache_requests
+from app.services.playback_proxy import PlaybackProxy, playback_client
+
+ROOT = Path(__file__).parent.parent
+
+# Proceso de reproducción mínimo: las rutas de /health y /metrics con valores conocidos
+ENGINE = """
+import sys
+import uvicorn
+from fastapi import FastAPI
+from app.api.health import router
+from app.services.metrics import frames_sent
+frames_sent.inc(amount=7)
+engine = FastAPI()
+engine.include_router(router)
+uvicorn.run(engine, uds=sys.argv[1], log_level="warning")
+"""
+
+
+@pytest.fixture
+def engine(tmp_path):
+    socket_path = str(tmp_path / "playback.sock")
+    process = subprocess.Popen([sys.executable, "-c", ENGINE, socket_path], cwd=ROOT)
+    deadline = time.monotonic() + 10
+    while not os.path.exists(socket_path):
+        assert time.monotonic() < deadline, "el proceso de reproducción no arrancó"
+        time.sleep(0.05)
+    yield process, socket_path
+    process.terminate()
+    process.wait(10)
+
+
+@pytest.fixture
+def api(engine, tmp_path):
+    process, socket_path = engine
+    playback_client.configure(socket_path)
+    directory = metrics.directory
+    metrics.directory = tmp_path / "metrics"
+
+    @asynccontextmanager
+    async def lifespan(app):
+        yield
+        await playback_client.close()  # La sesión pertenece al event loop de este TestClient
+
+    app = FastAPI(lifespan=lifespan)
+    app.include_router(api_router)
+    app.add_middleware(PlaybackProxy, routes=[route for route in health_router.routes if route.path != "/metrics"])
+    with TestClient(app) as client:
+        yield client
+    metrics.directory = directory
+
+
+def sample(text: str, name: str) -> float:
+    for line in text.splitlines():
+        if line.startswith(name + " "):
+            return float(line.split()[-1])
+    return 0.0
+
+
+def test_health_is_proxied_to_the_playback_process(api):
+    response = api.get("/health")
+    assert response.status_code == 200
+    assert response.json()["status"] in ("ok", "degraded")
+
+
+def test_metrics_merge_playback_process_and_api_workers(api, engine):
+    process, _ = engine
+    # Este worker registra una construcción de sprite; otro worker (vivo) publicó tres aciertos
+    preview_cache_requests.inc("build")
+    metrics.directory.mkdir(parents=True, exist_ok=True)
+    (metrics.directory / f"{process.pid}.json").write_text(json.dumps({
+        "wled_preview_cache_requests_total": [[["hit"], 3]]
+    }))
+    # Un worker que ya no existe no cuenta
+    (metrics.directory / "999999999.json").write_text(json.dumps({
+        "wled_preview_cache_requests_total": [[["hit"], 100]]
+    }))
+
+    response = api.get("/metrics")
+    assert response.status_code == 200
+    text = response.text
+    assert sample(text, "wled_frames_sent_total") == frames_sent.value() + 7
+    assert sample(text, 'wled_preview_cache_requests_total{result="build"}') == preview_cache_requests.value("build")
+    assert sample(text, 'wled_preview_cache_requests_total{result="hit"}') == preview_cache_requests.value("hit") + 3
+    # Una sola familia por métrica, aunque los valores vengan de varios procesos
+    type_lines = [line for line in text.splitlines() if line.startswith("# TYPE")]
+    assert len(type_lines) == len(set(type_lines))
+    assert not (metrics.directory / "999999999.json").exists()
+
+
+def test_metrics_without_playback_process_still_include_the_api(api, engine):
+    process, _ = engine
+    process.terminate()
+    process.wait(10)
+    preview_cache_requests.inc("hit")
+    response = api.get("/metrics")
+    assert response.status_code == 200
+    assert sample(response.text, 'wled_preview_cache_requests_total{result="hit"}') == preview_cache_requests.value("hit")
@@ -0,0 +1,113 @@
+import asyncio
+import time
+
+import numpy as np
+
+from app.services.effects import ConstantDurations
+from app.services.player import PAUSED, Player
+
+SLACK = 0.02  # Margen del planificador del event loop
+
+
+class FakeOutput:
+    """Salida que tarda send_time segundos en cada envío y anota (instante, frame)"""
+
+    ip = "fake"
+    min_interval = 0.0
+    online = True
+    on_online = None
+
+    def __init__(self, send_time=0.0):
+        self.send_time = send_time
+        self.sent = []
+
+    async def open(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def send_frame(self, frame, hold=False, timeout=None):
+        self.sent.append((time.monotonic(), int(frame[0, 0, 0])))
+        await asyncio.sleep(self.send_time)
+        return True, "Frame enviado"
+
+    def rate_status(self):
+        return None
+
+
+class Frames:
+    def __init__(self, duration_ms, count=250):
+        self.durations = ConstantDurations(duration_ms, count)
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def frame(self, index):
+        frame = np.zeros((4, 4, 3), dtype=np.uint8)
+        frame[0, 0, 0] = index
+        return frame
+
+
+def test_frames_are_skipped_not_delayed_when_a_send_overruns():
+    async def run():
+        output = FakeOutput(send_time=0.07)  # Más de tres periodos de 20 ms
+        player = Player(output)
+        await player.start()
+        try:
+            started = time.monotonic()
+            player.play("slow", Frames(20))
+            await asyncio.sleep(0.5)
+            elapsed = time.monotonic() - started
+        finally:
+            await player.shutdown()
+
+        # La posición sigue al reloj, no al número de envíos
+        assert player.index >= int(elapsed / 0.02) - 5
+        assert len(output.sent) <= elapsed / 0.07 + 1
+        assert player.stats.frames_dropped > 0
+        indices = [index for _, index in output.sent]
+        assert all(b - a >= 3 for a, b in zip(indices, indices[1:]))
+        # Cada envío empieza en cuanto termina el anterior: sin esperas añadidas
+        times = [sent_at for sent_at, _ in output.sent]
+        assert all(b - a <= 0.07 + SLACK for a, b in zip(times, times[1:]))
+
+    asyncio.run(run())
+
+
+def test_pause_seek_and_resume_keep_deadlines():
+    async def run():
+        output = FakeOutput()
+        player = Player(output)
+        await player.start()
+        try:
+            player.play("clip", Frames(50))
+            await asyncio.sleep(0.12)
+            player.pause()
+            assert player.state == PAUSED
+            sent = len(output.sent)
+            await asyncio.sleep(0.2)
+            assert len(output.sent) == sent
+
+            # En pausa, el frame elegido se envía enseguida y solo una vez
+            seek_at = time.monotonic()
+            player.seek(100)
+            await asyncio.sleep(0.15)
+            assert output.sent[sent:] == [(output.sent[sent][0], 100)]
+            assert output.sent[sent][0] - seek_at <= SLACK
+
+            # Al reanudar, la pausa no cuenta como retraso: ni ráfagas ni frames saltados
+            resume_at = time.monotonic()
+            player.resume()
+            await asyncio.sleep(0.22)
+        finally:
+            await player.shutdown()
+
+        resumed = output.sent[sent + 1:]
+        assert [index for _, index in resumed] == [100, 101, 102, 103, 104]
+        for n, (sent_at, _) in enumerate(resumed):
+            assert 0 <= sent_at - (resume_at + n * 0.05) <= SLACK
+        assert player.stats.frames_dropped == 0
+
+    asyncio.run(run())
@@ -0,0 +1,51 @@
+import asyncio
+
+from app.services.player import player_manager
+from app.services.playlists import PlaylistManager, PlaylistRunner
+
+PLAYLIST = {"id": "p1", "name": "Demo", "entries": [{"asset_id": "a1"}]}
+
+
+def config(ip: str) -> dict:
+    return {"matrix": {"width": 4, "height": 4}, "wled": {"ip": ip}}
+
+
+class FakePlayer:
+    controller = None
+
+
+def test_playlist_of_a_removed_output_is_stopped():
+    async def run():
+        manager = PlaylistManager()
+        old, new = config("10.0.0.1"), config("10.0.0.2")
+        runner = PlaylistRunner(FakePlayer(), PLAYLIST, old)
+        runner.task = asyncio.create_task(asyncio.sleep(10))
+        manager.runners[player_manager.output_key(old)] = runner
+        assert runner.status()["running"]
+
+        # Misma salida (otro tamaño de matriz): la playlist sigue
+        await manager._apply_config({**old, "matrix": {"width": 8, "height": 8}})
+        assert manager.status()[player_manager.output_key(old)]["running"]
+
+        await manager._apply_config(new)
+        assert manager.runners == {}
+        assert runner.task.cancelled()
+        assert not runner.status()["running"]
+
+    asyncio.run(run())
+
+
+def test_config_change_from_another_thread_reaches_the_loop():
+    async def run():
+        manager = PlaylistManager()
+        manager._loop = asyncio.get_running_loop()
+        old = config("10.0.0.1")
+        runner = PlaylistRunner(FakePlayer(), PLAYLIST, old)
+        runner.task = asyncio.create_task(asyncio.sleep(10))
+        manager.runners[player_manager.output_key(old)] = runner
+
+        await asyncio.to_thread(manager.on_config_changed, old, config("10.0.0.2"))
+        await asyncio.sleep(0.05)
+        assert manager.runners == {}
+
+    asyncio.run(run())
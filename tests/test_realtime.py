@@ -0,0 +1,89 @@
+import asyncio
+import struct
+
+import pytest
+
+from app.services.realtime import (
+    DDP, DDP_FLAG_PUSH, DDP_FLAG_VERSION_1, DDP_HEADER, DDP_MAX_DATA, DNRGB, DRGB, WLED_UDP_DNRGB,
+    RealtimeSender
+)
+
+
+class Receiver(asyncio.DatagramProtocol):
+    """Guarda los datagramas recibidos"""
+
+    def __init__(self):
+        self.packets = []
+        self.received = asyncio.Event()
+
+    def datagram_received(self, data, addr):
+        self.packets.append(data)
+        self.received.set()
+
+
+async def receive(sender: RealtimeSender, frames: list, expected: int) -> list:
+    """Envía los frames a un receptor local y devuelve los datagramas recibidos"""
+    loop = asyncio.get_running_loop()
+    transport, receiver = await loop.create_datagram_endpoint(Receiver, local_addr=("127.0.0.1", 0))
+    sender.port = transport.get_extra_info("sockname")[1]
+    await sender.open()
+    try:
+        for frame in frames:
+            sender.send(frame)
+        while len(receiver.packets) < expected:
+            receiver.received.clear()
+            await asyncio.wait_for(receiver.received.wait(), 1.0)
+        return receiver.packets
+    finally:
+        sender.close()
+        transport.close()
+
+
+def rgb(leds: int) -> bytes:
+    return bytes(i % 256 for i in range(leds * 3))
+
+
+def test_ddp_splits_frames_in_1440_byte_chunks_with_push_on_the_last():
+    frame = rgb(1000)  # 3000 bytes: 1440 + 1440 + 120
+    packets = asyncio.run(receive(RealtimeSender("127.0.0.1", protocol=DDP), [frame], 3))
+
+    data = b""
+    for i, packet in enumerate(packets):
+        flags, sequence, _, _, offset, length = DDP_HEADER.unpack(packet[:DDP_HEADER.size])
+        chunk = packet[DDP_HEADER.size:]
+        assert flags & DDP_FLAG_VERSION_1
+        assert bool(flags & DDP_FLAG_PUSH) == (i == len(packets) - 1)
+        assert sequence == 1
+        assert offset == len(data)
+        assert length == len(chunk) == min(DDP_MAX_DATA, len(frame) - offset)
+        data += chunk
+    assert data == frame
+
+
+def test_ddp_sequence_wraps_from_15_to_1():
+    sender = RealtimeSender("127.0.0.1", protocol=DDP)
+    packets = asyncio.run(receive(sender, [rgb(10)] * 32, 32))
+    sequences = [DDP_HEADER.unpack(packet[:DDP_HEADER.size])[1] for packet in packets]
+    assert sequences == [i % 15 + 1 for i in range(32)]
+    assert 0 not in sequences
+
+
+def test_dnrgb_packets_carry_the_start_index():
+    frame = rgb(1000)
+    packets = asyncio.run(receive(RealtimeSender("127.0.0.1", protocol=DNRGB, timeout=5), [frame], 3))
+
+    data = b""
+    for packet in packets:
+        protocol, timeout, start = struct.unpack(">BBH", packet[:4])
+        assert (protocol, timeout) == (WLED_UDP_DNRGB, 5)
+        assert start == len(data) // 3
+        data += packet[4:]
+    assert [struct.unpack(">BBH", packet[:4])[2] for packet in packets] == [0, 489, 978]
+    assert data == frame
+
+
+def test_drgb_rejects_more_than_490_leds():
+    sender = RealtimeSender("127.0.0.1", protocol=DRGB)
+    assert len(sender.packets(rgb(490))) == 1
+    with pytest.raises(ValueError, match="490"):
+        sender.packets(rgb(491))
@@ -0,0 +1,66 @@
+import threading
+
+import pytest
+
+from app.services import text
+from app.services.text import TextFrames, validate
+
+
+def test_validate_coerces_form_values():
+    params = validate({"clock": "false", "speed": "12.5", "gap": "3"})
+    assert params["clock"] is False
+    assert params["speed"] == 12.5
+    assert params["gap"] == 3
+
+
+def test_validate_rejects_invalid_values():
+    with pytest.raises(ValueError, match="gap"):
+        validate({"gap": "1.5"})
+    with pytest.raises(ValueError, match="clock"):
+        validate({"clock": "maybe"})
+
+
+def test_font_list_is_not_scanned_on_every_validation(monkeypatch):
+    text.font_paths(refresh=True)
+    scans = []
+    monkeypatch.setattr(text.Path, "rglob", lambda self, pattern: scans.append(self) or iter(()))
+    for _ in range(10):
+        validate({"text": "hola"})
+    assert scans == []
+    text.font_paths(refresh=True)
+    assert scans
+
+
+def test_update_keeps_the_scroll_position():
+    frames = TextFrames(16, 8, {"text": "abc", "speed": 10.0}, fps=10)
+    frames.frame(25)
+    before = frames.offset(25) % frames.layout.period
+    frames.update({"text": "abcdef"})
+    assert frames.offset(25) == pytest.approx(before)
+    # La velocidad nueva se aplica desde ese punto
+    assert frames.offset(35) == pytest.approx(before + 10)
+
+
+def test_frames_never_mix_origin_and_layout_during_updates():
+    frames = TextFrames(16, 8, {"text": "abc", "speed": 30.0}, fps=30)
+    stop = threading.Event()
+
+    def update():
+        texts = ["abc", "a much longer scrolling text"]
+        i = 0
+        while not stop.is_set():
+            frames.update({"text": texts[i % 2]})
+            i += 1
+
+    thread = threading.Thread(target=update)
+    thread.start()
+    try:
+        for index in range(2000):
+            state = frames._state
+            layout, (origin_index, origin_column), _ = state
+            # El origen siempre está dentro del periodo de su propia tira
+            assert 0 <= origin_column < layout.period
+            assert frames.frame(index).shape == (8, 16, 3)
+    finally:
+        stop.set()
+        thread.join()
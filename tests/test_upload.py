@@ -0,0 +1,55 @@
+import asyncio
+import json
+
+import pytest
+
+import app.api.upload as upload
+from app.services.blobs import blob_store
+from app.services.catalog import asset_catalog
+
+BLOB = "ab" * 32
+
+
+class Job:
+    def update(self, progress, stage):
+        pass
+
+
+@pytest.fixture
+def assets(tmp_path, monkeypatch):
+    """Catálogo y blobs sobre un directorio temporal"""
+    assets_dir = tmp_path / "assets"
+    assets_dir.mkdir()
+    monkeypatch.setattr(upload, "ASSETS_DIR", assets_dir)
+    monkeypatch.setattr(blob_store, "assets_dir", assets_dir)
+    monkeypatch.setattr(asset_catalog, "assets_dir", assets_dir)
+    monkeypatch.setattr(asset_catalog, "path", tmp_path / "catalog.db")
+    monkeypatch.setattr(asset_catalog, "_db", None)
+    yield assets_dir
+    asset_catalog.close()
+
+
+def test_duplicate_upload_with_another_suffix_references_the_existing_file(assets, tmp_path):
+    existing = {
+        "id": "first", "name": "Clip", "filename": f"{BLOB}.mp4", "format": "video",
+        "uploaded_at": "2024-01-01T00:00:00", "width": 16, "height": 16, "frame_count": 10,
+        "duration_ms": 400, "size": 4, "poster": f"{BLOB}_poster.jpg", "blob": BLOB
+    }
+    (assets / existing["filename"]).write_bytes(b"data")
+    upload.save_reference(existing)
+    asset_catalog.add(existing)
+
+    staging = tmp_path / "staging.mov"
+    staging.write_bytes(b"data")
+    result = asyncio.run(upload.process_upload(Job(), "second", "Copia", "video", staging, BLOB, ".mov", (16, 16)))
+
+    assert result["deduplicated"]
+    assert result["filename"] == existing["filename"]
+    asset = asset_catalog.get("second")
+    assert asset["filename"] == existing["filename"]
+    assert asset["format"] == "video"
+    assert asset["frame_count"] == 10
+    with open(assets / "second_metadata.json") as f:
+        assert json.load(f)["filename"] == existing["filename"]
+    assert not (assets / f"{BLOB}.mov").exists()
+    assert not staging.exists()